@@ -0,0 +1,186 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import Bytecode
+import InputProvider
+import Interpreter
+import LexicalAnalyzer
+import Optimizer
+import OutputSink
+import SyntaxAnalyzer
+import TokenStream
+import Transpiler
+
+# Batch mode: run many .lol files across a process pool and collect one structured report.
+#   python Batch.py samplecodes/ [more.lol ...] [--jobs N] [--report report.json]
+#                   [--backend interpreter|bytecode|transpiler] [--cache] [--timeout SECONDS]
+# GIMMEH input for foo.lol is read from foo.in next to it, if there is one.
+
+INPUT_SUFFIX = ".in"
+BACKENDS = ("interpreter", "bytecode", "transpiler")
+DEFAULT_TIMEOUT = 60.0  # Seconds each program may run before it is cancelled
+WARMUP_SOURCE = "HAI\nWAZZUP\nI HAS A x ITZ 1\nBUHBYE\nx R SUM OF x AN 1\nVISIBLE x\nKTHXBYE\n"
+
+lexer = None  # Each worker's warm lexer, created once by init_worker
+
+
+def init_worker():
+    """Create the worker's lexer once, and put a small program through it and the parser, so every file it runs
+    finds both warm."""
+    global lexer
+    lexer = LexicalAnalyzer.LexicalAnalyzer()
+    SyntaxAnalyzer.SyntaxAnalyzer(TokenStream.TokenStream.from_lexer(*lexer.gen_tokens(WARMUP_SOURCE))).analyze()
+
+
+def input_path(path):
+    """Get the per-file input path of a program: foo.lol reads GIMMEH lines from foo.in."""
+    return os.path.splitext(path)[0] + INPUT_SUFFIX
+
+
+def run_one(path, backend="interpreter", code_cache_dir=None, timeout=DEFAULT_TIMEOUT):
+    """Lex, parse and execute one file, returning its output, errors and per-phase timings.
+
+    Transpiled programs are timed in one load phase instead, which skips lexing and parsing when
+    code_cache_dir holds the program already. A program still running after timeout seconds is cancelled.
+    """
+    if lexer is None:
+        init_worker()  # Running in-process, without the pool
+    result = {"path": path, "ok": False, "stdout": [], "errors": [], "timings": {}, "stats": {}}
+    timings = result["timings"]
+    try:
+        inputs = input_path(path)
+        input_func = InputProvider.FileInput(inputs) if os.path.exists(inputs) else InputProvider.ListInput()
+        output = OutputSink.MemorySink(result["stdout"])
+        start = time.perf_counter()
+        with open(path) as file:
+            source = file.read()
+        if backend == "transpiler":
+            interpreter = Transpiler.load_program(source, code_cache_dir, input_func, output)
+            timings["load"] = time.perf_counter() - start
+            return execute(interpreter, result, time.perf_counter(), timeout)
+
+        token_stream = TokenStream.TokenStream.from_lexer(*lexer.gen_tokens(source))
+        timings["lex"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        syntax_analyzer = SyntaxAnalyzer.SyntaxAnalyzer(token_stream)
+        ast = syntax_analyzer.analyze()
+        timings["parse"] = time.perf_counter() - start
+        if ast is None:
+            result["errors"] = syntax_analyzer.console
+            return result
+
+        start = time.perf_counter()
+        ast = Optimizer.Optimizer(ast).optimize()
+        timings["optimize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if backend == "bytecode":
+            interpreter = Bytecode.load_program(ast, input_func, output)
+        else:
+            interpreter = Interpreter.Interpreter(ast, input_func, output)
+        return execute(interpreter, result, start, timeout)
+    except OSError as e:
+        result["errors"].append(f"{e.strerror}: {e.filename}")
+    except SyntaxError as e:
+        result["errors"].append(str(e))
+    except Exception as e:
+        # Fail this file alone; raised out of a worker, it would throw away the whole report
+        result["errors"].append(f"{type(e).__name__}: {e}")
+    return result
+
+
+def execute(interpreter, result, start, timeout=None):
+    """Run a loaded program, recording its outcome, errors, counters and execute timing since start into result.
+
+    A timer thread cancels the program once timeout seconds (if any) are up; the worker is then free for the
+    next file.
+    """
+    timer = threading.Timer(timeout, interpreter.cancel) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        result["ok"] = interpreter.run()
+    finally:
+        if timer:
+            timer.cancel()
+    result["timings"]["execute"] = time.perf_counter() - start
+    result["errors"] = [f"Timed out after {timeout}s"] if interpreter.cancelled else interpreter.console
+    result["stats"] = interpreter.stats()
+    return result
+
+
+def collect_paths(paths):
+    """Expand directories into the .lol files inside them, keeping the order given."""
+    collected = []
+    for path in paths:
+        if os.path.isdir(path):
+            collected.extend(sorted(glob.glob(os.path.join(path, "**", "*.lol"), recursive=True)))
+        else:
+            collected.append(path)
+    return collected
+
+
+def run_batch(paths, jobs=None, chunksize=None, backend="interpreter", code_cache_dir=None,
+              timeout=DEFAULT_TIMEOUT):
+    """Run every file across a pool of jobs worker processes and build the report."""
+    jobs = jobs or os.cpu_count() or 1
+    # Hand out several files per task so small programs don't drown in pickling round trips
+    chunksize = chunksize or max(1, len(paths) // (jobs * 4))
+    run = partial(run_one, backend=backend, code_cache_dir=code_cache_dir, timeout=timeout)
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [run(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=init_worker) as pool:
+            results = list(pool.map(run, paths, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    passed = sum(result["ok"] for result in results)
+    return {
+        "jobs": jobs,
+        "files": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "elapsed": elapsed,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many LOLCODE programs across a process pool.")
+    parser.add_argument("paths", nargs="+", help=".lol files, or directories to search for them")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--report", metavar="FILE", help="write the JSON report to FILE instead of stdout")
+    parser.add_argument("--backend", choices=BACKENDS, default="interpreter",
+                        help="run on the closure interpreter (default), the bytecode VM or transpiled to Python")
+    parser.add_argument("--cache", action="store_true",
+                        help="keep transpiled programs in the on-disk code cache (needs --backend transpiler)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, metavar="SECONDS",
+                        help=f"cancel each program still running after SECONDS (default {DEFAULT_TIMEOUT:g}, 0 for "
+                             f"no limit)")
+    args = parser.parse_args(argv)
+    if args.cache and args.backend != "transpiler":
+        parser.error("--cache needs --backend transpiler")
+
+    code_cache_dir = Transpiler.DEFAULT_CACHE_DIR if args.cache else None
+    report = run_batch(collect_paths(args.paths), args.jobs, backend=args.backend, code_cache_dir=code_cache_dir,
+                       timeout=args.timeout)
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    print(f"{report['passed']}/{report['files']} passed in {report['elapsed']:.2f}s with {report['jobs']} jobs",
+          file=sys.stderr)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
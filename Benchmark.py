@@ -0,0 +1,912 @@
+import asyncio
+import contextlib
+import glob
+import io
+import mmap
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import Batch
+import Service
+import OutputSink
+import InputProvider
+import LexicalAnalyzer
+import ParseCache
+import Pipeline
+import SyntaxAnalyzer
+import TokenStream
+import Interpreter
+import Optimizer
+import TypeInference
+import Bytecode
+import Transpiler
+
+
+def parse(source):
+    """Lex and parse source code the same way the GUI does, returning the AST."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Pipeline.parse(source)[0]
+
+
+def best_time(func, repeat=5):
+    """Run func repeat times and return the fastest wall-clock time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate the memory held by obj and everything it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def gen_statements_program(statement_count):
+    """Generate a straight-line program of arithmetic-heavy statements."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A x ITZ 1", "        I HAS A y ITZ 2.5",
+             "        I HAS A s ITZ \"\"", "    BUHBYE"]
+    templates = [
+        "    x R MOD OF SUM OF PRODUKT OF x AN 3 AN {i} AN 1000",
+        "    y R QUOSHUNT OF SUM OF y AN x AN 2",
+        "    s R SMOOSH \"n\" AN MOD OF x AN 10",
+        "    x R BIGGR OF DIFF OF x AN {i} AN SMALLR OF x AN 7",
+        "    SUM OF x AN y",
+        "    s R MAEK x YARN",
+    ]
+    for i in range(statement_count):
+        lines.append(templates[i % len(templates)].format(i=i % 97))
+    lines.append("KTHXBYE")
+    return "\n".join(lines)
+
+
+class TreeWalker:
+    """Naive evaluator that dispatches on every node visit, used as the baseline."""
+
+    def __init__(self, ast):
+        self.ast = ast
+        self.symbol_table = {"IT": None}
+        self.console = []
+
+    def run(self):
+        for statement in self.ast[0]:
+            self.execute(statement)
+
+    def execute(self, node):
+        if node["type"] == "print":
+            self.console.append("".join(Interpreter.to_yarn(self.evaluate(o)) for o in node["operand"]))
+        elif node["type"] == "var_dec_list":
+            for var_dec in node["declarations"]:
+                initialized = var_dec["initialized"]
+                self.symbol_table[var_dec["name"]] = self.evaluate(initialized["value"]) if initialized else None
+        elif node["type"] == "assignment":
+            self.symbol_table[node["name"]] = self.evaluate(node["value"])
+        elif node["type"] == "recast":
+            self.symbol_table[node["name"]] = Interpreter.cast(self.symbol_table[node["name"]], node["datatype"])
+        else:
+            self.symbol_table["IT"] = self.evaluate(node)
+
+    def evaluate(self, node):
+        if node["type"] == "literal":
+            return Interpreter.literal_value(node["value"])
+        elif node["type"] == "identifier":
+            return self.symbol_table[node["value"]]
+        elif node["type"] == "math_expr":
+            left = Interpreter.to_numeric(self.evaluate(node["left"]))
+            right = Interpreter.to_numeric(self.evaluate(node["right"]))
+            return Interpreter.MATH_OPERATORS[node["operator"]](left, right)
+        elif node["type"] == "smoosh_expr":
+            return "".join(Interpreter.to_yarn(self.evaluate(part)) for part in node["parts"])
+        elif node["type"] == "typecast":
+            return Interpreter.cast(self.evaluate(node["operand"]), node["datatype"])
+        raise SyntaxError(f"Cannot execute node of type '{node['type']}'")
+
+
+def bench_interpreter(statement_count=20000):
+    """Statements per second: closure-compiled Interpreter vs. naive tree walk."""
+    ast = parse(gen_statements_program(statement_count))
+    total = statement_count + 1  # the WAZZUP block counts as one statement
+
+    walker_time = best_time(lambda: TreeWalker(ast).run())
+
+    interpreter = Interpreter.Interpreter(ast)
+    compile_time = best_time(interpreter.compile, repeat=1)
+    closure_time = best_time(interpreter.program)
+
+    print(f"tree walk:        {total / walker_time:12,.0f} statements/s")
+    print(f"closure compiled: {total / closure_time:12,.0f} statements/s "
+          f"({walker_time / closure_time:.2f}x, compiled once in {compile_time * 1000:.1f} ms)")
+
+
+def bench_variables(statement_count=20000):
+    """Variable-heavy statements per second: slot-resolved closures vs. the name-keyed tree walk."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A a ITZ 1", "        I HAS A b ITZ 2", "        I HAS A c ITZ 3",
+             "    BUHBYE"]
+    templates = ["    a R SUM OF b AN c", "    b R DIFF OF a AN c", "    c R PRODUKT OF a AN 0", "    c R b",
+                 "    SUM OF a AN b"]
+    lines += [templates[i % len(templates)] for i in range(statement_count)]
+    lines.append("KTHXBYE")
+    ast = parse("\n".join(lines))
+
+    walker_time = best_time(lambda: TreeWalker(ast).run())
+    interpreter = Interpreter.Interpreter(ast)
+    interpreter.compile()
+    slot_time = best_time(interpreter.program, repeat=10)
+    print(f"name-keyed tree walk: {statement_count / walker_time:12,.0f} statements/s")
+    print(f"slot-resolved:        {statement_count / slot_time:12,.0f} statements/s "
+          f"({walker_time / slot_time:.2f}x, {len(interpreter.scope)} slots)")
+
+
+def bench_optimizer(statement_count=20000):
+    """Templated, literal-heavy program: run time with and without constant folding."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A x ITZ 0", "        I HAS A s ITZ \"\"", "    BUHBYE"]
+    templates = [
+        "    x R SUM OF x AN PRODUKT OF 60 AN 60",
+        "    x R MOD OF x AN QUOSHUNT OF 1000000 AN SUM OF 2 AN 3",
+        "    s R SMOOSH \"id-\" AN \"row-\" AN MAEK 3.14159 YARN",
+        "    s R MAEK SUM OF 4 AN 8 YARN",
+        "    x IS NOW A NUMBR",
+    ]
+    lines += [templates[i % len(templates)] for i in range(statement_count)]
+    lines.append("KTHXBYE")
+    ast = parse("\n".join(lines))
+
+    optimizer = Optimizer.Optimizer(ast)
+    optimize_time = best_time(lambda: Optimizer.Optimizer(ast).optimize(), repeat=1)
+    optimized = optimizer.optimize()
+
+    def run_time(tree):
+        interpreter = Interpreter.Interpreter(tree)
+        interpreter.compile()
+        return best_time(interpreter.program)
+
+    plain_time = run_time(ast)
+    folded_time = run_time(optimized)
+    print(f"{statement_count:,} statements, {optimizer.folded:,} nodes folded in {optimize_time * 1000:.1f} ms, "
+          f"{len(ast[0]) - len(optimized[0]):,} statements dropped")
+    print(f"unoptimized: {plain_time * 1000:8.2f} ms")
+    print(f"folded:      {folded_time * 1000:8.2f} ms ({plain_time / folded_time:.2f}x)")
+
+
+def bench_types(statement_count=20000):
+    """Arithmetic and comparisons on proven NUMBRs and NUMBARs: specialized vs. casting closures."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A x ITZ 1", "        I HAS A y ITZ 2.5", "        I HAS A t ITZ FAIL",
+             "    BUHBYE"]
+    templates = [
+        "    x R MOD OF SUM OF PRODUKT OF x AN 3 AN 7 AN 1000",
+        "    x R QUOSHUNT OF DIFF OF x AN 1 AN 2",
+        "    y R SUM OF PRODUKT OF y AN 0.5 AN x",
+        "    t R BOTH SAEM x AN BIGGR OF x AN 10",
+        "    t R EITHER OF t AN DIFFRINT y AN 2.5",
+    ]
+    lines += [templates[i % len(templates)] for i in range(statement_count)]
+    lines.append("KTHXBYE")
+    ast = parse("\n".join(lines))
+
+    inference = TypeInference.TypeInference(ast)
+    infer_time = best_time(lambda: TypeInference.TypeInference(ast).infer(), repeat=1)
+    types = inference.infer()
+
+    def run_time(types):
+        interpreter = Interpreter.Interpreter(ast, types=types)
+        interpreter.compile()
+        return best_time(interpreter.program)
+
+    casting_time = run_time({})
+    specialized_time = run_time(types)
+    proven = sum(datatype is not None for datatype in types.values())
+    print(f"{statement_count:,} statements, {proven:,}/{len(types):,} expressions typed in {infer_time * 1000:.1f} ms")
+    print(f"casting:     {casting_time * 1000:8.2f} ms")
+    print(f"specialized: {specialized_time * 1000:8.2f} ms ({casting_time / specialized_time:.2f}x)")
+
+
+class SteppedInterpreter(Interpreter.Interpreter):
+    """The Interpreter without the counted-loop fast path, re-evaluating every loop condition."""
+    def counted_loop(self, node):
+        return None
+
+
+def bench_loops(iterations=1000000):
+    """Counted loops: native range iteration vs. evaluating the condition and stepping on every pass."""
+    shapes = {
+        "TIL BOTH SAEM i AN n": "TIL BOTH SAEM i AN n",
+        "WILE ... SMALLR OF i AN n": "WILE BOTH SAEM i AN SMALLR OF i AN n",
+    }
+    for label, condition in shapes.items():
+        ast = parse("\n".join([
+            "HAI",
+            "    WAZZUP",
+            "        I HAS A i ITZ 0",
+            f"        I HAS A n ITZ {iterations}",
+            "        I HAS A s ITZ 0",
+            "    BUHBYE",
+            f"    IM IN YR loop UPPIN YR i {condition}",
+            "        s R SUM OF s AN i",
+            "    IM OUTTA YR loop",
+            "KTHXBYE",
+        ]))
+
+        def run_time(interpreter_class):
+            interpreter = interpreter_class(ast)
+            interpreter.compile()
+            return best_time(interpreter.program, repeat=3)
+
+        stepped_time = run_time(SteppedInterpreter)
+        counted_time = run_time(Interpreter.Interpreter)
+        print(f"{label}, {iterations:,} iterations")
+        print(f"  stepped: {stepped_time * 1000:8.2f} ms")
+        print(f"  counted: {counted_time * 1000:8.2f} ms ({stepped_time / counted_time:.2f}x)")
+
+
+class LinearSwitchInterpreter(Interpreter.Interpreter):
+    """The Interpreter comparing IT with each OMG in turn, as WTF? ran before its jump table."""
+    def compile_switch(self, node):
+        values = tuple(Interpreter.literal_value(case["value"]["value"]) for case in node["cases"])
+        blocks = [self.compile_block(case["body"]) for case in node["cases"]]
+        if node["default"] is not None:
+            blocks.append(self.compile_block(node["default"]))
+        blocks = tuple(blocks)
+        variables = self.variables
+
+        def wtf():
+            it = variables[0]
+            start = next((index for index, value in enumerate(values) if Interpreter.same(it, value)), len(values))
+            try:
+                for block in blocks[start:]:
+                    block()
+            except Interpreter.LoopExit:
+                pass
+        return wtf
+
+
+def gen_switch_program(case_count, iterations):
+    """Generate a loop that runs a WTF? of case_count OMG cases, each ending in GTFO, landing on every case in turn."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A i ITZ 0", "        I HAS A s ITZ 0", "    BUHBYE",
+             f"    IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}",
+             f"        MOD OF i AN {case_count}",
+             "        WTF?"]
+    for case in range(case_count):
+        lines += [f"        OMG {case}", f"            s R SUM OF s AN {case}", "            GTFO"]
+    lines += ["        OMGWTF", "            s R 0", "        OIC", "    IM OUTTA YR loop", "    VISIBLE s", "KTHXBYE"]
+    return "\n".join(lines)
+
+
+def bench_switch(case_counts=(4, 32, 256), iterations=100000):
+    """WTF? dispatch: a jump table from each OMG literal vs. comparing IT with every case in turn."""
+    for case_count in case_counts:
+        ast = parse(gen_switch_program(case_count, iterations))
+
+        def run_time(interpreter_class):
+            interpreter = interpreter_class(ast)
+            interpreter.compile()
+            return best_time(interpreter.program, repeat=3)
+
+        linear_time = run_time(LinearSwitchInterpreter)
+        table_time = run_time(Interpreter.Interpreter)
+        print(f"{case_count} cases, {iterations:,} dispatches")
+        print(f"  linear:     {linear_time * 1000:8.2f} ms")
+        print(f"  jump table: {table_time * 1000:8.2f} ms ({linear_time / table_time:.2f}x)")
+
+
+FIBONACCI_PROGRAM = """HAI
+    HOW IZ I fib YR n
+        IM IN YR base WILE BOTH SAEM n AN SMALLR OF n AN 1
+            FOUND YR n
+        IM OUTTA YR base
+        FOUND YR SUM OF I IZ fib YR DIFF OF n AN 1 MKAY AN I IZ fib YR DIFF OF n AN 2 MKAY
+    IF U SAY SO
+    VISIBLE I IZ fib YR {n} MKAY
+KTHXBYE"""
+
+
+def bench_functions(sizes=(15, 20, 25)):
+    """Recursive fibonacci: memoized pure function calls vs. evaluating every call."""
+    for n in sizes:
+        ast = parse(FIBONACCI_PROGRAM.format(n=n))
+        plain = Interpreter.Interpreter(ast, call_cache_size=0)
+        plain_time = best_time(plain.run, repeat=1)
+        memoized_time = best_time(lambda: Interpreter.Interpreter(ast).run(), repeat=3)
+        interpreter = Interpreter.Interpreter(ast)
+        interpreter.run()
+        counters = interpreter.stats()["call_caches"]["fib"]
+        print(f"fib({n}) = {interpreter.console[0]:>6}: {plain_time * 1000:9.2f} ms evaluating every call, "
+              f"{memoized_time * 1000:6.2f} ms memoized ({plain_time / memoized_time:,.0f}x, "
+              f"{counters['hit_rate']:.0%} hit rate)")
+
+
+RECURSION_PROGRAM = """HAI
+    HOW IZ I depth YR n
+        IM IN YR base WILE BOTH SAEM n AN 0
+            FOUND YR 0
+        IM OUTTA YR base
+        FOUND YR SUM OF 1 AN I IZ depth YR DIFF OF n AN 1 MKAY
+    IF U SAY SO
+    HOW IZ I count YR n AN YR total
+        IM IN YR base WILE BOTH SAEM n AN 0
+            FOUND YR total
+        IM OUTTA YR base
+        FOUND YR I IZ count YR DIFF OF n AN 1 AN YR SUM OF total AN 1 MKAY
+    IF U SAY SO
+    VISIBLE I IZ {function} YR {arguments} MKAY
+KTHXBYE"""
+
+
+def bench_recursion(depths=(1000, 10000, 100000)):
+    """Recursion far past Python's recursion limit: plain calls on frames vs. tail calls reusing one."""
+    print(f"Python recursion limit: {sys.getrecursionlimit():,}")
+    for depth in depths:
+        for label, function, arguments in (("plain", "depth", depth), ("tail", "count", f"{depth} AN YR 0")):
+            ast = parse(RECURSION_PROGRAM.format(function=function, arguments=arguments))
+            interpreter = Interpreter.Interpreter(ast, call_cache_size=0)
+            interpreter.compile()
+            run_time = best_time(lambda: interpreter.run(), repeat=1)
+            result = interpreter.console[0] if interpreter.console else None
+            print(f"{label:>5} calls, depth {depth:>7,}: {run_time * 1000:8.2f} ms "
+                  f"({run_time / depth * 1e6:.2f} us per call), found {result}")
+
+
+def bench_bytecode(statement_count=20000):
+    """Statements per second and memory: bytecode VM vs. naive tree walk; recursive calls vs. the Interpreter."""
+    ast = parse(gen_statements_program(statement_count))
+    total = statement_count + 1
+
+    walker_time = best_time(lambda: TreeWalker(ast).run())
+    code_object = Bytecode.Compiler(ast).compile()
+    vm_time = best_time(lambda: Interpreter.VirtualMachine(code_object).execute())
+
+    ast_size = deep_sizeof(ast)
+    code_size = deep_sizeof(code_object.code) + deep_sizeof(code_object.consts) + deep_sizeof(code_object.names)
+
+    print(f"tree walk:   {total / walker_time:12,.0f} statements/s, AST {ast_size / 1024:10,.0f} KiB")
+    print(f"bytecode VM: {total / vm_time:12,.0f} statements/s, code {code_size / 1024:9,.0f} KiB "
+          f"({walker_time / vm_time:.2f}x faster, {ast_size / code_size:.1f}x smaller)")
+
+    # Calls run on the VM's own frame stack; the Interpreter is shown without memoization, which the VM lacks
+    ast = parse(FIBONACCI_PROGRAM.format(n=20))
+    closure_time = best_time(lambda: Interpreter.Interpreter(ast, call_cache_size=0).run(), repeat=3)
+    vm_time = best_time(lambda: Bytecode.load_program(ast).run(), repeat=3)
+    print(f"fib(20), every call evaluated: closure compiled {closure_time * 1000:8.2f} ms, "
+          f"bytecode VM {vm_time * 1000:8.2f} ms ({closure_time / vm_time:.2f}x)")
+
+
+def bench_transpiler(statement_count=20000):
+    """Statements per second of transpiled Python, and cold vs. warm (cached) load time."""
+    source = gen_statements_program(statement_count)
+    total = statement_count + 1
+    cache_dir = tempfile.mkdtemp()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cold_time = best_time(lambda: Transpiler.load_program(source, cache_dir), repeat=1)
+    warm_time = best_time(lambda: Transpiler.load_program(source, cache_dir))
+    program = Transpiler.load_program(source, cache_dir)
+
+    interpreter = Interpreter.Interpreter(parse(source))
+    interpreter.compile()
+    closure_time = best_time(interpreter.program)
+    transpiled_time = best_time(program.run)
+
+    print(f"closure compiled: {total / closure_time:12,.0f} statements/s")
+    print(f"transpiled:       {total / transpiled_time:12,.0f} statements/s "
+          f"({closure_time / transpiled_time:.2f}x)")
+    print(f"load: cold {cold_time * 1000:.1f} ms (lex, parse, compile), warm {warm_time * 1000:.1f} ms (cache hit)")
+
+    # Functions become Python functions; the Interpreter is shown without memoization, which they lack
+    source = FIBONACCI_PROGRAM.format(n=20)
+    ast = parse(source)
+    closure_time = best_time(lambda: Interpreter.Interpreter(ast, call_cache_size=0).run(), repeat=3)
+    program = Transpiler.load_program(source, cache_dir)
+    transpiled_time = best_time(program.run, repeat=3)
+    print(f"fib(20), every call evaluated: closure compiled {closure_time * 1000:8.2f} ms, "
+          f"transpiled {transpiled_time * 1000:8.2f} ms ({closure_time / transpiled_time:.2f}x)")
+
+
+def legacy_gen_tokens(code):
+    """The lexer loop as it was: pattern rebuilt per call, linear classification search, debug print."""
+    lexer = LexicalAnalyzer.LexicalAnalyzer()
+    token_rules = "|".join(f"(?P<{name}>{pattern})" for name, pattern in lexer.rules)
+    re.purge()
+    tokens = []
+    for match in re.finditer(token_rules, code):
+        token_type = match.lastgroup
+        if token_type not in ("TAB", "WHITESPACE"):
+            classification = next((key for key, value in lexer.token_classifications.items() if token_type in value), "Unclassified")
+            tokens.append(classification)
+            print(f"Token: {match.group()}, Type: {token_type}, Classification: {classification}")
+    return tokens
+
+
+def gen_lexer_input(megabytes=4):
+    """Generate a multi-megabyte input by repeating the sample programs."""
+    samples = "\n".join(open(path).read() for path in sorted(glob.glob("samplecodes/*.lol")))
+    return samples * (megabytes * 1024 * 1024 // len(samples) + 1)
+
+
+def bench_lexer(megabytes=4):
+    """Tokens per second: precompiled, table-classified lexer vs. the legacy loop."""
+    source = gen_lexer_input(megabytes)
+    token_count = len(LexicalAnalyzer.LexicalAnalyzer().gen_tokens(source)[0])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_time = best_time(lambda: legacy_gen_tokens(source), repeat=1)
+    lexer_time = best_time(lambda: LexicalAnalyzer.LexicalAnalyzer().gen_tokens(source), repeat=3)
+
+    print(f"input: {len(source) / 1024 / 1024:.1f} MiB, {token_count:,} tokens")
+    print(f"legacy lexer: {token_count / legacy_time:12,.0f} tokens/s")
+    print(f"lexer:        {token_count / lexer_time:12,.0f} tokens/s ({legacy_time / lexer_time:.2f}x)")
+
+
+def peak_memory(func):
+    """Run func and return its peak traced memory in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stream_lexer(megabytes=8):
+    """Peak memory: streaming over an mmap vs. reading the file and building token lists."""
+    path = os.path.join(tempfile.mkdtemp(), "large.lol")
+    with open(path, 'w') as file:
+        file.write(gen_lexer_input(megabytes))
+
+    def read_and_lex():
+        with open(path, 'r') as file:
+            LexicalAnalyzer.LexicalAnalyzer().gen_tokens(file.read())
+
+    def stream():
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for _ in LexicalAnalyzer.LexicalAnalyzer().iter_tokens(mapped):
+                pass
+
+    list_peak = peak_memory(read_and_lex)
+    stream_peak = peak_memory(stream)
+    stream_time = best_time(stream, repeat=1)
+    print(f"input: {os.path.getsize(path) / 1024 / 1024:.1f} MiB, chunk size {LexicalAnalyzer.CHUNK_SIZE // 1024} KiB")
+    print(f"read + gen_tokens: peak {list_peak / 1024 / 1024:8.1f} MiB")
+    print(f"iter_tokens(mmap): peak {stream_peak / 1024 / 1024:8.1f} MiB, "
+          f"{os.path.getsize(path) / 1024 / 1024 / stream_time:.1f} MiB/s")
+
+
+def bench_token_stream(megabytes=2):
+    """Per-token memory: TokenStream arrays vs. the old list of {lexeme: classification} dicts."""
+    tokens, lexemes, rows, columns = LexicalAnalyzer.LexicalAnalyzer().gen_tokens(gen_lexer_input(megabytes))
+
+    def build_dicts():
+        final_tokens = [{lexeme: token} for token, lexeme in zip(tokens, lexemes)
+                        if token not in TokenStream.IGNORED_KINDS]
+        keys = [list(token.keys())[0] for token in final_tokens]
+        types = [list(token.values())[0] for token in final_tokens]
+        return final_tokens, keys, types
+
+    dicts = build_dicts()
+    stream = TokenStream.TokenStream.from_lexer(tokens, lexemes, rows, columns)
+    dict_size = deep_sizeof(dicts)
+    stream_size = deep_sizeof(stream.kinds) + deep_sizeof(stream.lexemes) + \
+        deep_sizeof(stream.rows) + deep_sizeof(stream.columns)
+    count = len(stream)
+    print(f"{count:,} tokens")
+    print(f"dict list + keys + types (no positions): {dict_size / count:7.1f} bytes/token")
+    print(f"TokenStream (with rows and columns):     {stream_size / count:7.1f} bytes/token "
+          f"({dict_size / stream_size:.1f}x smaller)")
+
+
+def bench_incremental_lexer(megabytes=1):
+    """Re-lexing after a one-line edit: IncrementalLexer vs. lexing the whole buffer again."""
+    source = gen_lexer_input(megabytes)
+    lines = source.split("\n")
+    lexer = LexicalAnalyzer.IncrementalLexer()
+    lexer.update(source)
+
+    edits = []
+    for count in range(10):
+        lines[len(lines) * count // 10] += f" BTW edit {count}"
+        edits.append("\n".join(lines))
+
+    full_time = best_time(lambda: LexicalAnalyzer.LexicalAnalyzer().gen_tokens(edits[0]), repeat=3)
+    start = time.perf_counter()
+    for edited in edits:
+        lexer.update(edited)
+    incremental_time = (time.perf_counter() - start) / len(edits)
+
+    print(f"input: {len(lines):,} lines")
+    print(f"full re-lex:        {full_time * 1000:8.2f} ms")
+    print(f"incremental update: {incremental_time * 1000:8.2f} ms ({lexer.relexed_lines} line re-lexed, "
+          f"{full_time / incremental_time:.0f}x)")
+
+
+def bench_incremental_parser(statement_count=20000):
+    """Re-parsing after a one-line edit: reusing unchanged statements vs. a full parse."""
+    lines = gen_statements_program(statement_count).split("\n")
+    lexer = LexicalAnalyzer.IncrementalLexer()
+    edit = lexer.update("\n".join(lines))
+    with contextlib.redirect_stdout(io.StringIO()):
+        previous = SyntaxAnalyzer.SyntaxAnalyzer(TokenStream.TokenStream.from_lexer(*lexer.gen_tokens()))
+        previous.analyze()
+
+        lines[len(lines) // 2] = "    x R SUM OF x AN 1"
+        edit = lexer.update("\n".join(lines))
+        stream = TokenStream.TokenStream.from_lexer(*lexer.gen_tokens())
+        full_time = best_time(lambda: SyntaxAnalyzer.SyntaxAnalyzer(stream).analyze(), repeat=3)
+        incremental = SyntaxAnalyzer.SyntaxAnalyzer(stream, previous=previous, edit=edit)
+        incremental_time = best_time(incremental.analyze, repeat=1)
+
+    print(f"{statement_count:,} statements")
+    print(f"full parse:        {full_time * 1000:8.2f} ms")
+    print(f"incremental parse: {incremental_time * 1000:8.2f} ms ({incremental.reparsed_statements} statement "
+          f"re-parsed, {full_time / incremental_time:.0f}x)")
+
+
+class RecursiveSyntaxAnalyzer(SyntaxAnalyzer.SyntaxAnalyzer):
+    """The expression parser as it was: one Python call per nesting level."""
+    def parse_operand(self, math=False):
+        token = self.current_token()
+        if self.current_type() in {"Literal", "Identifier"}:
+            node_type = "literal" if self.current_type() == "Literal" else "identifier"
+            self.advance()
+            return {"type": node_type, "value": token}
+        self.advance()
+        if token in SyntaxAnalyzer.MATH_OPERATORS:
+            left = self.parse_operand(math=True)
+            self.expect("AN")
+            return {"type": "math_expr", "operator": token, "left": left, "right": self.parse_operand(math=True)}
+        if token == "I IZ":
+            name = self.current_token()
+            self.expect_identifier()
+            arguments = []
+            if self.current_token() == "YR":
+                self.advance()
+                arguments.append(self.parse_operand())
+                while self.at_next_argument():
+                    self.index += 2
+                    arguments.append(self.parse_operand())
+            self.expect("MKAY")
+            return {"type": "call", "name": name, "arguments": arguments}
+        if math:
+            raise SyntaxError(f"Expected math operand, but got '{token}'")
+        if token in SyntaxAnalyzer.BOOL_OPERATORS:
+            operands = [self.parse_operand()]
+            if token in SyntaxAnalyzer.BINARY_BOOL_OPERATORS:
+                self.expect("AN")
+                operands.append(self.parse_operand())
+            elif token in SyntaxAnalyzer.INFINITE_BOOL_OPERATORS:
+                while self.current_token() == "AN":
+                    self.advance()
+                    operands.append(self.parse_operand())
+                self.expect("MKAY")
+            return {"type": "bool_expr", "operator": token, "operands": operands}
+        if token in SyntaxAnalyzer.COMPARISON_OPERATORS:
+            left = self.parse_operand()
+            self.expect("AN")
+            return {"type": "comparison_expr", "operator": token, "left": left, "right": self.parse_operand()}
+        if token == "SMOOSH":
+            parts = [self.parse_operand()]
+            while self.current_token() == "AN" and not self.at_next_argument():
+                self.advance()
+                parts.append(self.parse_operand())
+            return {"type": "smoosh_expr", "parts": parts}
+        if token == "MAEK":
+            operand = self.parse_operand()
+            datatype = self.current_token()
+            if self.current_type() != "Datatype Keyword":
+                raise SyntaxError(f"Expected datatype, but got '{datatype}'")
+            self.advance()
+            return {"type": "typecast", "datatype": datatype, "operand": operand}
+        raise SyntaxError(f"Expected operand, but got '{token}'")
+
+
+# Deeply nested expressions of each form, as a code generator might write them, by nesting depth
+DEEP_EXPRESSIONS = {
+    "SUM OF SUM OF ... AN 1": lambda depth: "SUM OF " * depth + "1" + " AN 1" * depth,
+    "BOTH OF WIN AN BOTH OF ...": lambda depth: "BOTH OF WIN AN " * depth + "WIN",
+    "SMOOSH SMOOSH ... \"a\"": lambda depth: "SMOOSH " * depth + '"a"',
+}
+
+
+def bench_deep_expressions(depths=(10000, 100000, 1000000), shallow_depth=500, statement_count=20000):
+    """Deeply nested expressions: explicit-stack parsing vs. one Python call per nesting level."""
+    def parse_time(analyzer_class, stream, repeat=3):
+        return best_time(lambda: analyzer_class(stream).analyze(), repeat)
+
+    stream = Pipeline.lex(gen_statements_program(statement_count))
+    recursive_time = parse_time(RecursiveSyntaxAnalyzer, stream)
+    explicit_time = parse_time(SyntaxAnalyzer.SyntaxAnalyzer, stream)
+    print(f"{statement_count:,} ordinary statements: recursive {recursive_time * 1000:8.2f} ms, "
+          f"explicit stack {explicit_time * 1000:8.2f} ms ({recursive_time / explicit_time:.2f}x)")
+    for label, gen_expression in DEEP_EXPRESSIONS.items():
+        print(label)
+        stream = Pipeline.lex(f"HAI\nVISIBLE {gen_expression(shallow_depth)}\nKTHXBYE")
+        recursive_time = parse_time(RecursiveSyntaxAnalyzer, stream)
+        explicit_time = parse_time(SyntaxAnalyzer.SyntaxAnalyzer, stream)
+        print(f"  depth {shallow_depth:>9,}: recursive {recursive_time * 1000:8.2f} ms, "
+              f"explicit stack {explicit_time * 1000:8.2f} ms ({recursive_time / explicit_time:.2f}x)")
+        for depth in depths:
+            stream = Pipeline.lex(f"HAI\nVISIBLE {gen_expression(depth)}\nKTHXBYE")
+            analyzer = RecursiveSyntaxAnalyzer(stream)
+            try:
+                analyzer.analyze()
+                recursive = "parses"
+            except RecursionError:
+                recursive = "RecursionError"
+            explicit_time = parse_time(SyntaxAnalyzer.SyntaxAnalyzer, stream, repeat=1)
+            print(f"  depth {depth:>9,}: recursive {recursive:>14}, explicit stack {explicit_time * 1000:8.2f} ms "
+                  f"({explicit_time / depth * 1e9:.0f} ns per level)")
+
+
+class ChainedSyntaxAnalyzer(SyntaxAnalyzer.SyntaxAnalyzer):
+    """Statement parsing as it was: an if/elif chain over set literals, re-reading the current token per test."""
+    def parse_statement_list(self, terminators=frozenset({"KTHXBYE"})):
+        statements = []
+        while self.current_token() and self.current_token() not in terminators:
+            row = self.rows[self.index]
+            statement = self.parse_statement()
+            statement["row"] = row
+            statements.append(statement)
+        return statements
+
+    def parse_statement(self):
+        if self.current_token() == "VISIBLE":
+            return self.parse_print()
+        elif self.current_token() == "WAZZUP":
+            return self.parse_var_dec_list()
+        elif self.current_type() == "Identifier":
+            if self.index + 1 < len(self.keys) and self.keys[self.index + 1] == "R":
+                return self.parse_assignment()
+            elif self.index + 1 < len(self.keys) and self.keys[self.index + 1] == "IS NOW A":
+                return self.parse_recast()
+            else:
+                return self.parse_operand()
+        elif self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF"}:
+            return self.parse_operand()
+        elif self.current_token() in {"BOTH OF", "EITHER OF", "WON OF", "NOT", "ALL OF", "ANY OF",
+                                      "BOTH SAEM", "DIFFRINT"}:
+            return self.parse_operand()
+        elif self.current_token() == "GIMMEH":
+            return self.parse_input()
+        elif self.current_token() == "IM IN YR":
+            return self.parse_loop()
+        elif self.current_token() == "GTFO":
+            return self.parse_break()
+        elif self.current_token() == "HOW IZ I":
+            return self.parse_function()
+        elif self.current_token() == "FOUND YR":
+            return self.parse_return()
+        elif self.current_token() == "I IZ":
+            return self.parse_operand()
+        else:
+            raise SyntaxError(f"Unexpected statement: {self.current_token()}")
+
+
+def gen_control_flow_program(block_count):
+    """Generate a program of short statements nested in loops, the statements parse_statement dispatches most."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A i ITZ 0", "        I HAS A n ITZ 0", "    BUHBYE"]
+    for block in range(block_count):
+        lines += [
+            f"    IM IN YR loop{block} UPPIN YR i TIL BOTH SAEM i AN 3",
+            "        GIMMEH n",
+            "        VISIBLE n",
+            "        n IS NOW A NUMBR",
+            "        DIFFRINT n AN i",
+            "        NOT n",
+            "        GTFO",
+            f"    IM OUTTA YR loop{block}",
+        ]
+    lines.append("KTHXBYE")
+    return "\n".join(lines)
+
+
+def bench_parser(statement_count=100000):
+    """Parse throughput on large files: the statement dispatch table vs. the if/elif chain it replaced."""
+    programs = {
+        "arithmetic statements": (gen_statements_program(statement_count), statement_count),
+        "short statements in loops": (gen_control_flow_program(statement_count // 7), statement_count // 7 * 7),
+    }
+    for label, (source, count) in programs.items():
+        stream = Pipeline.lex(source)
+        chained_time = table_time = float("inf")
+        for _ in range(5):
+            # Alternate the two, so garbage one parse leaves behind weighs on both alike
+            chained_time = min(chained_time, best_time(lambda: ChainedSyntaxAnalyzer(stream).analyze(), repeat=1))
+            table_time = min(table_time, best_time(lambda: SyntaxAnalyzer.SyntaxAnalyzer(stream).analyze(), repeat=1))
+        print(f"{label}, {count:,} statements")
+        print(f"  if/elif chain:  {count / chained_time:10,.0f} statements/s")
+        print(f"  dispatch table: {count / table_time:10,.0f} statements/s ({chained_time / table_time:.2f}x)")
+
+
+def bench_parse_cache(statement_count=20000):
+    """Cold vs. warm lex + parse through the on-disk ParseCache."""
+    source = gen_statements_program(statement_count)
+    cache = ParseCache.ParseCache(tempfile.mkdtemp())
+    with contextlib.redirect_stdout(io.StringIO()):
+        cold_time = best_time(lambda: cache.parse(source), repeat=1)
+    warm_time = best_time(lambda: cache.parse(source))
+    print(f"{statement_count:,} statements")
+    print(f"cold (lex + parse + store): {cold_time * 1000:8.2f} ms")
+    print(f"warm (load from cache):     {warm_time * 1000:8.2f} ms ({cold_time / warm_time:.0f}x)")
+    print(f"counters: {cache.stats()}")
+
+
+def bench_cold_start(repeat=10):
+    """Process start to exit for a trivial script: headless CLI vs. a bare interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(here, "samplecodes", "this.lol")
+
+    def run(*args):
+        subprocess.run([sys.executable, *args], cwd=here, check=True, stdout=subprocess.DEVNULL)
+
+    bare_time = best_time(lambda: run("-c", "pass"), repeat)
+    cli_time = best_time(lambda: run("CLI.py", script), repeat)
+    check = "import sys, CLI; CLI.main([sys.argv[1]]); assert 'tkinter' not in sys.modules"
+    run("-c", check, script)
+    print(f"python -c pass:           {bare_time * 1000:8.2f} ms")
+    print(f"python CLI.py this.lol:   {cli_time * 1000:8.2f} ms (+{(cli_time - bare_time) * 1000:.2f} ms)")
+    print("tkinter imported:         no")
+
+
+def bench_batch(file_count=400, statement_count=500):
+    """Files per second through Batch.run_batch as the worker count grows."""
+    directory = tempfile.mkdtemp()
+    source = gen_statements_program(statement_count)
+    paths = []
+    for index in range(file_count):
+        path = os.path.join(directory, f"{index:05}.lol")
+        with open(path, 'w') as file:
+            file.write(source)
+        paths.append(path)
+
+    cores = os.cpu_count() or 1
+    job_counts = sorted({1, 2, cores} | ({cores // 2} if cores >= 4 else set()))
+    print(f"{file_count} files of {statement_count} statements, {cores} cores")
+    baseline = None
+    for jobs in job_counts:
+        report = Batch.run_batch(paths, jobs)
+        rate = file_count / report["elapsed"]
+        baseline = baseline or rate
+        print(f"{jobs:>3} jobs: {rate:8.1f} files/s ({rate / baseline:.2f}x, {report['passed']} passed)")
+
+
+def bench_service(request_count=200):
+    """Per-script latency: a request to the warm Service vs. starting python CLI.py for each script."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(here, "samplecodes", "this.lol")
+    with open(script) as file:
+        source = file.read()
+    cli_time = best_time(lambda: subprocess.run([sys.executable, "CLI.py", script], cwd=here, check=True,
+                                                stdout=subprocess.DEVNULL))
+
+    async def serve_all():
+        service = Service.Service()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(service.execute({"id": index, "source": source})
+                                           for index in range(request_count)))
+        assert all(response["status"] == "ok" for response in responses)
+        return (time.perf_counter() - start) / request_count, service.cache.stats()
+
+    service_time, stats = asyncio.run(serve_all())
+    print(f"python CLI.py this.lol: {cli_time * 1000:8.3f} ms per script")
+    print(f"warm Service request:   {service_time * 1000:8.3f} ms per script ({cli_time / service_time:.0f}x, "
+          f"{request_count} concurrent requests)")
+    print(f"program cache: {stats}")
+
+
+class LineSink(OutputSink.OutputSink):
+    """The old behaviour, used as the baseline: one write and one flush per VISIBLE line."""
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def write(self, line):
+        print(line, file=self.stream, flush=True)
+
+
+class FakeText:
+    """Stands in for a Tk Text widget, costing one call per config and insert."""
+    def __init__(self):
+        self.calls = 0
+
+    def config(self, **options):
+        self.calls += 1
+
+    def insert(self, index, text):
+        self.calls += 1
+
+    def see(self, index):
+        self.calls += 1
+
+
+def bench_output(line_count=100000):
+    """VISIBLE-heavy program: buffered OutputSink blocks vs. one write (or widget update) per line."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A x ITZ 1", "    BUHBYE"]
+    lines += ["    VISIBLE \"line \" + x", "    x R SUM OF x AN 1"] * line_count
+    lines.append("KTHXBYE")
+    ast = parse("\n".join(lines))
+
+    def run_time(output):
+        interpreter = Interpreter.Interpreter(ast, output=output)
+        interpreter.compile()  # Only time execution
+        return best_time(interpreter.run, repeat=1)
+
+    with open(os.devnull, 'w') as devnull:
+        per_line_time = run_time(LineSink(devnull))
+        buffered_time = run_time(OutputSink.StreamSink(devnull))
+    print(f"{line_count:,} VISIBLE lines")
+    print(f"file, per line:    {per_line_time * 1000:8.2f} ms")
+    print(f"file, StreamSink:  {buffered_time * 1000:8.2f} ms ({per_line_time / buffered_time:.2f}x)")
+
+    widget = FakeText()
+    Interpreter.Interpreter(ast, output=OutputSink.TkSink(widget)).run()
+    print(f"Tk widget calls:   {line_count * 4:,} per line vs. {widget.calls:,} with TkSink")
+
+
+def bench_input(line_count=100000):
+    """GIMMEH-heavy program: FileInput's up-front read vs. one readline per GIMMEH."""
+    lines = ["HAI", "    WAZZUP", "        I HAS A x", "        I HAS A total ITZ 0", "    BUHBYE"]
+    lines += ["    GIMMEH x", "    total R SUM OF total AN x"] * line_count
+    lines.append("KTHXBYE")
+    ast = parse("\n".join(lines))
+    path = os.path.join(tempfile.mkdtemp(), "input.txt")
+    with open(path, 'w') as file:
+        file.writelines(f"{index % 100}\n" for index in range(line_count))
+
+    def run_time(make_input):
+        with open(path) as file:
+            interpreter = Interpreter.Interpreter(ast, make_input(file))
+            interpreter.compile()  # Only time execution
+            elapsed = best_time(interpreter.run, repeat=1)
+            assert interpreter.symbol_table["total"] == sum(index % 100 for index in range(line_count))
+            return elapsed
+
+    readline_time = run_time(lambda file: lambda: file.readline().rstrip("\n"))
+    file_input_time = run_time(InputProvider.FileInput)
+    print(f"{line_count:,} GIMMEH lines")
+    print(f"readline per GIMMEH:  {readline_time * 1000:8.2f} ms")
+    print(f"FileInput (prefetch): {file_input_time * 1000:8.2f} ms ({readline_time / file_input_time:.2f}x)")
+
+
+BENCHMARKS = {
+    "interpreter": bench_interpreter,
+    "variables": bench_variables,
+    "optimizer": bench_optimizer,
+    "types": bench_types,
+    "loops": bench_loops,
+    "switch": bench_switch,
+    "functions": bench_functions,
+    "recursion": bench_recursion,
+    "bytecode": bench_bytecode,
+    "transpiler": bench_transpiler,
+    "lexer": bench_lexer,
+    "stream_lexer": bench_stream_lexer,
+    "token_stream": bench_token_stream,
+    "incremental_lexer": bench_incremental_lexer,
+    "incremental_parser": bench_incremental_parser,
+    "deep_expressions": bench_deep_expressions,
+    "parser": bench_parser,
+    "parse_cache": bench_parse_cache,
+    "cold_start": bench_cold_start,
+    "batch": bench_batch,
+    "service": bench_service,
+    "output": bench_output,
+    "input": bench_input,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
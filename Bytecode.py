@@ -0,0 +1,434 @@
+from array import array
+import Interpreter
+import SyntaxAnalyzer
+
+# Opcodes. Every instruction is two ints wide: the opcode and its argument.
+LOAD_CONST = 0
+LOAD_NAME = 1
+STORE_NAME = 2
+DECLARE_NAME = 3
+SUM = 4
+DIFF = 5
+PRODUKT = 6
+QUOSHUNT = 7
+MOD = 8
+BIGGR = 9
+SMALLR = 10
+SMOOSH = 11
+CAST = 12
+PRINT = 13
+INPUT = 14
+BOTH_SAEM = 15
+DIFFRINT = 16
+NOT = 17
+WON = 18
+JUMP = 19  # Argument: offset in the code array to go on from
+JUMP_IF_FALSE = 20  # Pops the value it tests
+JUMP_IF_TRUE = 21
+UPPIN = 22  # Argument: names index of the loop variable
+NERFIN = 23
+LOAD_NUMERIC = 24  # LOAD_NAME, then cast the value to a number
+NUMERIC = 25  # Casts the value on top of the stack to a number
+# Superinstructions: LOAD_CONST of a number fused into the math opcode that takes it as its right operand
+SUM_CONST = 26  # Argument: constant pool index of the right operand
+DIFF_CONST = 27
+PRODUKT_CONST = 28
+QUOSHUNT_CONST = 29
+MOD_CONST = 30
+BIGGR_CONST = 31
+SMALLR_CONST = 32
+SWITCH = 33  # Argument: constant pool index of a WTF? jump table; jumps to the case IT is the same as
+CALL = 34  # Argument: index into CodeObject.functions; pops the arguments and starts a frame for the call
+RETURN = 35  # Leaves the call's frame, leaving its value on the stack for the caller
+RAISE = 36  # Argument: constant pool index of the runtime error to raise
+
+OPCODE_NAMES = [
+    "LOAD_CONST", "LOAD_NAME", "STORE_NAME", "DECLARE_NAME",
+    "SUM", "DIFF", "PRODUKT", "QUOSHUNT", "MOD", "BIGGR", "SMALLR",
+    "SMOOSH", "CAST", "PRINT", "INPUT",
+    "BOTH_SAEM", "DIFFRINT", "NOT", "WON",
+    "JUMP", "JUMP_IF_FALSE", "JUMP_IF_TRUE", "UPPIN", "NERFIN",
+    "LOAD_NUMERIC", "NUMERIC",
+    "SUM_CONST", "DIFF_CONST", "PRODUKT_CONST", "QUOSHUNT_CONST", "MOD_CONST", "BIGGR_CONST", "SMALLR_CONST",
+    "SWITCH", "CALL", "RETURN", "RAISE",
+]
+
+MATH_OPCODES = {
+    "SUM OF": SUM,
+    "DIFF OF": DIFF,
+    "PRODUKT OF": PRODUKT,
+    "QUOSHUNT OF": QUOSHUNT,
+    "MOD OF": MOD,
+    "BIGGR OF": BIGGR,
+    "SMALLR OF": SMALLR,
+}
+
+MATH_CONST_OPCODES = {
+    "SUM OF": SUM_CONST,
+    "DIFF OF": DIFF_CONST,
+    "PRODUKT OF": PRODUKT_CONST,
+    "QUOSHUNT OF": QUOSHUNT_CONST,
+    "MOD OF": MOD_CONST,
+    "BIGGR OF": BIGGR_CONST,
+    "SMALLR OF": SMALLR_CONST,
+}
+
+COMPARISON_OPCODES = {"BOTH SAEM": BOTH_SAEM, "DIFFRINT": DIFFRINT}
+
+# Short-circuiting boolean operators: the jump taken once an operand settles the result, and that result
+BOOL_JUMPS = {
+    "BOTH OF": (JUMP_IF_FALSE, False),
+    "ALL OF": (JUMP_IF_FALSE, False),
+    "EITHER OF": (JUMP_IF_TRUE, True),
+    "ANY OF": (JUMP_IF_TRUE, True),
+}
+
+JUMP_OPCODES = {JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE}
+
+# CAST takes an index into this tuple as its argument
+DATATYPES = ("NOOB", "TROOF", "NUMBR", "NUMBAR", "YARN")
+
+
+class CodeObject:
+    def __init__(self, code, consts, names, entry=0, functions=()):
+        self.code = code  # array('i') of opcode, argument pairs
+        self.consts = consts  # Constant pool, indexed by LOAD_CONST
+        self.names = names  # Variable names, indexed by LOAD_NAME/STORE_NAME; names[0] is IT
+        self.entry = entry  # Offset the main program starts at, after the function bodies
+        self.functions = functions  # FunctionCode of each HOW IZ I, indexed by CALL
+
+
+class FunctionCode:
+    def __init__(self, name, parameters):
+        """A HOW IZ I; its body is compiled into the program's code array, against a frame of its own."""
+        self.name = name
+        self.parameters = parameters
+        self.names = ["IT"] + parameters  # Variable names of the frame, indexed like CodeObject.names
+        self.offset = None  # Offset the body starts at
+
+
+class Compiler:
+    def __init__(self, ast):
+        self.ast = ast
+        self.code = array('i')
+        self.consts = []
+        self.const_index = {}
+        self.names = ["IT"]
+        self.name_index = {"IT": 0}
+        self.breaks = []  # For each enclosing loop or WTF?, the offsets of the GTFO jumps that leave it
+        self.functions = []  # FunctionCode of each HOW IZ I, in order
+        self.function_index = {}  # Function name -> index into self.functions
+
+    def emit(self, opcode, argument=0):
+        """Append one instruction, returning its offset."""
+        self.code.append(opcode)
+        self.code.append(argument)
+        return len(self.code) - 2
+
+    def patch(self, offset, target=None):
+        """Point the jump at offset to target, by default the next instruction to be emitted."""
+        self.code[offset + 1] = len(self.code) if target is None else target
+
+    def add_const(self, value):
+        """Get the constant pool index of a value, adding it if needed."""
+        key = Interpreter.memo_key((value,))  # Keeps WIN apart from 1, and -0.0 apart from 0.0
+        if key not in self.const_index:
+            self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self.const_index[key]
+
+    def add_name(self, name):
+        """Get the names index of a variable, adding it if needed."""
+        if name not in self.name_index:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return self.name_index[name]
+
+    def compile(self):
+        """Lower the whole AST into a CodeObject: the function bodies, then the main program."""
+        statements = self.ast[0] if self.ast else []
+        try:
+            # Every function can be called from anywhere, even before its definition, and from itself
+            definitions = [statement for statement in statements if statement["type"] == "function"]
+            for definition in definitions:
+                name = definition["name"]
+                if name in self.function_index:
+                    raise NameError(f"Function '{name}' already defined.")
+                self.function_index[name] = len(self.functions)
+                self.functions.append(FunctionCode(name, definition["parameters"]))
+            for definition in definitions:
+                self.compile_function(definition)
+            entry = len(self.code)
+            for statement in statements:
+                if statement["type"] != "function":
+                    self.compile_statement(statement)
+        except RecursionError:
+            raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None
+        except NameError as e:
+            # The Interpreter finds these as it compiles, and reports them as it runs, before any statement
+            entry = len(self.code)
+            self.emit(RAISE, self.add_const(e))
+        return CodeObject(self.code, self.consts, self.names, entry, self.functions)
+
+    def compile_function(self, node):
+        """Lower a HOW IZ I body against its own names; without FOUND YR at the end, the function gives IT."""
+        function = self.functions[self.function_index[node["name"]]]
+        function.offset = len(self.code)
+        outer = self.names, self.name_index, self.breaks
+        self.names = function.names
+        self.name_index = {name: index for index, name in enumerate(self.names)}
+        self.breaks = []
+        try:
+            body = node["body"]
+            self.compile_block(body)
+            if not body or body[-1]["type"] != "return":
+                self.emit(LOAD_NAME, 0)
+                self.emit(RETURN)
+        finally:
+            self.names, self.name_index, self.breaks = outer
+
+    def compile_call(self, node):
+        """Lower I IZ: evaluate the arguments in the caller's frame, then CALL.
+
+        Calling a function that is not defined, or with the wrong number of arguments, raises as the call is
+        reached, before its arguments are evaluated.
+        """
+        name = node["name"]
+        index = self.function_index.get(name)
+        count = len(node["arguments"])
+        if index is None:
+            self.emit(RAISE, self.add_const(NameError(f"Undefined function '{name}' called.")))
+            return
+        expected = len(self.functions[index].parameters)
+        if count != expected:
+            self.emit(RAISE, self.add_const(TypeError(
+                f"Function '{name}' takes {expected} argument{'s' if expected != 1 else ''}, "
+                f"but {count} were given")))
+            return
+        for argument in node["arguments"]:
+            self.compile_expr(argument)
+        self.emit(CALL, index)
+
+    def compile_statement(self, node):
+        """Lower a statement; bare expressions store their value in IT."""
+        kind = node["type"]
+        if kind == "print":
+            for operand in node["operand"]:
+                self.compile_expr(operand)
+            self.emit(PRINT, len(node["operand"]))
+        elif kind == "input":
+            self.emit(INPUT, self.add_name(node["name"]))
+        elif kind == "var_dec_list":
+            declared = set()
+            for var_dec in node["declarations"]:
+                if var_dec["name"] in declared:
+                    raise NameError(f"Variable '{var_dec['name']}' already declared.")
+                declared.add(var_dec["name"])
+                if var_dec["initialized"]:
+                    self.compile_expr(var_dec["initialized"]["value"])
+                else:
+                    self.emit(LOAD_CONST, self.add_const(None))
+                self.emit(DECLARE_NAME, self.add_name(var_dec["name"]))
+        elif kind == "assignment":
+            self.compile_expr(node["value"])
+            self.emit(STORE_NAME, self.add_name(node["name"]))
+        elif kind == "recast":
+            index = self.add_name(node["name"])
+            self.emit(LOAD_NAME, index)
+            self.emit(CAST, DATATYPES.index(node["datatype"]))
+            self.emit(STORE_NAME, index)
+        elif kind == "loop":
+            self.compile_loop(node)
+        elif kind == "if":
+            self.compile_if(node)
+        elif kind == "switch":
+            self.compile_switch(node)
+        elif kind == "break":
+            if not self.breaks:
+                raise SyntaxError("GTFO outside of a loop or function")
+            self.breaks[-1].append(self.emit(JUMP))
+        elif kind == "return":
+            if node["value"] is not None:
+                self.compile_expr(node["value"])
+            else:
+                self.emit(LOAD_CONST, self.add_const(None))  # GTFO outside a loop gives NOOB
+            self.emit(RETURN)
+        else:
+            self.compile_expr(node)
+            self.emit(STORE_NAME, 0)
+
+    def compile_block(self, statements):
+        """Lower a statement list in order."""
+        for statement in statements:
+            self.compile_statement(statement)
+
+    def compile_loop(self, node):
+        """Lower IM IN YR: test the condition, run the body, step the variable and jump back to the test."""
+        top = len(self.code)
+        exit_jump = None
+        if node["condition"] is not None:
+            self.compile_expr(node["condition"])
+            exit_jump = self.emit(JUMP_IF_FALSE if node["clause"] == "WILE" else JUMP_IF_TRUE)
+        self.breaks.append([])
+        self.compile_block(node["body"])
+        if node["operation"] is not None:
+            self.emit(UPPIN if node["operation"] == "UPPIN" else NERFIN, self.add_name(node["variable"]))
+        self.emit(JUMP, top)
+        for offset in self.breaks.pop() + ([exit_jump] if exit_jump is not None else []):
+            self.patch(offset)
+
+    def compile_if(self, node):
+        """Lower O RLY?: test IT, then each MEBBE condition, jumping past the rest once a branch has run."""
+        end_jumps = []
+        self.emit(LOAD_NAME, 0)
+        next_jump = self.emit(JUMP_IF_FALSE)
+        self.compile_block(node["body"])
+        for clause in node["elifs"]:
+            end_jumps.append(self.emit(JUMP))
+            self.patch(next_jump)
+            self.compile_expr(clause["condition"])
+            next_jump = self.emit(JUMP_IF_FALSE)
+            self.compile_block(clause["body"])
+        if node["else"] is not None:
+            end_jumps.append(self.emit(JUMP))
+            self.patch(next_jump)
+            self.compile_block(node["else"])
+        else:
+            end_jumps.append(next_jump)
+        for offset in end_jumps:
+            self.patch(offset)
+
+    def compile_switch(self, node):
+        """Lower WTF?: one SWITCH through a jump table to the case IT is the same as, then the cases laid out
+        to fall through until GTFO.
+
+        The table is (values, troofs, default): each OMG literal maps to the offset of the first case it is the
+        same as. Python sees WIN as equal to 1, but BOTH SAEM never does, so TROOFs get a dict of their own;
+        NUMBRs and NUMBARs share one, as they compare by value.
+        """
+        values, troofs = {}, {}
+        index = len(self.consts)  # Not shared through const_index: the table is only complete once laid out
+        self.consts.append(None)
+        self.emit(SWITCH, index)
+        self.breaks.append([])
+        for case in node["cases"]:
+            value = Interpreter.literal_value(case["value"]["value"])
+            (troofs if value.__class__ is bool else values).setdefault(value, len(self.code))
+            self.compile_block(case["body"])
+        self.consts[index] = (values, troofs, len(self.code))  # Otherwise on to OMGWTF, or past the WTF?
+        if node["default"] is not None:
+            self.compile_block(node["default"])
+        for offset in self.breaks.pop():
+            self.patch(offset)
+
+    def compile_expr(self, node):
+        """Lower an expression so that it leaves its value on the stack."""
+        kind = node["type"]
+        if kind == "literal":
+            self.emit(LOAD_CONST, self.add_const(Interpreter.literal_value(node["value"])))
+        elif kind == "identifier":
+            self.emit(LOAD_NAME, self.add_name(node["value"]))
+        elif kind == "math_expr":
+            self.compile_numeric(node["left"])
+            right = node["right"]
+            value = Interpreter.literal_value(right["value"]) if right["type"] == "literal" else None
+            if value.__class__ in (int, float):
+                self.emit(MATH_CONST_OPCODES[node["operator"]], self.add_const(value))
+            else:
+                self.compile_numeric(right)
+                self.emit(MATH_OPCODES[node["operator"]])
+        elif kind == "smoosh_expr":
+            for part in node["parts"]:
+                self.compile_expr(part)
+            self.emit(SMOOSH, len(node["parts"]))
+        elif kind == "typecast":
+            self.compile_expr(node["operand"])
+            self.emit(CAST, DATATYPES.index(node["datatype"]))
+        elif kind == "comparison_expr":
+            self.compile_expr(node["left"])
+            self.compile_expr(node["right"])
+            self.emit(COMPARISON_OPCODES[node["operator"]])
+        elif kind == "bool_expr":
+            self.compile_bool_expr(node)
+        elif kind == "call":
+            self.compile_call(node)
+        else:
+            raise SyntaxError(f"Cannot execute node of type '{kind}'")
+
+    def compile_numeric(self, node):
+        """Lower a math operand so that it leaves its value on the stack cast to a number.
+
+        The cast comes before the next operand is evaluated, so the errors are the Interpreter's, in its order.
+        """
+        kind = node["type"]
+        if kind == "identifier":
+            self.emit(LOAD_NUMERIC, self.add_name(node["value"]))
+            return
+        self.compile_expr(node)
+        if kind == "math_expr":
+            return  # Already a number
+        if kind == "literal" and Interpreter.literal_value(node["value"]).__class__ in (int, float):
+            return
+        self.emit(NUMERIC)
+
+    def compile_bool_expr(self, node):
+        """Lower a boolean expression; BOTH OF, EITHER OF, ALL OF and ANY OF skip the operands after the deciding one."""
+        operator = node["operator"]
+        operands = node["operands"]
+        if operator in ("NOT", "WON OF"):
+            for operand in operands:
+                self.compile_expr(operand)
+            self.emit(NOT if operator == "NOT" else WON)
+            return
+        jump, settled = BOOL_JUMPS[operator]
+        settled_jumps = []
+        for operand in operands:
+            self.compile_expr(operand)
+            settled_jumps.append(self.emit(jump))
+        self.emit(LOAD_CONST, self.add_const(not settled))
+        end_jump = self.emit(JUMP)
+        for offset in settled_jumps:
+            self.patch(offset)
+        self.emit(LOAD_CONST, self.add_const(settled))
+        self.patch(end_jump)
+
+
+def load_program(ast, input_func=input, output=None):
+    """Get a runnable program: a VirtualMachine over the compiled AST."""
+    return Interpreter.VirtualMachine(Compiler(ast).compile(), input_func, output)
+
+
+def disassemble(code_object):
+    """Render a CodeObject as one line per instruction, under a heading for each function and the main program."""
+    lines = []
+    code = code_object.code
+    starts = {function.offset: function for function in code_object.functions}
+    names = code_object.names
+    for offset in range(0, len(code), 2):
+        if offset in starts:
+            names = starts[offset].names
+            lines.append(f"{starts[offset].name}:")
+        elif offset == code_object.entry and code_object.functions:
+            names = code_object.names
+            lines.append("main:")
+        opcode, argument = code[offset], code[offset + 1]
+        detail = ""
+        if opcode == LOAD_CONST or opcode == RAISE:
+            detail = f"({code_object.consts[argument]!r})"
+        elif opcode in (LOAD_NAME, STORE_NAME, DECLARE_NAME, INPUT, UPPIN, NERFIN, LOAD_NUMERIC):
+            detail = f"({names[argument]})"
+        elif opcode == CALL:
+            detail = f"({code_object.functions[argument].name})"
+        elif opcode == CAST:
+            detail = f"({DATATYPES[argument]})"
+        elif opcode in JUMP_OPCODES:
+            detail = f"(to {argument})"
+        elif opcode in MATH_CONST_OPCODES.values():
+            detail = f"({code_object.consts[argument]!r})"
+        elif opcode == SWITCH:
+            values, troofs, default = code_object.consts[argument]
+            cases = ", ".join(f"{Interpreter.to_yarn(value)!r} to {target}"
+                              for value, target in list(values.items()) + list(troofs.items()))
+            detail = f"({cases}, else to {default})"
+        lines.append(f"{offset:>6} {OPCODE_NAMES[opcode]:<13} {argument:>4} {detail}".rstrip())
+    return "\n".join(lines)
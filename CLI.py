@@ -0,0 +1,126 @@
+import argparse
+import sys
+import Bytecode
+import InputProvider
+import Interpreter
+import Optimizer
+import OutputSink
+import Pipeline
+import Transpiler
+
+# Headless entry point: lex, parse and execute .lol files without ever importing tkinter.
+#   python CLI.py samplecodes/this.lol [more.lol ...] [--input answers.txt] [--output out.txt] [--cache]
+#                 [--call-cache-size N] [--stats] [--backend interpreter|bytecode|transpiler]
+
+BACKENDS = ("interpreter", "bytecode", "transpiler")
+
+
+def parse_file(path, cache):
+    """Lex and parse one file, returning the AST (None on a syntax error) and any error messages."""
+    source = Pipeline.Reader(path).read()
+    if cache is not None:
+        ast, token_stream, console = cache.parse(source)
+        return ast, console
+    ast, syntax_analyzer = Pipeline.parse(source)
+    return ast, syntax_analyzer.console
+
+
+def run_file(path, input_func, cache=None, output=None, stderr=sys.stderr,
+             call_cache_size=Interpreter.DEFAULT_CALL_CACHE_SIZE, stats=False, backend="interpreter",
+             code_cache_dir=None):
+    """Run one file, writing VISIBLE output to an output sink (stdout by default) and errors to stderr.
+
+    The backend runs the program on the closure Interpreter, compiled to bytecode on the VirtualMachine, or
+    transpiled to Python; transpiled programs are kept in code_cache_dir, if given, instead of the parse cache.
+    With stats, the call cache counters of each memoized function are reported to stderr too.
+    Returns True on success.
+    """
+    output = output or OutputSink.StreamSink()
+    if backend == "transpiler":
+        try:
+            interpreter = Transpiler.load_program(Pipeline.Reader(path).read(), code_cache_dir, input_func, output)
+        except SyntaxError as e:
+            print(f"{path}: {e}", file=stderr)
+            return False
+        return finish_run(path, interpreter, stderr, stats)
+    ast, console = parse_file(path, cache)
+    if ast is None:
+        for message in console:
+            print(f"{path}: {message}", file=stderr)
+        return False
+    try:
+        ast = Optimizer.Optimizer(ast).optimize()
+        if backend == "bytecode":
+            interpreter = Bytecode.load_program(ast, input_func, output)
+        else:
+            interpreter = Interpreter.Interpreter(ast, input_func, output, call_cache_size=call_cache_size)
+    except SyntaxError as e:
+        print(f"{path}: {e}", file=stderr)
+        return False
+    return finish_run(path, interpreter, stderr, stats)
+
+
+def finish_run(path, interpreter, stderr, stats):
+    """Run a loaded program, reporting its errors, and its call cache counters with stats, to stderr."""
+    ok = interpreter.run()
+    for message in interpreter.console:
+        print(f"{path}: {message}", file=stderr)
+    if stats:
+        for name, counters in interpreter.stats()["call_caches"].items():
+            print(f"{path}: {name}: {counters['hits']} hits, {counters['misses']} misses "
+                  f"({counters['hit_rate']:.0%}), {counters['entries']} cached", file=stderr)
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run LOLCODE programs without the GUI.")
+    parser.add_argument("files", nargs="+", help=".lol files to run, in order")
+    parser.add_argument("--input", metavar="FILE",
+                        help="read every GIMMEH line up front from FILE ('-' for all of stdin) "
+                             "instead of asking on stdin as each GIMMEH runs")
+    parser.add_argument("--output", metavar="FILE", help="write VISIBLE output to FILE instead of stdout")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse parsed programs from the on-disk parse cache, or transpiled ones from the code "
+                             "cache with --backend transpiler")
+    parser.add_argument("--call-cache-size", type=int, default=Interpreter.DEFAULT_CALL_CACHE_SIZE, metavar="N",
+                        help="results each pure function keeps for repeated calls (0 turns memoization off)")
+    parser.add_argument("--stats", action="store_true",
+                        help="report each memoized function's cache hit rate, and the parse cache's with --cache")
+    parser.add_argument("--backend", choices=BACKENDS, default="interpreter",
+                        help="run on the closure interpreter (default), the bytecode VM or transpiled to Python")
+    args = parser.parse_args(argv)
+
+    cache = None
+    code_cache_dir = None
+    if args.cache and args.backend == "transpiler":
+        code_cache_dir = Transpiler.DEFAULT_CACHE_DIR
+    elif args.cache:
+        import ParseCache  # Hashes the grammar sources on import; only pay for it when asked
+        cache = ParseCache.ParseCache()
+
+    try:
+        input_func = InputProvider.from_args(args.input)
+    except OSError as e:
+        print(f"{args.input}: {e.strerror}", file=sys.stderr)
+        return 1
+    output = OutputSink.FileSink(args.output) if args.output else OutputSink.StreamSink()
+    try:
+        ok = True
+        for path in args.files:
+            try:
+                ok = run_file(path, input_func, cache, output, call_cache_size=args.call_cache_size,
+                              stats=args.stats, backend=args.backend, code_cache_dir=code_cache_dir) and ok
+            except OSError as e:
+                print(f"{path}: {e.strerror}", file=sys.stderr)
+                ok = False
+    finally:
+        output.close()
+    if args.stats and cache is not None:
+        counters = cache.stats()
+        print(f"parse cache: {counters['hits']} hits, {counters['misses']} misses, {counters['evictions']} evictions",
+              file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import sys
+from collections import deque
+
+# Input providers are callables: the interpreters call input_func() once per GIMMEH and get one line back,
+# without its newline. Running out of input raises EOFError.
+
+
+class InputProvider:
+    def __call__(self):
+        return self.read_line()
+
+    def read_line(self):
+        raise NotImplementedError
+
+
+class InteractiveInput(InputProvider):
+    def __init__(self, prompt="", input_func=input):
+        """Asks for each line when GIMMEH runs, through input() by default."""
+        self.prompt = prompt
+        self.input_func = input_func
+
+    def read_line(self):
+        return self.input_func(self.prompt)
+
+
+class ListInput(InputProvider):
+    def __init__(self, lines=()):
+        """Serves lines from memory, e.g. a test's or a request's canned input."""
+        self.lines = deque(str(line) for line in lines)
+
+    def read_line(self):
+        try:
+            return self.lines.popleft()
+        except IndexError:
+            raise EOFError("End of input") from None
+
+    def __len__(self):
+        return len(self.lines)
+
+
+class FileInput(ListInput):
+    def __init__(self, source):
+        """Reads a whole input file (a path or an open text file) up front, then serves its lines from memory."""
+        if hasattr(source, 'read'):
+            text = source.read()
+        else:
+            with open(source) as file:
+                text = file.read()
+        super().__init__(text.splitlines())
+
+
+def from_args(path=None):
+    """Get the provider for a --input option: the whole file if given, else interactive stdin."""
+    if path is None:
+        return InteractiveInput()
+    if path == "-":
+        return FileInput(sys.stdin)
+    return FileInput(path)
@@ -0,0 +1,1361 @@
+import re
+from collections import OrderedDict
+from operator import add, mul, sub
+import Bytecode
+import OutputSink
+import SemanticAnalyzer
+import SyntaxAnalyzer
+import TypeInference
+
+NUMBR_PATTERN = re.compile(r"-?\d+")
+NUMBAR_PATTERN = re.compile(r"-?\d+\.\d+|-?\d*\.\d+")
+
+
+def literal_value(lexeme):
+    """Convert a literal lexeme into its runtime value."""
+    if lexeme.startswith('"'):
+        return lexeme[1:-1]
+    if lexeme == "WIN":
+        return True
+    if lexeme == "FAIL":
+        return False
+    if NUMBR_PATTERN.fullmatch(lexeme):
+        return int(lexeme)
+    return float(lexeme)
+
+
+def type_name(value):
+    """Get the LOLCODE datatype of a runtime value."""
+    if value is None:
+        return "NOOB"
+    if value is True or value is False:
+        return "TROOF"
+    if isinstance(value, int):
+        return "NUMBR"
+    if isinstance(value, float):
+        return "NUMBAR"
+    return "YARN"
+
+
+def to_numeric(value):
+    """Implicitly cast a value to NUMBR or NUMBAR for arithmetic."""
+    if value is True or value is False:
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        if NUMBR_PATTERN.fullmatch(value):
+            return int(value)
+        if NUMBAR_PATTERN.fullmatch(value):
+            return float(value)
+        raise TypeError(f"Cannot cast YARN '{value}' to a number")
+    raise TypeError("Cannot use NOOB in an arithmetic expression")
+
+
+def to_troof(value):
+    """Cast a value to TROOF."""
+    return bool(value)
+
+
+def to_yarn(value):
+    """Cast a value to YARN, the way VISIBLE and SMOOSH display it."""
+    if value is None:
+        return "NOOB"
+    if value is True:
+        return "WIN"
+    if value is False:
+        return "FAIL"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def cast(value, datatype):
+    """Explicitly cast a value to a datatype (MAEK and IS NOW A)."""
+    if datatype == "NOOB":
+        return None
+    if datatype == "TROOF":
+        return to_troof(value)
+    if value is None:
+        return {"NUMBR": 0, "NUMBAR": 0.0, "YARN": ""}[datatype]
+    if datatype == "YARN":
+        return to_yarn(value)
+    number = to_numeric(value)
+    if datatype == "NUMBR":
+        return int(number)
+    return float(number)
+
+
+def quoshunt_numbr(left, right):
+    """QUOSHUNT OF two NUMBRs: division truncating toward zero."""
+    if right == 0:
+        raise ZeroDivisionError("Division by zero")
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+
+def quoshunt_numbar(left, right):
+    """QUOSHUNT OF with a NUMBAR operand: true division."""
+    if right == 0:
+        raise ZeroDivisionError("Division by zero")
+    return left / right
+
+
+def quoshunt(left, right):
+    """QUOSHUNT OF: truncating division for NUMBRs, true division otherwise."""
+    if isinstance(left, float) or isinstance(right, float):
+        return quoshunt_numbar(left, right)
+    return quoshunt_numbr(left, right)
+
+
+def mod_numbr(left, right):
+    """MOD OF two NUMBRs: remainder that takes the sign of the dividend."""
+    if right == 0:
+        raise ZeroDivisionError("Modulo by zero")
+    remainder = abs(left) % abs(right)
+    return remainder if left >= 0 else -remainder
+
+
+def mod_numbar(left, right):
+    """MOD OF with a NUMBAR operand: remainder of the truncated quotient."""
+    if right == 0:
+        raise ZeroDivisionError("Modulo by zero")
+    return left - right * int(left / right)
+
+
+def mod(left, right):
+    """MOD OF: remainder that takes the sign of the dividend."""
+    if isinstance(left, float) or isinstance(right, float):
+        return mod_numbar(left, right)
+    return mod_numbr(left, right)
+
+
+# Arithmetic operators, applied after both operands are cast to numbers
+MATH_OPERATORS = {
+    "SUM OF": add,
+    "DIFF OF": sub,
+    "PRODUKT OF": mul,
+    "QUOSHUNT OF": quoshunt,
+    "MOD OF": mod,
+    "BIGGR OF": max,
+    "SMALLR OF": min,
+}
+
+# Arithmetic specialized for operands the type inference proves are both NUMBRs, or both NUMBARs
+NUMBR_OPERATORS = dict(MATH_OPERATORS, **{"QUOSHUNT OF": quoshunt_numbr, "MOD OF": mod_numbr})
+NUMBAR_OPERATORS = dict(MATH_OPERATORS, **{"QUOSHUNT OF": quoshunt_numbar, "MOD OF": mod_numbar})
+
+
+def same(left, right):
+    """BOTH SAEM: the same datatype and value, except that NUMBRs and NUMBARs compare by value."""
+    if left.__class__ is right.__class__:
+        return left == right
+    return left.__class__ in (int, float) and right.__class__ in (int, float) and left == right
+
+
+def won_of(operands):
+    """WON OF: exactly one of two TROOFs is WIN."""
+    left, right = operands
+    return left != right
+
+
+# Comparison operators, applied to the operands without casting them
+COMPARISON_OPERATORS = {
+    "BOTH SAEM": same,
+    "DIFFRINT": lambda left, right: not same(left, right),
+}
+
+# Boolean operators, applied to the list of operands cast to TROOFs
+BOOL_OPERATORS = {
+    "BOTH OF": all,
+    "EITHER OF": any,
+    "WON OF": won_of,
+    "NOT": lambda operands: not operands[0],
+    "ALL OF": all,
+    "ANY OF": any,
+}
+
+
+UNDECLARED = object()  # Marks variable slots that no I HAS A has reached yet
+
+# How UPPIN and NERFIN change the loop variable
+LOOP_STEPS = {"UPPIN": 1, "NERFIN": -1}
+
+# Relation a loop variable has to the bound when the negated comparison holds
+NEGATED_RELATIONS = {"==": "!=", "<=": ">", ">=": "<"}
+
+
+DEFAULT_CALL_CACHE_SIZE = 1024  # Results each pure function keeps, by default
+
+MISSING = object()  # Marks arguments a CallCache has no result for
+
+
+class LoopExit(Exception):
+    """Raised by GTFO to leave the innermost loop or WTF?."""
+
+
+class FunctionReturn(Exception):
+    """Raised by a FOUND YR (or GTFO) that is not the last statement of its function."""
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+def memo_key(arguments):
+    """Key a call's arguments so that only values of the same datatype share a cache entry.
+
+    1, 1.0 and WIN are equal in Python, but not to a LOLCODE program; neither are 0.0 and -0.0, once printed.
+    """
+    return tuple([(argument.__class__, argument.hex() if argument.__class__ is float else argument)
+                  for argument in arguments])
+
+
+class CallCache:
+    def __init__(self, max_entries=DEFAULT_CALL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # memo_key(arguments) -> value the function found, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Get the value cached for a call's arguments, or MISSING."""
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store a call's value, dropping the least recently used one if the cache is full."""
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Get the hit and miss counters, the hit rate and the number of cached calls."""
+        calls = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / calls if calls else 0.0,
+                "entries": len(self.entries)}
+
+
+class Function:
+    def __init__(self, name, parameters):
+        """A HOW IZ I definition; the rest is filled in once its body is compiled."""
+        self.name = name
+        self.parameters = parameters
+        self.variables = None  # The slots the compiled body reads and writes: the frame of the running call
+        self.fresh = None  # What the slots hold as a call starts: IT is NOOB, locals undeclared
+        self.run = None  # Runs the body in the current frame, returning its value (or a generator of its steps)
+        self.steps = False  # Whether the body calls functions, so run returns a generator for drive()
+        self.cache = None  # CallCache of a pure function's results, when memoized
+
+    def enter(self, arguments):
+        """Start a frame for a call, returning the frame of the call it displaces (a recursive one, say)."""
+        variables = self.variables
+        saved = variables[:]
+        variables[:] = self.fresh
+        variables[1:len(arguments) + 1] = arguments  # Parameters take the slots after IT
+        return saved
+
+
+class TailCall:
+    def __init__(self, function, arguments):
+        """Returned by a function ending in FOUND YR I IZ ...: the call whose value is the function's own."""
+        self.function = function
+        self.arguments = arguments
+
+
+def drive(steps, interpreter):
+    """Run a statement that calls functions, keeping every call's frame on a heap-allocated stack.
+
+    steps is a generator that yields (function, arguments) for each call and is sent back the value the call
+    found. Function bodies that call functions run the same way, so LOLCODE recursion is limited by memory,
+    not by Python's recursion limit; a tail call replaces its caller's frame instead of adding one.
+    Every call checks whether the interpreter was cancelled, so even a body of nothing but a tail call stops.
+    """
+    frames = []  # (caller's generator, function, displaced frame, CallCache keys waiting for the value)
+    current = steps
+    value = None
+    try:
+        while True:
+            try:
+                function, arguments = current.send(value)
+                keys = []
+            except (StopIteration, FunctionReturn) as e:
+                value = e.value
+                if not frames:
+                    return value
+                current, finished, saved, keys = frames.pop()
+                finished.variables[:] = saved
+                if value.__class__ is not TailCall:
+                    for cache, key in keys:
+                        cache.put(key, value)
+                    continue
+                function, arguments = value.function, value.arguments  # Called in place of the finished one
+
+            if interpreter.cancelled:
+                raise InterruptedError("Execution cancelled")
+            if function.cache is not None:
+                key = memo_key(arguments)
+                value = function.cache.get(key)
+                if value is not MISSING:
+                    for cache, waiting in keys:
+                        cache.put(waiting, value)
+                    continue
+                keys.append((function.cache, key))  # A tail call's keys wait for the same value as its caller's
+            saved = function.enter(arguments)
+            if function.steps:
+                frames.append((current, function, saved, keys))
+                current = function.run()
+                value = None
+                continue
+            try:
+                value = function.run()  # Calls nothing, so it cannot recurse
+            except FunctionReturn as e:
+                value = e.value
+            finally:
+                function.variables[:] = saved
+            for cache, key in keys:
+                cache.put(key, value)
+    except BaseException:
+        # A runtime error unwinds every frame, so each function's slots are as they were before the statement
+        for caller, function, saved, keys in reversed(frames):
+            function.variables[:] = saved
+        raise
+
+
+class Interpreter:
+    def __init__(self, ast, input_func=input, output=None, scopes=None, types=None,
+                 call_cache_size=DEFAULT_CALL_CACHE_SIZE):
+        self.ast = ast
+        self.input_func = input_func
+        self.scopes = scopes or SemanticAnalyzer.SemanticAnalyzer(ast).analyze()
+        # id(expression node) -> datatype it is proven to evaluate to, used to leave out runtime casts
+        self.types = types if types is not None else TypeInference.TypeInference(ast).infer()
+        self.scope = self.scopes[SemanticAnalyzer.GLOBAL_SCOPE]  # Scope being compiled
+        self.variables = [UNDECLARED] * len(self.scope)  # Global variables, indexed by slot
+        self.variables[0] = None  # IT starts as NOOB
+        self.symbol_table = {"IT": None}  # Rebuilt from the slots when the program ends
+        self.console = []  # This will hold the console output
+        self.output = output or OutputSink.MemorySink(self.console)  # Receives each VISIBLE line
+        self.program = None
+        self.cancelled = False  # Set from another thread to stop the program before its next statement
+        self.functions = {}  # Name -> Function, for every HOW IZ I in the program
+        self.calling = set()  # id() of every node that calls a function, itself or somewhere inside it
+        self.call_cache_size = call_cache_size  # Results kept per pure function; 0 turns memoization off
+
+        self.expr_compilers = {
+            "literal": self.compile_literal,
+            "identifier": self.compile_identifier,
+            "math_expr": self.compile_math_expr,
+            "smoosh_expr": self.compile_smoosh_expr,
+            "typecast": self.compile_typecast,
+            "comparison_expr": self.compile_comparison_expr,
+            "bool_expr": self.compile_bool_expr,
+        }
+        self.statement_compilers = {
+            "print": self.compile_print,
+            "input": self.compile_input,
+            "var_dec_list": self.compile_var_dec_list,
+            "assignment": self.compile_assignment,
+            "recast": self.compile_recast,
+            "loop": self.compile_loop,
+            "if": self.compile_if,
+            "switch": self.compile_switch,
+            "break": self.compile_break,
+            "return": self.compile_return,
+        }
+        # Nodes that call functions compile to generator functions instead, which drive() runs
+        self.expr_step_compilers = {
+            "call": self.compile_call_steps,
+            "math_expr": self.compile_math_expr_steps,
+            "comparison_expr": self.compile_comparison_expr_steps,
+            "bool_expr": self.compile_bool_expr_steps,
+            "smoosh_expr": self.compile_smoosh_expr_steps,
+            "typecast": self.compile_typecast_steps,
+        }
+        self.statement_step_compilers = {
+            "print": self.compile_print_steps,
+            "var_dec_list": self.compile_var_dec_list_steps,
+            "assignment": self.compile_assignment_steps,
+            "loop": self.compile_loop_steps,
+            "if": self.compile_if_steps,
+            "switch": self.compile_switch_steps,
+            "return": self.compile_return_steps,
+        }
+
+    def compile(self):
+        """Compile the whole AST into one closure, once."""
+        statements = self.ast[0] if self.ast else []
+        for statement in statements:
+            self.mark_calls(statement)
+        # Every function can be called from anywhere, even before its definition, and from itself
+        definitions = [statement for statement in statements if statement["type"] == "function"]
+        for definition in definitions:
+            name = definition["name"]
+            if name in self.functions:
+                raise NameError(f"Function '{name}' already defined.")
+            self.functions[name] = Function(name, definition["parameters"])
+        pure = SemanticAnalyzer.pure_functions(self.ast) if self.call_cache_size > 0 else ()
+        for definition in definitions:
+            self.compile_function(definition, definition["name"] in pure)
+        self.program = self.compile_block([statement for statement in statements if statement["type"] != "function"])
+        return self.program
+
+    def compile_block(self, statements):
+        """Compile a list of statements into a closure that runs them in order."""
+        compiled = tuple(self.compile_statement(statement) for statement in statements)
+        interpreter = self
+
+        def block():
+            for statement in compiled:
+                if interpreter.cancelled:
+                    raise InterruptedError("Execution cancelled")
+                statement()
+        return block
+
+    def mark_calls(self, node):
+        """Add the nodes that call a function, themselves or somewhere inside, to self.calling."""
+        calls = node.get("type") == "call"
+        for value in node.values():
+            if isinstance(value, dict):
+                calls = self.mark_calls(value) or calls
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        calls = self.mark_calls(item) or calls
+        if calls:
+            self.calling.add(id(node))
+        return calls
+
+    def compile_statement(self, node):
+        """Compile a statement node; bare expressions store their value in IT."""
+        if id(node) in self.calling:
+            steps = self.compile_statement_steps(node)
+            return lambda: drive(steps(), self)
+        compiler = self.statement_compilers.get(node["type"])
+        if compiler:
+            return compiler(node)
+        expr = self.compile_expr(node)
+        variables = self.variables
+
+        def store_it():
+            variables[0] = expr()
+        return store_it
+
+    def compile_expr(self, node):
+        """Compile an expression node into a closure that returns its value."""
+        compiler = self.expr_compilers.get(node["type"])
+        if compiler is None:
+            raise SyntaxError(f"Cannot execute node of type '{node['type']}'")
+        return compiler(node)
+
+    def compile_literal(self, node):
+        """<literal> evaluates to a constant computed at compile time."""
+        value = literal_value(node["value"])
+        return lambda: value
+
+    def compile_identifier(self, node):
+        """varident reads the variable's slot."""
+        name = node["value"]
+        slot = self.scope.slot(name)
+        variables = self.variables
+        if slot is None:
+            def load():
+                raise NameError(f"Undeclared variable '{name}' used.")
+            return load
+
+        def load():
+            value = variables[slot]
+            if value is UNDECLARED:
+                raise NameError(f"Undeclared variable '{name}' used.")
+            return value
+        return load
+
+    def datatype(self, node):
+        """Get the datatype an expression node is proven to evaluate to, or None."""
+        return self.types.get(id(node))
+
+    def compile_math_expr(self, node):
+        """<math_expr> casts both operands to numbers, then applies the operator."""
+        left = self.compile_expr(node["left"])
+        right = self.compile_expr(node["right"])
+        left_type = self.datatype(node["left"])
+        right_type = self.datatype(node["right"])
+        if left_type in TypeInference.NUMBER_DATATYPES and right_type in TypeInference.NUMBER_DATATYPES:
+            # Both operands are numbers already: no casts, and no float checks when both are NUMBRs
+            if left_type == right_type == "NUMBR":
+                operator = NUMBR_OPERATORS[node["operator"]]
+            else:
+                operator = NUMBAR_OPERATORS[node["operator"]]
+            if node["right"]["type"] == "literal":
+                value = literal_value(node["right"]["value"])
+                return lambda: operator(left(), value)
+            return lambda: operator(left(), right())
+        operator = MATH_OPERATORS[node["operator"]]
+        return lambda: operator(to_numeric(left()), to_numeric(right()))
+
+    def compile_comparison_expr(self, node):
+        """<comparison_expr> compares its operands without casting them."""
+        operator = node["operator"]
+        left = self.compile_expr(node["left"])
+        right = self.compile_expr(node["right"])
+        left_type = self.datatype(node["left"])
+        right_type = self.datatype(node["right"])
+        if left_type is not None and right_type is not None:
+            if left_type == right_type or {left_type, right_type} <= TypeInference.NUMBER_DATATYPES:
+                if operator == "BOTH SAEM":
+                    return lambda: left() == right()
+                return lambda: left() != right()
+            # Values of these datatypes are never the same; the operands still run for their errors
+            result = operator == "DIFFRINT"
+
+            def compare():
+                left()
+                right()
+                return result
+            return compare
+        compare = COMPARISON_OPERATORS[operator]
+        return lambda: compare(left(), right())
+
+    def compile_bool_expr(self, node):
+        """<bool_expr> casts its operands to TROOFs, stopping once the result is settled."""
+        operator = node["operator"]
+        operands = tuple(self.compile_expr(operand) for operand in node["operands"])
+        troofs = all(self.datatype(operand) == "TROOF" for operand in node["operands"])
+        if operator == "NOT":
+            operand = operands[0]
+            return lambda: not operand()
+        if len(operands) == 2:
+            left, right = operands
+            if operator == "WON OF":
+                if troofs:
+                    return lambda: left() != right()
+                return lambda: (not left()) != (not right())
+            if operator in ("BOTH OF", "ALL OF"):
+                if troofs:
+                    return lambda: left() and right()
+                return lambda: bool(left() and right())
+            if troofs:
+                return lambda: left() or right()
+            return lambda: bool(left() or right())
+        combine = all if operator == "ALL OF" else any
+        return lambda: combine(operand() for operand in operands)
+
+    def compile_smoosh_expr(self, node):
+        """<smoosh_expr> concatenates its parts as YARNs."""
+        parts = tuple(self.compile_expr(part) for part in node["parts"])
+        return lambda: "".join([to_yarn(part()) for part in parts])
+
+    def compile_typecast(self, node):
+        """<typecast> explicitly casts its operand."""
+        operand = self.compile_expr(node["operand"])
+        datatype = node["datatype"]
+        return lambda: cast(operand(), datatype)
+
+    def compile_print(self, node):
+        """<print> writes the concatenated operands to the output sink."""
+        operands = tuple(self.compile_expr(operand) for operand in node["operand"])
+        write = self.output.write
+
+        def visible():
+            write("".join([to_yarn(operand()) for operand in operands]))
+        return visible
+
+    def compile_input(self, node):
+        """<input> reads one line into the variable as a YARN."""
+        name = node["name"]
+        slot = self.scope.slot(name)
+        variables = self.variables
+        input_func = self.input_func
+        flush = self.output.flush
+
+        def gimmeh():
+            if slot is None or variables[slot] is UNDECLARED:
+                raise NameError(f"Undeclared variable '{name}' used.")
+            flush()  # Show any prompt before waiting for input
+            variables[slot] = input_func()
+        return gimmeh
+
+    def compile_var_dec_list(self, node):
+        """<var_dec_list> declares each variable, evaluating initializers in order."""
+        declarations = []
+        declared = set()
+        for var_dec in node["declarations"]:
+            name = var_dec["name"]
+            if name in declared:
+                raise NameError(f"Variable '{name}' already declared.")
+            declared.add(name)
+            initialized = var_dec["initialized"]
+            value = self.compile_expr(initialized["value"]) if initialized else None
+            declarations.append((self.scope.slot(name), value))
+        variables = self.variables
+
+        def declare():
+            for slot, value in declarations:
+                variables[slot] = value() if value else None
+        return declare
+
+    def compile_assignment(self, node):
+        """<assignment> stores the operand's value in a declared variable."""
+        name = node["name"]
+        slot = self.scope.slot(name)
+        value = self.compile_expr(node["value"])
+        variables = self.variables
+
+        def assign():
+            if slot is None or variables[slot] is UNDECLARED:
+                raise NameError(f"Variable '{name}' not declared.")
+            variables[slot] = value()
+        return assign
+
+    def compile_recast(self, node):
+        """<recast> casts a variable in place."""
+        name = node["name"]
+        slot = self.scope.slot(name)
+        datatype = node["datatype"]
+        variables = self.variables
+
+        def recast():
+            if slot is None or variables[slot] is UNDECLARED:
+                raise NameError(f"Variable '{name}' not declared.")
+            variables[slot] = cast(variables[slot], datatype)
+        return recast
+
+    def compile_loop(self, node):
+        """<loop> runs its body until the condition stops it, stepping the loop variable after each pass."""
+        name = node["variable"]
+        slot = self.scope.slot(name) if name is not None else None
+        step = LOOP_STEPS.get(node["operation"])
+        keep_going = node["clause"] == "WILE"  # TIL loops go on while the condition is FAIL
+        condition = self.compile_expr(node["condition"]) if node["condition"] is not None else None
+        body = self.compile_block(node["body"])
+        variables = self.variables
+        interpreter = self
+
+        def loop():
+            while True:
+                if interpreter.cancelled:
+                    raise InterruptedError("Execution cancelled")
+                if condition is not None and bool(condition()) is not keep_going:
+                    return
+                try:
+                    body()
+                except LoopExit:
+                    return
+                if step:
+                    if slot is None or variables[slot] is UNDECLARED:
+                        raise NameError(f"Undeclared variable '{name}' used.")
+                    variables[slot] = to_numeric(variables[slot]) + step
+
+        counted = self.counted_loop(node)
+        if counted is None or slot is None:
+            return loop
+        relation, bound_node, numeric_bound = counted
+        bound = self.compile_expr(bound_node)
+
+        def counted_loop():
+            # Run as a range when the variable and bound are NUMBRs and the range ends; otherwise step normally
+            start = variables[slot]
+            limit = to_numeric(bound()) if numeric_bound else bound()
+            if start.__class__ is int and limit.__class__ is int:
+                if step == 1 and (relation == "<" or relation == "!=" and start <= limit):
+                    stop = limit
+                elif step == 1 and relation == "<=":
+                    stop = limit + 1
+                elif step == -1 and (relation == ">" or relation == "!=" and start >= limit):
+                    stop = limit
+                elif step == -1 and relation == ">=":
+                    stop = limit - 1
+                else:
+                    return loop()
+                try:
+                    for value in range(start, stop, step):
+                        if interpreter.cancelled:  # An empty body has no statements to check it
+                            raise InterruptedError("Execution cancelled")
+                        variables[slot] = value
+                        body()
+                except LoopExit:
+                    return
+                variables[slot] = max(start, stop) if step == 1 else min(start, stop)
+                return
+            loop()
+        return counted_loop
+
+    def counted_loop(self, node):
+        """Match a loop that steps its variable toward a bound its body never changes.
+
+        Returns the relation the variable must keep to the bound for the loop to go on, the bound expression,
+        and whether the condition casts the bound to a number; None if the loop is anything else.
+        """
+        name = node["variable"]
+        condition = node["condition"]
+        if name is None or condition is None or condition["type"] != "comparison_expr":
+            return None
+        sides = (condition["left"], condition["right"])
+        variable = {"type": "identifier", "value": name}
+        if variable not in sides:
+            return None
+        other = sides[1] if sides[0] == variable else sides[0]
+        if other["type"] == "math_expr" and other["operator"] in ("SMALLR OF", "BIGGR OF") and \
+                variable in (other["left"], other["right"]):
+            # BOTH SAEM var AN SMALLR OF var AN n holds while var <= n; BIGGR OF, while var >= n
+            relation = "<=" if other["operator"] == "SMALLR OF" else ">="
+            bound = other["right"] if other["left"] == variable else other["left"]
+            numeric_bound = True
+        else:
+            relation, bound, numeric_bound = "==", other, False
+        if (condition["operator"] == "BOTH SAEM") is not (node["clause"] == "WILE"):
+            relation = NEGATED_RELATIONS[relation]
+        if relation == "==":
+            return None  # Runs at most once
+        assigned = SemanticAnalyzer.assigned_variables(node["body"])
+        if name in assigned or bound["type"] not in ("literal", "identifier"):
+            return None
+        if bound["type"] == "identifier" and bound["value"] in assigned | {name}:
+            return None
+        return relation, bound, numeric_bound
+
+    def compile_if(self, node):
+        """<if> runs YA RLY if IT is WIN, else the first MEBBE whose condition is WIN, else NO WAI."""
+        body = self.compile_block(node["body"])
+        elifs = tuple((self.compile_expr(clause["condition"]), self.compile_block(clause["body"]))
+                      for clause in node["elifs"])
+        else_body = self.compile_block(node["else"]) if node["else"] is not None else None
+        variables = self.variables
+
+        def o_rly():
+            if variables[0]:
+                return body()
+            for condition, block in elifs:
+                if condition():
+                    return block()
+            if else_body is not None:
+                else_body()
+        return o_rly
+
+    def compile_switch(self, node):
+        """<switch> jumps to the OMG whose literal is the same as IT (else to OMGWTF) and runs on until GTFO."""
+        values, troofs = self.switch_table(node)
+        blocks, ends = self.switch_blocks(node, self.compile_block)
+        default = len(node["cases"])  # Past the last OMG: OMGWTF if there is one, else nothing
+        count = len(blocks)
+        variables = self.variables
+
+        def wtf():
+            it = variables[0]
+            start = (troofs if it.__class__ is bool else values).get(it, default)
+            try:
+                for index in range(start, count):
+                    blocks[index]()
+                    if ends[index]:
+                        return
+            except LoopExit:
+                pass
+        return wtf
+
+    def switch_table(self, node):
+        """Build the jump table of a WTF?: for each OMG literal, the index of the first case it is the same as.
+
+        Python sees WIN as equal to 1, but BOTH SAEM never does, so TROOFs get a table of their own; NUMBRs
+        and NUMBARs share one, as they compare by value.
+        """
+        values, troofs = {}, {}
+        for index, case in enumerate(node["cases"]):
+            value = literal_value(case["value"]["value"])
+            (troofs if value.__class__ is bool else values).setdefault(value, index)
+        return values, troofs
+
+    def switch_blocks(self, node, compile_block):
+        """Compile the cases of a WTF?, then OMGWTF, along with whether each one ends the WTF?.
+
+        A case ending in GTFO is compiled without it, so the usual case leaves the WTF? without raising LoopExit.
+        """
+        blocks, ends = [], []
+        for case in node["cases"]:
+            body = case["body"]
+            ends.append(bool(body) and body[-1]["type"] == "break")
+            blocks.append(compile_block(body[:-1] if ends[-1] else body))
+        if node["default"] is not None:
+            blocks.append(compile_block(node["default"]))
+            ends.append(True)
+        return tuple(blocks), tuple(ends)
+
+    def compile_function(self, node, pure):
+        """<function> compiles its body against a frame of its own, which drive() swaps in for each call."""
+        function = self.functions[node["name"]]
+        outer_scope, outer_variables = self.scope, self.variables
+        self.scope = self.scopes[node["name"]]
+        self.variables = variables = [UNDECLARED] * len(self.scope)
+        try:
+            statements = node["body"]
+            steps = id(node) in self.calling
+            # FOUND YR as the last statement just gives the function's value, with no exception to raise
+            found, found_steps = None, False
+            if statements and statements[-1]["type"] == "return":
+                value = statements[-1]["value"]
+                if value is None:
+                    found = lambda: None
+                elif value["type"] == "call":
+                    found, found_steps = self.compile_tail_call(value), True
+                else:
+                    found, found_steps = self.compile_operand(value)
+                statements = statements[:-1]
+            body = self.compile_block_steps(statements) if steps else self.compile_block(statements)
+        finally:
+            self.scope, self.variables = outer_scope, outer_variables
+
+        if steps:
+            def run():
+                yield from body()
+                if found is None:
+                    return variables[0]  # Without FOUND YR, the function gives IT
+                return (yield from found()) if found_steps else found()
+        else:
+            def run():
+                body()
+                return found() if found is not None else variables[0]
+
+        function.variables = variables
+        function.fresh = [None] + [UNDECLARED] * (len(variables) - 1)
+        function.run = run
+        function.steps = steps
+        if pure:
+            function.cache = CallCache(self.call_cache_size)
+
+    def call_error(self, name, function, count):
+        """Get the error a call with count arguments raises, or None if the function takes that many."""
+        if function is None:
+            return NameError(f"Undefined function '{name}' called.")
+        if count != len(function.parameters):
+            expected = len(function.parameters)
+            return TypeError(f"Function '{name}' takes {expected} argument{'s' if expected != 1 else ''}, "
+                             f"but {count} were given")
+        return None
+
+    def compile_call_steps(self, node):
+        """<call> evaluates the arguments in the caller's frame, then yields the call to drive()."""
+        name = node["name"]
+        arguments = tuple(self.compile_operand(argument) for argument in node["arguments"])
+        function = self.functions.get(name)
+        error = self.call_error(name, function, len(arguments))
+
+        def call():
+            if error is not None:
+                raise error
+            values = []
+            for argument, steps in arguments:
+                values.append((yield from argument()) if steps else argument())
+            return (yield function, values)
+        return call
+
+    def compile_tail_call(self, node):
+        """FOUND YR I IZ ... as a function's last statement hands drive() the call to make in its place."""
+        name = node["name"]
+        arguments = tuple(self.compile_operand(argument) for argument in node["arguments"])
+        function = self.functions.get(name)
+        error = self.call_error(name, function, len(arguments))
+
+        def tail_call():
+            if error is not None:
+                raise error
+            values = []
+            for argument, steps in arguments:
+                values.append((yield from argument()) if steps else argument())
+            return TailCall(function, values)
+        return tail_call
+
+    def compile_return(self, node):
+        """<return> leaves the function with a value; GTFO leaves it with NOOB."""
+        value = self.compile_expr(node["value"]) if node["value"] is not None else None
+
+        def found():
+            raise FunctionReturn(value() if value is not None else None)
+        return found
+
+    def compile_operand(self, node):
+        """Compile a subexpression, returning its closure and whether that is a generator function."""
+        if id(node) in self.calling:
+            return self.compile_steps(node), True
+        return self.compile_expr(node), False
+
+    def compile_steps(self, node):
+        """Compile an expression that calls a function into a generator function returning its value."""
+        return self.expr_step_compilers[node["type"]](node)
+
+    def compile_statement_steps(self, node):
+        """Compile a statement that calls a function into a generator function."""
+        compiler = self.statement_step_compilers.get(node["type"])
+        if compiler:
+            return compiler(node)
+        expr = self.compile_steps(node)
+        variables = self.variables
+
+        def store_it():
+            variables[0] = yield from expr()
+        return store_it
+
+    def compile_block_steps(self, statements):
+        """Compile a list of statements, some of which call functions, into one generator function."""
+        compiled = tuple((self.compile_statement_steps(statement), True) if id(statement) in self.calling
+                         else (self.compile_statement(statement), False) for statement in statements)
+        interpreter = self
+
+        def block():
+            for statement, steps in compiled:
+                if interpreter.cancelled:
+                    raise InterruptedError("Execution cancelled")
+                if steps:
+                    yield from statement()
+                else:
+                    statement()
+        return block
+
+    def compile_math_expr_steps(self, node):
+        """<math_expr> with a call in it, casting both operands to numbers."""
+        operator = MATH_OPERATORS[node["operator"]]
+        left, left_steps = self.compile_operand(node["left"])
+        right, right_steps = self.compile_operand(node["right"])
+
+        def math():
+            left_value = to_numeric((yield from left()) if left_steps else left())
+            return operator(left_value, to_numeric((yield from right()) if right_steps else right()))
+        return math
+
+    def compile_comparison_expr_steps(self, node):
+        """<comparison_expr> with a call in it."""
+        compare = COMPARISON_OPERATORS[node["operator"]]
+        left, left_steps = self.compile_operand(node["left"])
+        right, right_steps = self.compile_operand(node["right"])
+
+        def comparison():
+            left_value = (yield from left()) if left_steps else left()
+            return compare(left_value, (yield from right()) if right_steps else right())
+        return comparison
+
+    def compile_bool_expr_steps(self, node):
+        """<bool_expr> with a call in it, stopping once the result is settled."""
+        operator = node["operator"]
+        operands = tuple(self.compile_operand(operand) for operand in node["operands"])
+        settles = operator in ("EITHER OF", "ANY OF")  # The TROOF that settles the result, for the rest
+
+        def boolean():
+            values = []
+            for operand, steps in operands:
+                value = bool((yield from operand()) if steps else operand())
+                if operator == "NOT":
+                    return not value
+                if value is settles and operator != "WON OF":
+                    return settles
+                values.append(value)
+            return BOOL_OPERATORS[operator](values)
+        return boolean
+
+    def compile_smoosh_expr_steps(self, node):
+        """<smoosh_expr> with a call in it."""
+        parts = tuple(self.compile_operand(part) for part in node["parts"])
+
+        def smoosh():
+            values = []
+            for part, steps in parts:
+                values.append(to_yarn((yield from part()) if steps else part()))
+            return "".join(values)
+        return smoosh
+
+    def compile_typecast_steps(self, node):
+        """<typecast> of an operand with a call in it."""
+        operand, steps = self.compile_operand(node["operand"])
+        datatype = node["datatype"]
+
+        def typecast():
+            return cast((yield from operand()) if steps else operand(), datatype)
+        return typecast
+
+    def compile_print_steps(self, node):
+        """<print> with a call in its operands."""
+        operands = tuple(self.compile_operand(operand) for operand in node["operand"])
+        write = self.output.write
+
+        def visible():
+            parts = []
+            for operand, steps in operands:
+                parts.append(to_yarn((yield from operand()) if steps else operand()))
+            write("".join(parts))
+        return visible
+
+    def compile_var_dec_list_steps(self, node):
+        """<var_dec_list> with a call in its initializers."""
+        declarations = []
+        declared = set()
+        for var_dec in node["declarations"]:
+            name = var_dec["name"]
+            if name in declared:
+                raise NameError(f"Variable '{name}' already declared.")
+            declared.add(name)
+            initialized = var_dec["initialized"]
+            value = self.compile_operand(initialized["value"]) if initialized else (None, False)
+            declarations.append((self.scope.slot(name), value))
+        variables = self.variables
+
+        def declare():
+            for slot, (value, steps) in declarations:
+                if value is None:
+                    variables[slot] = None
+                else:
+                    variables[slot] = (yield from value()) if steps else value()
+        return declare
+
+    def compile_assignment_steps(self, node):
+        """<assignment> of a value with a call in it."""
+        name = node["name"]
+        slot = self.scope.slot(name)
+        value, steps = self.compile_operand(node["value"])
+        variables = self.variables
+
+        def assign():
+            if slot is None or variables[slot] is UNDECLARED:
+                raise NameError(f"Variable '{name}' not declared.")
+            variables[slot] = (yield from value()) if steps else value()
+        return assign
+
+    def compile_loop_steps(self, node):
+        """<loop> with a call in its condition or body."""
+        name = node["variable"]
+        slot = self.scope.slot(name) if name is not None else None
+        step = LOOP_STEPS.get(node["operation"])
+        keep_going = node["clause"] == "WILE"
+        condition, condition_steps = self.compile_operand(node["condition"]) if node["condition"] is not None \
+            else (None, False)
+        body = self.compile_block_steps(node["body"])
+        variables = self.variables
+        interpreter = self
+
+        def loop():
+            while True:
+                if interpreter.cancelled:
+                    raise InterruptedError("Execution cancelled")
+                if condition is not None:
+                    value = (yield from condition()) if condition_steps else condition()
+                    if bool(value) is not keep_going:
+                        return
+                try:
+                    yield from body()
+                except LoopExit:
+                    return
+                if step:
+                    if slot is None or variables[slot] is UNDECLARED:
+                        raise NameError(f"Undeclared variable '{name}' used.")
+                    variables[slot] = to_numeric(variables[slot]) + step
+        return loop
+
+    def compile_if_steps(self, node):
+        """<if> with a call in a condition or branch."""
+        body = self.compile_block_steps(node["body"])
+        elifs = tuple((self.compile_operand(clause["condition"]), self.compile_block_steps(clause["body"]))
+                      for clause in node["elifs"])
+        else_body = self.compile_block_steps(node["else"]) if node["else"] is not None else None
+        variables = self.variables
+
+        def o_rly():
+            if variables[0]:
+                return (yield from body())
+            for (condition, steps), block in elifs:
+                if ((yield from condition()) if steps else condition()):
+                    return (yield from block())
+            if else_body is not None:
+                yield from else_body()
+        return o_rly
+
+    def compile_switch_steps(self, node):
+        """<switch> with a call in a case."""
+        values, troofs = self.switch_table(node)
+        blocks, ends = self.switch_blocks(node, self.compile_block_steps)
+        default = len(node["cases"])
+        count = len(blocks)
+        variables = self.variables
+
+        def wtf():
+            it = variables[0]
+            start = (troofs if it.__class__ is bool else values).get(it, default)
+            try:
+                for index in range(start, count):
+                    yield from blocks[index]()
+                    if ends[index]:
+                        return
+            except LoopExit:
+                pass
+        return wtf
+
+    def compile_return_steps(self, node):
+        """<return> of a value with a call in it, when it is not the function's last statement."""
+        value, steps = self.compile_operand(node["value"])
+
+        def found():
+            raise FunctionReturn((yield from value()) if steps else value())
+        return found
+
+    def compile_break(self, node):
+        """<break> leaves the innermost loop or WTF?."""
+        def gtfo():
+            raise LoopExit
+        return gtfo
+
+    def cancel(self):
+        """Ask a running program to stop; safe to call from another thread."""
+        self.cancelled = True
+
+    def run(self):
+        """Compile the program if needed, then execute it."""
+        try:
+            if self.program is None:
+                self.compile()
+            self.program()
+            return True
+        except (NameError, TypeError, ValueError, ZeroDivisionError, SyntaxError, EOFError,
+                InterruptedError) as e:
+            self.console.append(f"Runtime error: {str(e) or 'End of input'}")
+            return False
+        except RecursionError:
+            # Compiling and evaluating recurse once per level of an expression; calls run on a stack of their own
+            self.console.append(f"Runtime error: {SyntaxAnalyzer.NESTING_ERROR}")
+            return False
+        finally:
+            self.output.flush()
+            self.symbol_table = {name: value for name, value in zip(self.scope.names, self.variables)
+                                 if value is not UNDECLARED}
+
+    def stats(self):
+        """Get the run statistics: the call cache counters of each memoized function."""
+        return {"call_caches": {name: function.cache.stats() for name, function in self.functions.items()
+                                if function.cache is not None}}
+
+
+class VirtualMachine:
+    def __init__(self, code_object, input_func=input, output=None):
+        self.code_object = code_object
+        self.input_func = input_func
+        self.variables = [UNDECLARED] * len(code_object.names)
+        self.variables[0] = None  # IT starts as NOOB
+        self.symbol_table = {}
+        self.console = []  # This will hold the console output
+        self.output = output or OutputSink.MemorySink(self.console)  # Receives each VISIBLE line
+        self.cancelled = False  # Set from another thread to stop the program at its next backward jump
+
+    def execute(self):
+        """Run the code, dispatching each instruction through a table of handlers indexed by opcode.
+
+        A handler takes its instruction's argument and the offset of the next instruction, and returns the
+        offset to go on from, so a jump is just a handler returning its target. A call keeps the caller's offset
+        and frame on a stack of its own, so LOLCODE recursion is limited by memory, not by Python's recursion limit.
+        """
+        code = self.code_object.code
+        consts = self.code_object.consts
+        functions = self.code_object.functions
+        names = self.code_object.names  # Of the running frame's variables
+        variables = self.variables  # The running frame: the globals, or the slots of the function being called
+        frames = []  # (offset to return to, caller's variables, caller's names) of every call under way
+        write = self.output.write
+        flush = self.output.flush
+        input_func = self.input_func
+        datatypes = Bytecode.DATATYPES
+        vm = self
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        def load_const(argument, pc):
+            push(consts[argument])
+            return pc
+
+        def load_name(argument, pc):
+            value = variables[argument]
+            if value is UNDECLARED:
+                raise NameError(f"Undeclared variable '{names[argument]}' used.")
+            push(value)
+            return pc
+
+        def load_numeric(argument, pc):
+            value = variables[argument]
+            if value.__class__ is not int and value.__class__ is not float:
+                if value is UNDECLARED:
+                    raise NameError(f"Undeclared variable '{names[argument]}' used.")
+                value = to_numeric(value)
+            push(value)
+            return pc
+
+        def store_name(argument, pc):
+            if variables[argument] is UNDECLARED:
+                raise NameError(f"Variable '{names[argument]}' not declared.")
+            variables[argument] = pop()
+            return pc
+
+        def declare_name(argument, pc):
+            variables[argument] = pop()
+            return pc
+
+        def math(operator):
+            """Handler applying operator to the two numbers on top of the stack."""
+            def handler(argument, pc):
+                right = pop()
+                stack[-1] = operator(stack[-1], right)
+                return pc
+            return handler
+
+        def math_const(operator):
+            """Handler applying operator to the number on top of the stack and a constant one."""
+            def handler(argument, pc):
+                stack[-1] = operator(stack[-1], consts[argument])
+                return pc
+            return handler
+
+        def numeric(argument, pc):
+            stack[-1] = to_numeric(stack[-1])
+            return pc
+
+        def smoosh(argument, pc):
+            parts = [to_yarn(value) for value in stack[-argument:]]
+            del stack[-argument:]
+            push("".join(parts))
+            return pc
+
+        def visible(argument, pc):
+            parts = [to_yarn(value) for value in stack[-argument:]]
+            del stack[-argument:]
+            write("".join(parts))
+            return pc
+
+        def typecast(argument, pc):
+            stack[-1] = cast(stack[-1], datatypes[argument])
+            return pc
+
+        def gimmeh(argument, pc):
+            if variables[argument] is UNDECLARED:
+                raise NameError(f"Undeclared variable '{names[argument]}' used.")
+            flush()  # Show any prompt before waiting for input
+            variables[argument] = input_func()
+            return pc
+
+        def both_saem(argument, pc):
+            right = pop()
+            stack[-1] = same(stack[-1], right)
+            return pc
+
+        def diffrint(argument, pc):
+            right = pop()
+            stack[-1] = not same(stack[-1], right)
+            return pc
+
+        def not_(argument, pc):
+            stack[-1] = not stack[-1]
+            return pc
+
+        def won(argument, pc):
+            right = pop()
+            stack[-1] = (not stack[-1]) != (not right)
+            return pc
+
+        def jump(argument, pc):
+            if argument < pc and vm.cancelled:  # Every loop jumps back, so every pass checks
+                raise InterruptedError("Execution cancelled")
+            return argument
+
+        def jump_if_false(argument, pc):
+            return pc if pop() else argument
+
+        def jump_if_true(argument, pc):
+            return argument if pop() else pc
+
+        def step(amount):
+            """Handler adding amount to the loop variable, for UPPIN and NERFIN."""
+            def handler(argument, pc):
+                value = variables[argument]
+                if value is UNDECLARED:
+                    raise NameError(f"Undeclared variable '{names[argument]}' used.")
+                variables[argument] = to_numeric(value) + amount
+                return pc
+            return handler
+
+        def switch(argument, pc):
+            values, troofs, default = consts[argument]
+            it = variables[0]
+            return (troofs if it.__class__ is bool else values).get(it, default)
+
+        def call(argument, pc):
+            nonlocal variables, names
+            if vm.cancelled:  # Recursion need not loop, so every call checks too
+                raise InterruptedError("Execution cancelled")
+            function = functions[argument]
+            count = len(function.parameters)
+            start = len(stack) - count
+            frame = [None] + stack[start:] + [UNDECLARED] * (len(function.names) - count - 1)
+            del stack[start:]
+            frames.append((pc, variables, names))
+            variables, names = frame, function.names
+            return function.offset
+
+        def return_(argument, pc):
+            nonlocal variables, names
+            pc, variables, names = frames.pop()
+            return pc  # The function's value stays on the stack
+
+        def raise_(argument, pc):
+            raise consts[argument]
+
+        handlers = [None] * len(Bytecode.OPCODE_NAMES)
+        handlers[Bytecode.LOAD_CONST] = load_const
+        handlers[Bytecode.LOAD_NAME] = load_name
+        handlers[Bytecode.LOAD_NUMERIC] = load_numeric
+        handlers[Bytecode.STORE_NAME] = store_name
+        handlers[Bytecode.DECLARE_NAME] = declare_name
+        for operator, opcode in Bytecode.MATH_OPCODES.items():
+            handlers[opcode] = math(MATH_OPERATORS[operator])
+            handlers[Bytecode.MATH_CONST_OPCODES[operator]] = math_const(MATH_OPERATORS[operator])
+        handlers[Bytecode.NUMERIC] = numeric
+        handlers[Bytecode.SMOOSH] = smoosh
+        handlers[Bytecode.PRINT] = visible
+        handlers[Bytecode.CAST] = typecast
+        handlers[Bytecode.INPUT] = gimmeh
+        handlers[Bytecode.BOTH_SAEM] = both_saem
+        handlers[Bytecode.DIFFRINT] = diffrint
+        handlers[Bytecode.NOT] = not_
+        handlers[Bytecode.WON] = won
+        handlers[Bytecode.JUMP] = jump
+        handlers[Bytecode.JUMP_IF_FALSE] = jump_if_false
+        handlers[Bytecode.JUMP_IF_TRUE] = jump_if_true
+        handlers[Bytecode.UPPIN] = step(1)
+        handlers[Bytecode.NERFIN] = step(-1)
+        handlers[Bytecode.SWITCH] = switch
+        handlers[Bytecode.CALL] = call
+        handlers[Bytecode.RETURN] = return_
+        handlers[Bytecode.RAISE] = raise_
+
+        pc = self.code_object.entry
+        end = len(code)
+        while pc < end:
+            pc = handlers[code[pc]](code[pc + 1], pc + 2)
+
+    def cancel(self):
+        """Ask a running program to stop; safe to call from another thread."""
+        self.cancelled = True
+
+    def run(self):
+        """Execute the program, then rebuild the symbol table from the variable slots."""
+        try:
+            self.execute()
+            return True
+        except (NameError, TypeError, ValueError, ZeroDivisionError, EOFError, InterruptedError) as e:
+            self.console.append(f"Runtime error: {str(e) or 'End of input'}")
+            return False
+        except RecursionError:
+            self.console.append(f"Runtime error: {SyntaxAnalyzer.NESTING_ERROR}")
+            return False
+        finally:
+            self.output.flush()
+            self.symbol_table = {name: value for name, value in zip(self.code_object.names, self.variables)
+                                 if value is not UNDECLARED}
+
+    def stats(self):
+        """Get the run statistics, shaped like the Interpreter's; the VM memoizes no calls."""
+        return {"call_caches": {}}
@@ -1,148 +1,304 @@
+import codecs
 import re
 
+# Tokens' higher level classifications
+TOKEN_CLASSIFICATIONS = {
+    "Code Delimiter": ["START", "END"],
+    "Var. Dec. List Delimiter": ["VAR_INIT_START", "VAR_INIT_END"],
+    "Variable Declaration": ["VAR_INIT"],
+    "Comment": ["COMMENT_START", "MULTILINE_COMMENT_START", "MULTILINE_COMMENT_END"],
+    "Variable Assignment": ["VAR_INIT_VALUE", "ASSIGNMENT"],
+    "Math Operator": ["ARITHMETIC_OPERATOR"],
+    "Boolean Operator": ["BOOL_OPERATOR"],
+    "Concatenation": ["CONCAT"],
+    "Typecast": ["TYPECAST", "RECAST"],
+    "Output Keyword": ["PRINT"],
+    "Input Keyword": ["INPUT"],
+    "If-then Keyword": ["IF_THEN", "IF", "ELIF", "ELSE", "IFSWITCH_END"],
+    "Switch-case Keyword": ["SWITCH", "CASE", "CASE_END"],
+    "Loop Keyword": ["LOOP_START", "LOOP_END", "LOOP_ITERATOR", "LOOPFUNC_PARAM", "LOOP_BOOL"],
+    "Function Keyword": ["FUNC_START", "FUNC_END", "FUNC_RETURN_START", "FUNC_RETURN_END", "FUNC_CALL_START", "FUNC_CALL_END"],
+    "Datatype Keyword": ["DATA_TYPE"],
+    "Literal": ["TROOF", "NUMBAR", "NUMBR", "YARN"],
+    "Identifier": ["VARIABLE"],
+    "Whitespace": ["NEWLINE", "TAB", "WHITESPACE"],
+    "Print Add Arity": ["PRINT_ADD_ARITY"],
+    "Add Arity": ["ADD_ARITY"],
+    "Unrecognized": ["UNRECOGNIZED", "UNTERMINATED_YARN"]
+}
+
+# Token lower level classifications
+RULES = [
+    ("START", r"HAI"),
+    ("END", r"KTHXBYE"),
+    ("VAR_INIT_START", r"WAZZUP"),
+    ("VAR_INIT_END", r"BUHBYE"),
+    ("COMMENT_START", r"BTW"),
+    ("MULTILINE_COMMENT_START", r"OBTW"),
+    ("MULTILINE_COMMENT_END", r"TLDR"),
+    ("VAR_INIT", r"I HAS A"),
+    ("VAR_INIT_VALUE", r"ITZ"),
+    ("ASSIGNMENT", r"R"),
+    ("ARITHMETIC_OPERATOR", r"SUM OF|DIFF OF|PRODUKT OF|QUOSHUNT OF|MOD OF|BIGGR OF|SMALLR OF"),
+    ("BOOL_OPERATOR", r"BOTH OF|EITHER OF|WON OF|BOTH SAEM|DIFFRINT|NOT|ALL OF|ANY OF"),
+    ("CONCAT", r"SMOOSH"),
+    ("TYPECAST", r"MAEK"),
+    ("RECAST", r"IS NOW A"),
+    ("PRINT", r"VISIBLE"),
+    ("INPUT", r"GIMMEH"),
+    ("IF_THEN", r"O RLY\?"),
+    ("IF", r"YA RLY"),
+    ("ELIF", r"MEBBE"),
+    ("ELSE", r"NO WAI"),
+    ("IFSWITCH_END", r"OIC"),
+    ("SWITCH", r"WTF\?"),
+    ("CASE_END", r"OMGWTF"),  # Before CASE, which would match its start
+    ("CASE", r"OMG"),
+    ("LOOP_START", r"IM IN YR"),
+    ("LOOP_END", r"IM OUTTA YR"),
+    ("LOOP_ITERATOR", r"UPPIN|NERFIN"),
+    ("LOOPFUNC_PARAM", r"YR"),
+    ("LOOP_BOOL", r"TIL|WILE"),
+    ("FUNC_START", r"HOW IZ I"),
+    ("FUNC_END", r"IF U SAY SO"),
+    ("FUNC_RETURN_START", r"FOUND YR"),
+    ("FUNC_RETURN_END", r"GTFO"),
+    ("FUNC_CALL_START", r"I IZ"),
+    ("FUNC_CALL_END", r"MKAY"),
+    ("DATA_TYPE", r"(NOOB|TROOF|NUMBAR|NUMBR|YARN)"),
+    ("TROOF", r"(WIN|FAIL)"),
+    ("ADD_ARITY", r"AN"),
+    ("NUMBAR", r"-?\d+\.\d+"),
+    ("NUMBR", r"-?\d+"),
+    ("YARN", r'"([^"\n]*)"'),
+    ("UNTERMINATED_YARN", r'"[^"\n]*'),  # A YARN can't span lines, so one left open ends with its line
+    ("VARIABLE", r"[a-zA-Z]\w*"),
+    ("NEWLINE", r"\n"),
+    ("TAB", r"[\t]+"),
+    ("WHITESPACE", r"[ ]+"),
+    ("PRINT_ADD_ARITY", r"\+"),
+    ("UNRECOGNIZED", r"."),
+]
+
+# Every rule joined into one alternation, compiled once per process
+MASTER_PATTERN = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in RULES))
+
+CHUNK_SIZE = 1 << 16  # Characters read per chunk when streaming
+
+# Token type -> higher level classification, so classifying a token is one dict lookup
+CLASSIFICATION_OF = {token_type: classification
+                     for classification, token_types in TOKEN_CLASSIFICATIONS.items()
+                     for token_type in token_types}
+
+
 class LexicalAnalyzer:
-    def __init__(self):
+    def __init__(self, debug=False):
         self.tokens = []
         self.lexemes = []
         self.rows = []
         self.columns = []
         self.lin_num = 1
         self.lin_start = 0
+        self.comment_flag = False
+        self.multi_comment_flag = False
+        self.comment = ""
+        self.comment_column = 0
+        self.debug = debug  # Print every token as it is classified
+        self.token_classifications = TOKEN_CLASSIFICATIONS
+        self.rules = RULES
 
-        # Tokens' higher level classifications
-        self.token_classifications = {
-            "Code Delimiter": ["START", "END"],
-            "Var. Dec. List Delimiter": ["VAR_INIT_START", "VAR_INIT_END"],
-            "Variable Declaration": ["VAR_INIT"],
-            "Comment": ["COMMENT_START", "MULTILINE_COMMENT_START", "MULTILINE_COMMENT_END"],
-            "Variable Assignment": ["VAR_INIT_VALUE", "ASSIGNMENT"],
-            "Math Operator": ["ARITHMETIC_OPERATOR"],
-            "Boolean Operator": ["BOOL_OPERATOR"],
-            "Concatenation": ["CONCAT"],
-            "Typecast": ["TYPECAST", "RECAST"],
-            "Output Keyword": ["PRINT"],
-            "Input Keyword": ["INPUT"],
-            "If-then Keyword": ["IF_THEN", "IF", "ELIF", "ELSE", "IFSWITCH_END"],
-            "Switch-case Keyword": ["SWITCH", "CASE", "CASE_END"],
-            "Loop Keyword": ["LOOP_START", "LOOP_END", "LOOP_ITERATOR", "LOOPFUNC_PARAM", "LOOP_BOOL"],
-            "Function Keyword": ["FUNC_START", "FUNC_END", "FUNC_RETURN_START", "FUNC_RETURN_END", "FUNC_CALL_START", "FUNC_CALL_END"],
-            "Datatype Keyword": ["DATA_TYPE"],
-            "Literal": ["TROOF", "NUMBAR", "NUMBR", "YARN"],
-            "Identifier": ["VARIABLE"],
-            "Whitespace": ["NEWLINE", "TAB", "WHITESPACE"],
-            "Print Add Arity": ["PRINT_ADD_ARITY"],
-            "Add Arity": ["ADD_ARITY"],
-            "Unrecognized": ["UNRECOGNIZED"]
-        }
-
-        # Token lower level classifications
-        self.rules = [
-            ("START", r"HAI"),
-            ("END", r"KTHXBYE"),
-            ("VAR_INIT_START", r"WAZZUP"),
-            ("VAR_INIT_END", r"BUHBYE"),
-            ("COMMENT_START", r"BTW"),
-            ("MULTILINE_COMMENT_START", r"OBTW"),
-            ("MULTILINE_COMMENT_END", r"TLDR"),
-            ("VAR_INIT", r"I HAS A"),
-            ("VAR_INIT_VALUE", r"ITZ"),
-            ("ASSIGNMENT", r"R"),
-            ("ARITHMETIC_OPERATOR", r"SUM OF|DIFF OF|PRODUKT OF|QUOSHUNT OF|MOD OF|BIGGR OF|SMALLR OF"),
-            ("BOOL_OPERATOR", r"BOTH OF|EITHER OF|WON OF|BOTH SAEM|DIFFRINT|NOT|ALL OF|ANY OF"),
-            ("CONCAT", r"SMOOSH"),
-            ("TYPECAST", r"MAEK"),
-            ("RECAST", r"IS NOW A"),
-            ("PRINT", r"VISIBLE"),
-            ("INPUT", r"GIMMEH"),
-            ("IF_THEN", r"O RLY\?"),
-            ("IF", r"YA RLY"),
-            ("ELIF", r"MEBBE"),
-            ("ELSE", r"NO WAI"),
-            ("IFSWITCH_END", r"OIC"),
-            ("SWITCH", r"WTF\?"),
-            ("CASE", r"OMG"),
-            ("CASE_END", r"OMGWTF"),
-            ("LOOP_START", r"IM IN YR"),
-            ("LOOP_END", r"IM OUTTA YR"),
-            ("LOOP_ITERATOR", r"UPPIN|NERFIN"),
-            ("LOOPFUNC_PARAM", r"YR"),
-            ("LOOP_BOOL", r"TIL|WILE"),
-            ("FUNC_START", r"HOW IZ I"),
-            ("FUNC_END", r"IF U SAY SO"),
-            ("FUNC_RETURN_START", r"FOUND YR"),
-            ("FUNC_RETURN_END", r"GTFO"),
-            ("FUNC_CALL_START", r"I IZ"),
-            ("FUNC_CALL_END", r"MKAY"),
-            ("DATA_TYPE", r"(NOOB|TROOF|NUMBAR|NUMBR|YARN)"),
-            ("TROOF", r"(WIN|FAIL)"),
-            ("ADD_ARITY", r"AN"),
-            ("NUMBAR", r"-?\d+\.\d+"),
-            ("NUMBR", r"-?\d+"),
-            ("YARN", r'"([^"]*)"'),
-            ("VARIABLE", r"[a-zA-Z]\w*"),
-            ("NEWLINE", r"\n"),
-            ("TAB", r"[\t]+"),
-            ("WHITESPACE", r"[ ]+"),
-            ("PRINT_ADD_ARITY", r"\+"),
-            ("UNRECOGNIZED", r"."),
-        ]
+    def reset(self):
+        """Forget the line number and comment state left by a previous run."""
+        self.lin_num = 1
+        self.lin_start = 0
+        self.comment_flag = False
+        self.multi_comment_flag = False
+        self.comment = ""
+        self.comment_column = 0
 
     def gen_tokens(self, code):
         self.tokens.clear()
         self.lexemes.clear()
         self.rows.clear()
         self.columns.clear()
-        
-        token_rules = "|".join(f"(?P<{name}>{pattern})" for name, pattern in self.rules)
-        comment_flag = False
-        multi_comment_flag  = False
-        comment = ""
-        comment_column = 0
-
-        for match in re.finditer(token_rules, code):
+        self.reset()
+        self.scan(code, self.tokens, self.lexemes, self.rows, self.columns)
+        return self.tokens, self.lexemes, self.rows, self.columns
+
+    def iter_tokens(self, source, chunk_size=CHUNK_SIZE):
+        """Lazily yield (token, lexeme, row, column) from a text file, binary file or mmap.
+
+        Only whole lines are scanned, so memory stays bounded by the chunk size. Comment
+        state carries over between chunks.
+        """
+        self.reset()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        carry = ""
+        tokens, lexemes, rows, columns = [], [], [], []
+        while True:
+            chunk = source.read(chunk_size)
+            at_eof = not chunk
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk, final=at_eof)
+            text = carry + chunk
+            end = len(text) if at_eof else text.rfind("\n") + 1
+            if end:
+                self.scan(text[:end], tokens, lexemes, rows, columns)
+                yield from zip(tokens, lexemes, rows, columns)
+                tokens.clear()
+                lexemes.clear()
+                rows.clear()
+                columns.clear()
+            carry = text[end:]
+            if at_eof:
+                return
+
+    def scan(self, code, tokens, lexemes, rows, columns):
+        """Tokenize code into the four parallel lists."""
+        tokens_append = tokens.append
+        lexemes_append = lexemes.append
+        rows_append = rows.append
+        columns_append = columns.append
+        classification_of = CLASSIFICATION_OF
+        debug = self.debug
+        lin_num = self.lin_num
+        lin_start = 0
+        comment_flag = self.comment_flag
+        multi_comment_flag = self.multi_comment_flag
+        comment = self.comment
+        comment_column = self.comment_column
+
+        for match in MASTER_PATTERN.finditer(code):
             token_type = match.lastgroup
             token_lexeme = match.group()
-            col = match.start() - self.lin_start
+            col = match.start() - lin_start
 
-            if token_type == "NEWLINE":
+            if token_type == "WHITESPACE" or token_type == "TAB":
+                if comment_flag:
+                    comment += token_lexeme
+            elif token_type == "NEWLINE":
                 if comment_flag:
                     if not multi_comment_flag:
                         comment_flag = False
                     if comment:
-                        self.columns.append(comment_column)
-                        self.tokens.append("COMMENT")
-                        self.lexemes.append(comment)
-                        self.rows.append(self.lin_num)
+                        columns_append(comment_column)
+                        tokens_append("COMMENT")
+                        lexemes_append(comment)
+                        rows_append(lin_num)
                         comment, comment_column = "", 0
-                self.columns.append(col)
-                self.tokens.append(token_type)
-                self.lexemes.append("\\n")
-                self.rows.append(self.lin_num)
-                self.lin_start = match.end()
-                self.lin_num += 1
+                columns_append(col)
+                tokens_append(token_type)
+                lexemes_append("\\n")
+                rows_append(lin_num)
+                lin_start = match.end()
+                lin_num += 1
             elif token_type == "MULTILINE_COMMENT_END":
                 comment_flag, multi_comment_flag = False, False
-                self.columns.append(col)
-                self.tokens.append(token_type)
-                self.lexemes.append(token_lexeme)
-                self.rows.append(self.lin_num)
+                columns_append(col)
+                tokens_append(token_type)
+                lexemes_append(token_lexeme)
+                rows_append(lin_num)
             elif comment_flag:
                 comment += token_lexeme
-            elif token_type in ("COMMENT_START", "MULTILINE_COMMENT_START"):
+            elif token_type == "COMMENT_START" or token_type == "MULTILINE_COMMENT_START":
                 comment_flag = True
                 if token_type == "MULTILINE_COMMENT_START":
                     multi_comment_flag = True
-                self.columns.append(col)
+                columns_append(col)
                 comment_column = col + 1
-                self.tokens.append(token_type)
-                self.lexemes.append(token_lexeme)
-                self.rows.append(self.lin_num)
-            elif token_type not in ("TAB", "WHITESPACE"):
-                self.columns.append(col)
-                classification = next((key for key, value in self.token_classifications.items() if token_type in value), "Unclassified")
-                self.tokens.append(classification)
-                self.lexemes.append(token_lexeme)
-                self.rows.append(self.lin_num)
-                print(f"Token: {token_lexeme}, Type: {token_type}, Classification: {classification}")
-
-        return self.tokens, self.lexemes, self.rows, self.columns
\ No newline at end of file
+                tokens_append(token_type)
+                lexemes_append(token_lexeme)
+                rows_append(lin_num)
+            else:
+                columns_append(col)
+                classification = classification_of.get(token_type, "Unclassified")
+                tokens_append(classification)
+                lexemes_append(token_lexeme)
+                rows_append(lin_num)
+                if debug:
+                    print(f"Token: {token_lexeme}, Type: {token_type}, Classification: {classification}")
+
+        self.lin_num, self.comment_flag, self.multi_comment_flag = lin_num, comment_flag, multi_comment_flag
+        self.comment, self.comment_column = comment, comment_column
+        self.lin_start = lin_start
+
+
+class IncrementalLexer:
+    def __init__(self, debug=False):
+        self.lexer = LexicalAnalyzer(debug)
+        self.lines = [""]  # Source lines, without their newlines
+        self.line_tokens = [[]]  # (token, lexeme, column) of each line
+        self.line_states = [self.initial_state()]  # Comment state at the start of each line
+        self.relexed_lines = 0  # Lines tokenized by the last update, for checking the work done
+
+    def initial_state(self):
+        """Comment state at the start of the program: (comment_flag, multi_comment_flag, comment, comment_column)."""
+        return (False, False, "", 0)
+
+    def update(self, code):
+        """Re-lex only what changed since the last call, returning (first, old_end, new_end).
+
+        The tokens of lines [first, old_end) of the previous code were replaced by the
+        tokens of lines [first, new_end) of code; every other line kept its tokens.
+        """
+        new_lines = code.split("\n")
+        old_count, new_count = len(self.lines), len(new_lines)
+        first = 0
+        limit = min(old_count, new_count)
+        while first < limit and self.lines[first] == new_lines[first]:
+            first += 1
+        suffix = 0
+        while suffix < limit - first and self.lines[old_count - 1 - suffix] == new_lines[new_count - 1 - suffix]:
+            suffix += 1
+        return self.edit(first, old_count - suffix, new_lines[first:new_count - suffix])
+
+    def edit(self, first, last, new_lines):
+        """Replace lines [first, last) with new_lines, re-lexing until the comment state converges."""
+        old_count = len(self.lines)
+        new_count = old_count - (last - first) + len(new_lines)
+        new_end = first + len(new_lines)
+        start = first
+        if start > 0 and (first == old_count or first == new_count):
+            start -= 1  # The line before switches between being and not being the last line
+        state = self.line_states[start]
+
+        self.lines[first:last] = new_lines
+        self.line_tokens[first:last] = [None] * len(new_lines)
+        self.line_states[first:last] = [None] * len(new_lines)
+
+        self.relexed_lines = 0
+        index = start
+        while index < len(self.lines):
+            if index >= new_end and self.line_states[index] == state:
+                break  # Converged: everything from here on lexes exactly as before
+            state = self.lex_line(index, state)
+            index += 1
+        return start, index - new_end + last, index
+
+    def gen_tokens(self):
+        """Assemble the four parallel lists, as LexicalAnalyzer.gen_tokens returns them."""
+        return self.tokens_between(0, len(self.lines))
+
+    def tokens_between(self, first, last):
+        """Get the tokens of lines [first, last) as four parallel lists, with absolute rows."""
+        tokens, lexemes, rows, columns = [], [], [], []
+        for index in range(first, last):
+            for token, lexeme, column in self.line_tokens[index]:
+                tokens.append(token)
+                lexemes.append(lexeme)
+                rows.append(index + 1)
+                columns.append(column)
+        return tokens, lexemes, rows, columns
+
+    def lex_line(self, index, state):
+        """Lex the line at index, starting in the given comment state, returning the state it ends in."""
+        lexer = self.lexer
+        text = self.lines[index] if index == len(self.lines) - 1 else self.lines[index] + "\n"
+        lexer.lin_num = 1
+        lexer.comment_flag, lexer.multi_comment_flag, lexer.comment, lexer.comment_column = state
+        tokens, lexemes, rows, columns = [], [], [], []
+        lexer.scan(text, tokens, lexemes, rows, columns)
+        self.line_tokens[index] = list(zip(tokens, lexemes, columns))
+        self.line_states[index] = state
+        self.relexed_lines += 1
+        return lexer.comment_flag, lexer.multi_comment_flag, lexer.comment, lexer.comment_column
\ No newline at end of file
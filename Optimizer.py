@@ -0,0 +1,221 @@
+import Interpreter
+import SyntaxAnalyzer
+import TypeInference
+
+# Operators whose right operand, at this value, gives back the left operand unchanged
+RIGHT_IDENTITIES = {"SUM OF": 0, "DIFF OF": 0, "PRODUKT OF": 1, "QUOSHUNT OF": 1}
+# Operators whose left operand, at this value, gives back the right operand unchanged
+LEFT_IDENTITIES = {"SUM OF": 0, "PRODUKT OF": 1}
+# Identities that also hold for every NUMBAR; x + 0 is not one, since -0.0 + 0 is 0.0
+NUMBAR_IDENTITIES = {("DIFF OF", 0), ("PRODUKT OF", 1), ("QUOSHUNT OF", 1)}
+
+
+def literal(value):
+    """Make a literal node holding a runtime value, written the way the lexer would have read it."""
+    if value is True:
+        lexeme = "WIN"
+    elif value is False:
+        lexeme = "FAIL"
+    elif isinstance(value, str):
+        lexeme = f'"{value}"'
+    else:
+        lexeme = repr(value)  # Round-trips exactly through literal_value
+    return {"type": "literal", "value": lexeme}
+
+
+def literal_of(node):
+    """Get the runtime value of a literal node, or None for anything else."""
+    if node["type"] == "literal":
+        return Interpreter.literal_value(node["value"])
+    return None
+
+
+class Optimizer:
+    def __init__(self, ast):
+        self.ast = ast
+        self.folded = 0  # Nodes replaced by something simpler
+
+    def optimize(self):
+        """Get a simplified copy of the AST; the original, which the incremental parser may reuse, is left alone."""
+        if not self.ast:
+            return self.ast
+        try:
+            return [self.optimize_block(self.ast[0])] + self.ast[1:]
+        except RecursionError:
+            raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None
+
+    def optimize_block(self, statements):
+        """Simplify a statement list, tracking which variables have a known datatype along the way."""
+        known = {}  # Variable -> datatype it is known to hold at this point of the block
+        optimized = []
+        for statement in statements:
+            statement = self.optimize_statement(statement, known)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def optimize_statement(self, node, known):
+        """Simplify one statement, or return None to drop it."""
+        kind = node["type"]
+        if kind == "print":
+            return dict(node, operand=[self.fold(operand, known) for operand in node["operand"]])
+        elif kind == "input":
+            known[node["name"]] = "YARN"
+            return node
+        elif kind == "var_dec_list":
+            declarations = []
+            for var_dec in node["declarations"]:
+                initialized = var_dec["initialized"]
+                if initialized:
+                    value = self.fold(initialized["value"], known)
+                    known[var_dec["name"]] = self.datatype(value, known)
+                    var_dec = dict(var_dec, initialized=dict(initialized, value=value))
+                else:
+                    known[var_dec["name"]] = "NOOB"
+                declarations.append(var_dec)
+            return dict(node, declarations=declarations)
+        elif kind == "assignment":
+            value = self.fold(node["value"], known)
+            known[node["name"]] = self.datatype(value, known)
+            return dict(node, value=value)
+        elif kind == "recast":
+            if known.get(node["name"]) == node["datatype"]:
+                self.folded += 1
+                return None  # Casting a value to its own datatype gives back the same value
+            known[node["name"]] = node["datatype"]
+            return node
+        elif kind in TypeInference.EXPRESSION_TYPES:
+            value = self.fold(node, known)
+            known["IT"] = self.datatype(value, known)
+            return dict(value, row=node["row"]) if "row" in node else value
+        elif kind == "function":
+            return dict(node, body=self.optimize_block(node["body"]))  # Runs in a scope of its own
+        elif kind == "return":
+            if node["value"] is not None:
+                node = dict(node, value=self.fold(node["value"], known))
+            return node
+        elif kind == "loop":
+            # Any pass through the body may have changed any variable, so nothing is known at the head
+            known.clear()
+            condition = node["condition"] and self.fold(node["condition"], known)
+            return dict(node, condition=condition, body=self.optimize_block(node["body"]))
+        elif kind == "if":
+            elifs = [dict(clause, condition=self.fold(clause["condition"], known),
+                          body=self.optimize_block(clause["body"])) for clause in node["elifs"]]
+            node = dict(node, body=self.optimize_block(node["body"]), elifs=elifs)
+            if node["else"] is not None:
+                node["else"] = self.optimize_block(node["else"])
+            known.clear()  # Whichever branch ran may have assigned anything
+            return node
+        elif kind == "switch":
+            cases = [dict(case, body=self.optimize_block(case["body"])) for case in node["cases"]]
+            node = dict(node, cases=cases, default=node["default"] and self.optimize_block(node["default"]))
+            known.clear()
+            return node
+        # A statement this pass does not understand may assign anything
+        known.clear()
+        return node
+
+    def fold(self, node, known):
+        """Get the simplest expression with the same value and the same runtime errors."""
+        kind = node["type"]
+        if kind == "math_expr":
+            return self.fold_math_expr(node, known)
+        elif kind == "smoosh_expr":
+            return self.fold_smoosh_expr(node, known)
+        elif kind == "typecast":
+            return self.fold_typecast(node, known)
+        elif kind == "comparison_expr":
+            return self.fold_comparison_expr(node, known)
+        elif kind == "bool_expr":
+            return self.fold_bool_expr(node, known)
+        elif kind == "call":
+            return dict(node, arguments=[self.fold(argument, known) for argument in node["arguments"]])
+        return node
+
+    def fold_math_expr(self, node, known):
+        left = self.fold(node["left"], known)
+        right = self.fold(node["right"], known)
+        operator = node["operator"]
+        if left["type"] == "literal" and right["type"] == "literal":
+            try:
+                value = Interpreter.MATH_OPERATORS[operator](Interpreter.to_numeric(literal_of(left)),
+                                                             Interpreter.to_numeric(literal_of(right)))
+            except (TypeError, ValueError, ZeroDivisionError):
+                pass  # Leave the error for run time, where it is reported in order
+            else:
+                self.folded += 1
+                return literal(value)
+
+        # x + 0, x * 1 and friends, only when x is known to be a number already
+        right_value = literal_of(right)
+        if type(right_value) is int and RIGHT_IDENTITIES.get(operator) == right_value:
+            if self.is_identity_operand(left, operator, right_value, known):
+                self.folded += 1
+                return left
+        left_value = literal_of(left)
+        if type(left_value) is int and LEFT_IDENTITIES.get(operator) == left_value:
+            if self.is_identity_operand(right, operator, left_value, known):
+                self.folded += 1
+                return right
+
+        if left is node["left"] and right is node["right"]:
+            return node
+        return dict(node, left=left, right=right)
+
+    def is_identity_operand(self, operand, operator, identity, known):
+        """Check that applying the identity to operand would give back operand itself, datatype and all."""
+        datatype = self.datatype(operand, known)
+        return datatype == "NUMBR" or (datatype == "NUMBAR" and (operator, identity) in NUMBAR_IDENTITIES)
+
+    def fold_smoosh_expr(self, node, known):
+        parts = []
+        for part in (self.fold(part, known) for part in node["parts"]):
+            if part["type"] == "literal" and parts and parts[-1]["type"] == "literal":
+                # Adjacent literals concatenate now, exactly as SMOOSH would cast them
+                self.folded += 1
+                parts[-1] = literal(Interpreter.to_yarn(literal_of(parts[-1])) +
+                                    Interpreter.to_yarn(literal_of(part)))
+            else:
+                parts.append(part)
+        if len(parts) == 1 and parts[0]["type"] == "literal":
+            return literal(Interpreter.to_yarn(literal_of(parts[0])))
+        return dict(node, parts=parts)
+
+    def fold_typecast(self, node, known):
+        operand = self.fold(node["operand"], known)
+        datatype = node["datatype"]
+        if operand["type"] == "literal" and datatype != "NOOB":  # NOOB has no literal to fold into
+            try:
+                value = Interpreter.cast(literal_of(operand), datatype)
+            except (TypeError, ValueError):
+                pass
+            else:
+                self.folded += 1
+                return literal(value)
+        if self.datatype(operand, known) == datatype:
+            self.folded += 1
+            return operand  # MAEK to the datatype it already has
+        return dict(node, operand=operand)
+
+    def fold_comparison_expr(self, node, known):
+        left = self.fold(node["left"], known)
+        right = self.fold(node["right"], known)
+        if left["type"] == "literal" and right["type"] == "literal":
+            self.folded += 1
+            return literal(Interpreter.COMPARISON_OPERATORS[node["operator"]](literal_of(left), literal_of(right)))
+        if left is node["left"] and right is node["right"]:
+            return node
+        return dict(node, left=left, right=right)
+
+    def fold_bool_expr(self, node, known):
+        operands = [self.fold(operand, known) for operand in node["operands"]]
+        if all(operand["type"] == "literal" for operand in operands):
+            self.folded += 1
+            return literal(Interpreter.BOOL_OPERATORS[node["operator"]](
+                [Interpreter.to_troof(literal_of(operand)) for operand in operands]))
+        return dict(node, operands=operands)
+
+    def datatype(self, node, known):
+        """Get the datatype an expression always evaluates to, or None if it can vary."""
+        return TypeInference.datatype(node, known)
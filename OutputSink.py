@@ -0,0 +1,122 @@
+import collections
+import sys
+import threading
+import time
+
+# Flush thresholds: whichever is reached first
+DEFAULT_MAX_BYTES = 64 * 1024  # Characters of buffered output
+DEFAULT_MAX_DELAY = 0.05  # Seconds since the last flush
+
+
+class OutputSink:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_delay=DEFAULT_MAX_DELAY):
+        """Buffers VISIBLE lines and hands them to write_block a block at a time."""
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.buffer = collections.deque()  # Appended to by the program, drained by whichever thread flushes
+        self.size = 0  # Approximate once another thread flushes too, which only moves a flush earlier or later
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()  # One flush at a time, so blocks are written in order
+
+    def write(self, line):
+        """Buffer one line, flushing if the size or time threshold is reached."""
+        self.buffer.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.max_bytes or time.monotonic() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered as one block."""
+        with self.lock:
+            buffer = self.buffer
+            if buffer:
+                # Lines written while this block is joined stay buffered for the next flush
+                block = "\n".join([buffer.popleft() for _ in range(len(buffer))]) + "\n"
+                self.size = 0
+                self.write_block(block)
+            self.last_flush = time.monotonic()
+
+    def flush_due(self):
+        """Flush if the time threshold has passed, for a caller polling while no line is being written."""
+        if self.buffer and time.monotonic() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def write_block(self, block):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+
+class StreamSink(OutputSink):
+    def __init__(self, stream=None, **thresholds):
+        """Writes to a text stream, sys.stdout by default.
+
+        Nothing polls a stream the way the GUI polls its console, so a daemon thread calls flush_due until close();
+        a line written before a long computation still shows within about max_delay.
+        """
+        super().__init__(**thresholds)
+        self.stream = stream or sys.stdout
+        self.closed = threading.Event()
+        threading.Thread(target=self.flush_periodically, daemon=True).start()
+
+    def flush_periodically(self):
+        """Flusher thread: flush whatever has waited max_delay, until the sink is closed."""
+        while not self.closed.wait(self.max_delay):
+            self.flush_due()
+
+    def write_block(self, block):
+        self.stream.write(block)
+        self.stream.flush()
+
+    def close(self):
+        self.closed.set()
+        super().close()
+
+
+class FileSink(StreamSink):
+    def __init__(self, path, **thresholds):
+        """Writes to a file, which close() closes."""
+        super().__init__(open(path, 'w'), **thresholds)
+
+    def close(self):
+        super().close()
+        self.stream.close()
+
+
+class MemorySink(OutputSink):
+    def __init__(self, lines=None):
+        """Collects lines in a list, e.g. a console; appending is already cheap, so nothing is buffered."""
+        super().__init__()
+        self.lines = lines if lines is not None else []
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def flush(self):
+        pass
+
+
+class TkSink(OutputSink):
+    def __init__(self, text_widget, schedule=None, **thresholds):
+        """Appends to a Tk Text widget, one insert per flush.
+
+        schedule(func, *args) must run func on the Tk thread; leave it out when output is written from the Tk thread.
+        Lines may come from the worker thread while the Tk thread calls flush_due.
+        """
+        super().__init__(**thresholds)
+        self.text_widget = text_widget
+        self.schedule = schedule
+
+    def write_block(self, block):
+        if self.schedule:
+            self.schedule(self.insert, block)
+        else:
+            self.insert(block)
+
+    def insert(self, block):
+        """Tk thread: append a block of text to the read-only widget."""
+        self.text_widget.config(state="normal")
+        self.text_widget.insert("end", block)
+        self.text_widget.see("end")
+        self.text_widget.config(state="disabled")
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+import sys
+import LexicalAnalyzer
+import SyntaxAnalyzer
+import TokenStream
+
+CACHE_FORMAT = "1"  # Bump when the pickled entry layout changes
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lolcode", "parse")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def grammar_version():
+    """Hash the lexer, token stream and parser sources, so any grammar change invalidates old entries."""
+    digest = hashlib.sha256()
+    for module in (LexicalAnalyzer, TokenStream, SyntaxAnalyzer):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+VERSION_TAG = f"{CACHE_FORMAT}-{grammar_version()}-{sys.implementation.cache_tag}"
+
+
+class ParseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, source):
+        """Get the entry path of source code, keyed by its content hash and the version tag."""
+        digest = hashlib.sha256(f"{VERSION_TAG}:".encode())
+        digest.update(source.encode())
+        return os.path.join(self.directory, digest.hexdigest() + ".pickle")
+
+    def get(self, source):
+        """Get the cached (token_stream, ast) of source code, or None."""
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as file:
+                token_stream, ast = pickle.load(file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+            self.misses += 1
+            self.remove(path)  # Corrupt or truncated entry
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass  # Evicted by another process, or read-only; what was read is still good
+        self.hits += 1
+        return token_stream, ast
+
+    def put(self, source, token_stream, ast):
+        """Store the token stream and AST of source code, evicting least recently used entries if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(source)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            pickle.dump((token_stream, ast), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def parse(self, source):
+        """Get (ast, token_stream, console) for source code, lexing and parsing only on a miss."""
+        cached = self.get(source)
+        if cached is not None:
+            token_stream, ast = cached
+            return ast, token_stream, []
+        token_stream = TokenStream.TokenStream.from_lexer(*LexicalAnalyzer.LexicalAnalyzer().gen_tokens(source))
+        syntax_analyzer = SyntaxAnalyzer.SyntaxAnalyzer(token_stream)
+        ast = syntax_analyzer.analyze()
+        if ast is not None:
+            self.put(source, token_stream, ast)
+        return ast, token_stream, syntax_analyzer.console
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".pickle"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+            self.evictions += 1
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Another process got there first
+
+    def stats(self):
+        """Get the hit, miss and eviction counters."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
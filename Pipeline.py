@@ -0,0 +1,33 @@
+import mmap
+import os
+import LexicalAnalyzer
+import SyntaxAnalyzer
+import TokenStream
+
+
+class Reader:
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        with open(self.path, 'r') as file:
+            return file.read()
+
+    def stream_tokens(self, chunk_size=LexicalAnalyzer.CHUNK_SIZE):
+        """Lazily yield (token, lexeme, row, column) through an mmap of the file."""
+        with open(self.path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return  # mmap cannot map an empty file
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from LexicalAnalyzer.LexicalAnalyzer().iter_tokens(mapped, chunk_size)
+
+
+def lex(source):
+    """Tokenize source code into the parser's TokenStream."""
+    return TokenStream.TokenStream.from_lexer(*LexicalAnalyzer.LexicalAnalyzer().gen_tokens(source))
+
+
+def parse(source):
+    """Lex and parse source code, returning the AST (None on a syntax error) and the syntax analyzer."""
+    syntax_analyzer = SyntaxAnalyzer.SyntaxAnalyzer(lex(source))
+    return syntax_analyzer.analyze(), syntax_analyzer
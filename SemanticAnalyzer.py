@@ -1,119 +1,123 @@
+import SyntaxAnalyzer
+import TypeInference
+
+GLOBAL_SCOPE = None  # Key of the main program's scope in SemanticAnalyzer.scopes
+
+
+class Scope:
+    def __init__(self, parameters=()):
+        """Maps each variable of one scope to a fixed slot; slot 0 is always the implicit IT."""
+        self.names = ["IT"]  # Slot -> name
+        self.slots = {"IT": 0}  # Name -> slot
+        for parameter in parameters:
+            self.declare(parameter)
+
+    def declare(self, name):
+        """Get the slot of a variable, giving it the next free one on its first declaration."""
+        if name not in self.slots:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+        return self.slots[name]
+
+    def slot(self, name):
+        """Get the slot of a variable, or None if nothing in this scope declares it."""
+        return self.slots.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
 class SemanticAnalyzer:
-    def __init__(self, token_list, console_text):
-        self.tokens = token_list
-        print(self.tokens)
-        self.symbol_table = {} 
-        self.index = 0
-        self.console = []
-        self.console_text = console_text
-
-    def current_token(self):
-        """Get the current token."""
-        return self.tokens[self.index] if self.index < len(self.tokens) else None
-
-    def advance(self):
-        """Move to the next token."""
-        self.index += 1
-
-    def analyze_var_dec(self):
-        """Analyze variable declarations and add to the symbol table."""
-        if self.current_token().get("WAZZUP"):
-            self.advance()  
-            while self.current_token() and self.current_token().get("Identifier"):
-                identifier = self.current_token()["Identifier"]
-                if identifier in self.symbol_table:
-                    raise NameError(f"Variable '{identifier}' already declared.")
-                self.symbol_table[identifier] = None
-                self.advance()
-                if self.current_token() == "ITZ":
-                    self.advance()
-                    self.analyze_expr()  
-                    self.symbol_table[identifier] = "Assigned"
-                if self.current_token() == "BUHBYE":
-                    break
-
-    def analyze_expr(self):
-        """Analyze expressions and update the symbol table if needed."""
-        if self.current_token().get("Identifier"):
-            self.expect_identifier()
-        elif self.current_token().get("Literal"):
-            self.expect_literal()
-        elif self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF"}:
-            self.advance()  # Move past the operator
-            self.analyze_expr()  # Check left operand
-            self.analyze_expr()  # Check right operand
-        else:
-            raise SyntaxError(f"Unexpected token in expression: '{self.current_token()}'")
-
-    def expect_identifier(self):
-        """Expect an identifier and check if it is declared."""
-        if self.current_token() and self.current_token().get("Identifier"):
-            identifier = self.current_token()["Identifier"]
-            if identifier not in self.symbol_table:
-                raise NameError(f"Undeclared variable '{identifier}' used.")
-            self.advance()
-        else:
-            raise SyntaxError(f"Expected identifier, but got '{self.current_token()}'")
-
-    def expect_literal(self):
-        """Expect a literal and check type."""
-        if self.current_token() and self.current_token().get("Literal"):
-            self.advance()
-        else:
-            raise SyntaxError(f"Expected a literal, but got '{self.current_token()}'")
-
-    def analyze_print(self):
-        """Analyze print statements."""
-        self.advance()  # Skip 'VISIBLE'
-        self.analyze_expr()  # The expression inside the print must be valid
-        # self.console_text.config(state=tk.NORMAL)
-        # self.console_text.insert(tk.END, f"{self.current_token()}\n")
-        # self.console_text.config(state=tk.DISABLED)
-        # print("PRINT")
-
-    def analyze_assignment(self):
-        """Analyze assignments and ensure correct types."""
-        identifier = self.current_token().get("Identifier")
-        if identifier not in self.symbol_table:
-            raise NameError(f"Variable '{identifier}' not declared.")
-        self.advance()
-        if self.current_token().get("R"):
-            self.advance()
-            self.analyze_expr()
-            # Update symbol table with assigned value
-            self.symbol_table[identifier] = "Assigned"
-
-    def analyze_statement(self):
-        """Analyze a single statement based on its type."""
-        if self.current_token().get("VISIBLE"):
-            self.analyze_print()
-        elif self.current_token().get("WAZZUP"):
-            self.analyze_var_dec()
-        elif self.current_token().get("Identifier"):
-            if self.index + 1 < len(self.tokens) and self.tokens[self.index + 1].get("R"):
-                self.analyze_assignment()
-            else:
-                self.analyze_expr()
-        else:
-            raise SyntaxError(f"Unexpected statement: {self.current_token()}")
-
-    def analyze_program(self):
-        """Analyze the whole program."""
-        self.advance()  # Skip 'HAI'
-        # print(self.current_token())
-        while self.current_token() and self.current_token().get("KTHXBYE") is None:
-            self.analyze_statement()
-            if self.current_token().get("KTHXBYE"):
-                break  # End of the block or program
-        if self.current_token() and self.current_token().get("KTHXBYE"):
-            self.advance()  # Skip 'KTHXBYE'
+    def __init__(self, ast):
+        self.ast = ast
+        self.scopes = {GLOBAL_SCOPE: Scope()}
 
     def analyze(self):
-        """Start the semantic analysis."""
+        """Resolve every variable of the program to a slot in its scope, returning the scopes.
+
+        Each function has a scope of its own, keyed by its name, holding its parameters and locals;
+        function bodies cannot see the main program's variables.
+        """
+        statements = self.ast[0] if self.ast else []
         try:
-            self.analyze_program()
-            print(self.symbol_table)
-            print("Semantic analysis completed successfully!")
-        except (SyntaxError, NameError) as e:
-            self.console.append(f"Semantic error: {e}")
-            print(f"Semantic error: {e}")
+            for statement in statements:
+                if statement["type"] == "function":
+                    scope = Scope(statement["parameters"])
+                    self.scopes[statement["name"]] = scope
+                    for nested in statement["body"]:
+                        self.resolve(nested, scope)
+                else:
+                    self.resolve(statement, self.scopes[GLOBAL_SCOPE])
+        except RecursionError:
+            raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None
+        return self.scopes
+
+    def resolve(self, node, scope):
+        """Declare the variables a node and everything nested in it introduce."""
+        if node.get("type") == "var_dec_list":
+            for var_dec in node["declarations"]:
+                scope.declare(var_dec["name"])
+        for value in node.values():
+            if isinstance(value, dict):
+                self.resolve(value, scope)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        self.resolve(item, scope)
+
+
+def assigned_variables(statements):
+    """Get the names of the variables a statement list, and everything nested in it, may store to."""
+    names = set()
+    for statement in statements:
+        kind = statement["type"]
+        if kind in ("assignment", "input", "recast"):
+            names.add(statement["name"])
+        elif kind == "var_dec_list":
+            names.update(var_dec["name"] for var_dec in statement["declarations"])
+        elif kind == "loop" and statement["variable"] is not None:
+            names.add(statement["variable"])
+        elif kind in TypeInference.EXPRESSION_TYPES:
+            names.add("IT")
+        for block in SyntaxAnalyzer.nested_blocks(statement):
+            names |= assigned_variables(block)
+    return names
+
+
+def performs_io(node, calls):
+    """Check whether a node, or anything nested in it, does VISIBLE or GIMMEH, collecting the functions it calls."""
+    kind = node.get("type")
+    if kind == "print" or kind == "input":
+        return True
+    if kind == "call":
+        calls.add(node["name"])
+    for value in node.values():
+        if isinstance(value, dict):
+            if performs_io(value, calls):
+                return True
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and performs_io(item, calls):
+                    return True
+    return False
+
+
+def pure_functions(ast):
+    """Get the names of the functions whose value depends on their arguments alone.
+
+    A function body only ever sees its own parameters and locals, so it is pure unless it does VISIBLE or
+    GIMMEH, or calls a function that is not pure (or not defined).
+    """
+    callees = {}  # Function without VISIBLE or GIMMEH -> the functions it calls
+    for statement in ast[0] if ast else []:
+        if statement["type"] == "function":
+            calls = set()
+            if not any(performs_io(nested, calls) for nested in statement["body"]):
+                callees[statement["name"]] = calls
+    pure = set(callees)
+    changed = True
+    while changed:
+        impure = {name for name in pure if not callees[name] <= pure}
+        pure -= impure
+        changed = bool(impure)
+    return pure
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+import InputProvider
+import Interpreter
+import Optimizer
+import OutputSink
+import Pipeline
+import SemanticAnalyzer
+import TypeInference
+
+# Persistent daemon: accepts run requests as JSON lines over a Unix socket or stdin, one response line each.
+#   python Service.py [--socket /tmp/lolcode.sock] [--timeout 5] [--max-concurrent 8]
+# Request:  {"id": 1, "source": "HAI ... KTHXBYE", "stdin": ["line", ...], "timeout": 2.5}
+# Cancel:   {"id": 2, "cancel": 1}
+# Response: {"id": 1, "status": "ok", "stdout": [...], "errors": [...], "elapsed": 0.001, "cached": true,
+#            "stats": {"call_caches": {"fib": {"hits": 20, "misses": 23, "hit_rate": 0.47, "entries": 23}}}}
+# status is one of ok, syntax_error, runtime_error, timeout, cancelled, bad_request or internal_error.
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_CONCURRENT = 8
+DEFAULT_CACHE_SIZE = 256
+MAX_REQUEST_BYTES = 16 * 1024 * 1024  # Longest request line a socket connection accepts
+
+
+class ProgramCache:
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # source -> (ast, analysis, console), least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source):
+        """Get the cached (ast, analysis, console) of source code, or None."""
+        entry = self.entries.get(source)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(source)
+        self.hits += 1
+        return entry
+
+    def put(self, source, ast, analysis, console):
+        """Store a parsed program, dropping the least recently used one if the cache is full."""
+        self.entries[source] = (ast, analysis, console)  # Syntax errors are cached too; the source won't parse next time either
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Get the hit and miss counters and the number of cached programs."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+def parse_and_optimize(source):
+    """Parse source code, fold its constants and analyze it once, so every cached run skips all three.
+
+    The analysis is the (scopes, types) an Interpreter is built from, or None if the source does not parse.
+    """
+    ast, syntax_analyzer = Pipeline.parse(source)
+    ast = Optimizer.Optimizer(ast).optimize()
+    analysis = None
+    if ast is not None:
+        analysis = SemanticAnalyzer.SemanticAnalyzer(ast).analyze(), TypeInference.TypeInference(ast).infer()
+    return ast, analysis, syntax_analyzer
+
+
+class Service:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_concurrent=DEFAULT_MAX_CONCURRENT, cache_size=DEFAULT_CACHE_SIZE):
+        self.timeout = timeout
+        self.cache = ProgramCache(cache_size)
+        self.parsing = {}  # Source -> future of a parse in progress, shared by every request for it
+        self.slots = asyncio.Semaphore(max_concurrent)  # Interpreters running at once
+        self.running = {}  # Request id -> its task
+
+    async def parse(self, source):
+        """Get (ast, analysis, console, cached) for source code, parsing and analyzing off the event loop on a miss."""
+        entry = self.cache.get(source)
+        if entry is not None:
+            return entry + (True,)
+        future = self.parsing.get(source)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(parse_and_optimize, source))
+            self.parsing[source] = future
+
+            def store(future):
+                del self.parsing[source]
+                if not future.cancelled() and future.exception() is None:
+                    ast, analysis, syntax_analyzer = future.result()
+                    self.cache.put(source, ast, analysis, syntax_analyzer.console)
+            future.add_done_callback(store)
+        # Shielded, so one request timing out doesn't cancel the parse other requests are waiting on
+        ast, analysis, syntax_analyzer = await asyncio.shield(future)
+        return ast, analysis, syntax_analyzer.console, False
+
+    async def run_program(self, source, stdin, response):
+        """Parse and run a program, filling in the response."""
+        ast, analysis, console, response["cached"] = await self.parse(source)
+        if ast is None:
+            response.update(status="syntax_error", errors=console)
+            return
+        # With the analysis done already, building the Interpreter is cheap enough for the event loop
+        scopes, types = analysis
+        interpreter = Interpreter.Interpreter(ast, InputProvider.ListInput(stdin),
+                                              OutputSink.MemorySink(response["stdout"]), scopes, types)
+        await self.slots.acquire()
+        # The program runs in a worker thread, which can't be cancelled, only told to stop; its slot stays taken
+        # until the thread has actually exited, even when the request gives up on it first
+        thread = asyncio.ensure_future(asyncio.to_thread(interpreter.run))
+        thread.add_done_callback(lambda thread: self.slots.release())
+        try:
+            ok = await asyncio.shield(thread)
+        except asyncio.CancelledError:
+            interpreter.cancel()
+            raise
+        response["stats"] = interpreter.stats()
+        if not ok:
+            response.update(status="runtime_error", errors=interpreter.console)
+
+    async def execute(self, request):
+        """Run one request within its timeout, returning its response."""
+        started = time.perf_counter()
+        response = {"id": request.get("id"), "status": "ok", "stdout": [], "errors": []}
+        try:
+            source = request["source"]
+            if not isinstance(source, str):
+                raise TypeError(f"source must be a string, not {type(source).__name__}")
+            timeout = float(request.get("timeout", self.timeout))
+            stdin = list(request.get("stdin", []))
+        except (KeyError, TypeError, ValueError) as e:
+            response.update(status="bad_request", errors=[f"Invalid request: {e}"])
+            return response
+
+        try:
+            await asyncio.wait_for(self.run_program(source, stdin, response), timeout)
+        except asyncio.TimeoutError:
+            response.update(status="timeout", errors=[f"Timed out after {timeout}s"])
+        except asyncio.CancelledError:
+            response.update(status="cancelled", errors=["Cancelled"])
+        except SyntaxError as e:
+            response.update(status="syntax_error", errors=[str(e)])
+        except Exception as e:
+            # A bug in one request must still get it a response, and must not take the service down
+            response.update(status="internal_error", errors=[f"{type(e).__name__}: {e}"])
+        response["elapsed"] = time.perf_counter() - started
+        return response
+
+    async def handle(self, line, respond):
+        """Handle one JSON request line, calling respond with the response object."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            await respond({"id": None, "status": "bad_request", "errors": [f"Invalid request: {e}"]})
+            return
+
+        if "cancel" in request:
+            task = self.running.get(request["cancel"])
+            if task is not None:
+                task.cancel()
+            await respond({"id": request.get("id"), "status": "ok" if task else "not_found"})
+            return
+
+        request_id = request.get("id")
+        task = asyncio.current_task()
+        if request_id is not None:
+            self.running[request_id] = task
+        try:
+            response = await self.execute(request)
+        finally:
+            if self.running.get(request_id) is task:
+                del self.running[request_id]
+        await respond(response)
+
+    async def serve_lines(self, readline, send):
+        """Serve JSON lines until readline returns b"", running the requests concurrently."""
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(response):
+            async with lock:
+                await send(json.dumps(response).encode() + b"\n")
+
+        try:
+            while line := await readline():
+                if line.strip():
+                    task = asyncio.create_task(self.handle(line, respond))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass  # Client went away; its running requests are cancelled below
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def serve_stream(self, reader, writer):
+        """Serve one Unix socket connection."""
+        async def send(data):
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            await self.serve_lines(reader.readline, send)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        """Accept connections on a Unix socket until cancelled."""
+        server = await asyncio.start_unix_server(self.serve_stream, path, limit=MAX_REQUEST_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        """Serve requests from stdin, writing responses to stdout, until stdin closes."""
+        # stdin may be a regular file, which asyncio pipe transports reject, so read it in a thread
+        async def readline():
+            return await asyncio.to_thread(sys.stdin.buffer.readline)
+
+        async def send(data):
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+
+        await self.serve_lines(readline, send)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve LOLCODE run requests as JSON lines.")
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of stdin/stdout")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="default per-request timeout in seconds")
+    parser.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT,
+                        help="programs executing at once")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = Service(args.timeout, args.max_concurrent)
+        if args.socket:
+            await service.serve_unix(args.socket)
+        else:
+            await service.serve_stdio()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,68 @@
+from bisect import bisect_left, bisect_right
+import TokenStream
+
+BLOCK_KEYS = ("body", "else", "default")  # Keys under which statements hold nested statement lists
+CLAUSE_KEYS = ("elifs", "cases")  # Keys under which statements hold lists of clauses, each with a "body"
+
+MATH_OPERATORS = frozenset({"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF"})
+BINARY_BOOL_OPERATORS = frozenset({"BOTH OF", "EITHER OF", "WON OF"})
+INFINITE_BOOL_OPERATORS = frozenset({"ALL OF", "ANY OF"})  # Take any number of operands, up to MKAY
+BOOL_OPERATORS = BINARY_BOOL_OPERATORS | INFINITE_BOOL_OPERATORS | {"NOT"}
+COMPARISON_OPERATORS = frozenset({"BOTH SAEM", "DIFFRINT"})
+
+# Raised as a SyntaxError by the passes after parsing, which recurse on expressions, when one nests too deep
+NESTING_ERROR = "Expression too deeply nested"
+
+LITERAL = TokenStream.KIND_CODES["Literal"]
+IDENTIFIER = TokenStream.KIND_CODES["Identifier"]
+DATATYPE = TokenStream.KIND_CODES["Datatype Keyword"]
+
+# FIRST sets: the tokens an operand, and so an expression statement, can start with
+EXPRESSION_FIRST = MATH_OPERATORS | BOOL_OPERATORS | COMPARISON_OPERATORS | {"SMOOSH", "MAEK", "I IZ"}
+
+# Tokens that end the statement list of each part of a compound statement
+LOOP_TERMINATORS = frozenset({"IM OUTTA YR", "KTHXBYE"})
+FUNCTION_TERMINATORS = frozenset({"IF U SAY SO", "KTHXBYE"})
+IF_TERMINATORS = frozenset({"MEBBE", "NO WAI", "OIC", "KTHXBYE"})
+CASE_TERMINATORS = frozenset({"OMG", "OMGWTF", "OIC", "KTHXBYE"})
+BLOCK_TERMINATORS = frozenset({"OIC", "KTHXBYE"})
+
+
+def nested_blocks(statement):
+    """Get the statement lists nested directly in a statement: a loop's body, each branch of an O RLY?, and so on."""
+    blocks = [statement[key] for key in BLOCK_KEYS if statement.get(key) is not None]
+    for key in CLAUSE_KEYS:
+        blocks.extend(clause["body"] for clause in statement.get(key, ()))
+    return blocks
+
+
+def shift_rows(statement, delta):
+    """Move the rows of the statements nested in a reused statement by delta lines."""
+    for block in nested_blocks(statement):
+        for nested in block:
+            nested["row"] += delta
+            shift_rows(nested, delta)
+
+
 class SyntaxAnalyzer:
-    def __init__(self, token_list):
-        self.tokens = token_list  # List of tokens
-        self.keys = [list(token.keys())[0] for token in token_list]
-        self.types = [list(token.values())[0] for token in token_list]
+    def __init__(self, token_list, rows=None, previous=None, edit=None, debug=False):
+        if not isinstance(token_list, TokenStream.TokenStream):
+            token_list = TokenStream.TokenStream.from_dicts(token_list, rows)
+        self.tokens = token_list  # TokenStream of the program
+        self.keys = token_list.lexemes
+        self.kinds = token_list.kinds
+        self.rows = token_list.rows  # Source line of each token
         self.index = 0
         self.ast = []  # This will hold the abstract syntax tree (AST) or statement list
         self.console = []  # This will hold the console output
+        self.spans = []  # (start, end) token indices of each top-level statement
+        self.previous = previous  # Analyzer of the code before the edit, whose statements may be reused
+        self.edit = edit  # (first, old_end, new_end) lines re-lexed since previous, as IncrementalLexer.update returns
+        self.reparsed_statements = 0
+        self.completed = False  # Whether the whole program parsed
+        self.debug = debug  # Print the outcome of the analysis
+        self.blocks = []  # Opening keywords of the compound statements enclosing the statement being parsed
+        self.function = None  # Name of the function whose body is being parsed
 
     def current_token(self):
         """Get the current token."""
@@ -13,63 +70,233 @@ class SyntaxAnalyzer:
 
     def current_type(self):
         """Get the type of the current token."""
-        return self.types[self.index] if self.index < len(self.types) else None
+        return TokenStream.KIND_NAMES[self.kinds[self.index]] if self.index < len(self.kinds) else None
 
     def advance(self):
         """Move to the next token."""
         self.index += 1
 
+    def at_next_argument(self):
+        """Check whether the next tokens are AN YR, which separate parameters and call arguments."""
+        return self.current_token() == "AN" and self.index + 1 < len(self.keys) and self.keys[self.index + 1] == "YR"
+
     def expect(self, expected_token):
         """Expect a specific token and advance."""
-        if self.current_token() == expected_token:
-            self.advance()
+        if self.index < len(self.keys) and self.keys[self.index] == expected_token:
+            self.index += 1
         else:
             raise SyntaxError(f"Expected '{expected_token}', but got '{self.current_token()}'")
 
     def parse_program(self):
         """<program> ::= HAI <statement_list> KTHXBYE"""
-        self.expect("HAI")
-        self.ast.append(self.parse_statement_list())
+        prefix, suffix = self.reusable_statements()
+        if prefix:
+            self.ast.append(prefix)
+            self.spans.extend(self.previous.spans[:len(prefix)])
+            self.index = self.spans[-1][1]
+        else:
+            self.expect("HAI")
+            self.ast.append([])
+        self.parse_top_level_statements(self.ast[0], suffix)
         self.expect("KTHXBYE")
+        self.completed = True
+
+    def reusable_statements(self):
+        """Find the previous top-level statements whose tokens the edit did not touch.
+
+        Returns the statements before the edit, and the index in previous.spans of the first
+        statement after the edit, or None when nothing can be reused.
+        """
+        previous = self.previous
+        if previous is None or self.edit is None or not previous.spans:
+            return [], None
+        first, old_end, new_end = self.edit
+        old_count, new_count = len(previous.tokens), len(self.tokens)
+        # Tokens are unchanged up to the edited lines, and from the end of the edited lines on
+        unchanged_prefix = bisect_right(self.rows, first)
+        unchanged_suffix = min(old_count - bisect_right(previous.rows, old_end),
+                               new_count - bisect_right(self.rows, new_end))
+
+        # A statement peeks at the token after its end, so that token must be unchanged too
+        prefix_count = bisect_left(previous.spans, unchanged_prefix, key=lambda span: span[1])
+        if not previous.completed:
+            return list(previous.ast[0][:prefix_count]), None  # Statements after a syntax error were never parsed
+        suffix_start = bisect_left(previous.spans, old_count - unchanged_suffix, key=lambda span: span[0])
+        return list(previous.ast[0][:prefix_count]), max(suffix_start, prefix_count)
+
+    def parse_top_level_statements(self, statements, suffix_start):
+        """Parse statements up to KTHXBYE, reusing previous statements once the parse lines up with one."""
+        if suffix_start is None:
+            previous_spans, previous_statements, shift, suffix_start = [], [], 0, 0
+        else:
+            previous_spans, previous_statements = self.previous.spans, self.previous.ast[0]
+            shift = len(self.tokens) - len(self.previous.tokens)
+        keys = self.keys
+        while self.index < len(keys) and keys[self.index] != "KTHXBYE":
+            while suffix_start < len(previous_spans) and previous_spans[suffix_start][0] + shift < self.index:
+                suffix_start += 1
+            if suffix_start < len(previous_spans) and previous_spans[suffix_start][0] + shift == self.index:
+                for index in range(suffix_start, len(previous_spans)):
+                    start, end = previous_spans[index]
+                    statement = previous_statements[index]
+                    row = self.rows[start + shift]
+                    if row != statement["row"]:
+                        shift_rows(statement, row - statement["row"])
+                        statement["row"] = row
+                    statements.append(statement)
+                    self.spans.append((start + shift, end + shift))
+                self.index = self.spans[-1][1]
+                break
+            start = self.index
+            row = self.rows[self.index]
+            statement = self.parse_statement()
+            statement["row"] = row
+            statements.append(statement)
+            self.spans.append((start, self.index))
+            self.reparsed_statements += 1
 
-    def parse_statement_list(self):
-        """Parse a list of statements, separated by logical delimiters."""
+    def parse_statement_list(self, terminators=frozenset({"KTHXBYE"})):
+        """Parse a list of statements, up to (but not including) one of the terminators."""
         statements = []
-        while self.current_token() and self.current_token() not in {"KTHXBYE"}:
-            statements.append(self.parse_statement())
-            if self.current_token() in {"KTHXBYE"}:
-                break  # End of the block or program
+        keys, rows = self.keys, self.rows
+        while self.index < len(keys) and keys[self.index] not in terminators:
+            row = rows[self.index]
+            statement = self.parse_statement()
+            statement["row"] = row
+            statements.append(statement)
         return statements
 
     def parse_statement(self):
-        """Parse a single statement."""
-        if self.current_token() == "VISIBLE":
-            return self.parse_print()
-        elif self.current_token() == "WAZZUP":
-            return self.parse_var_dec_list()
-        elif self.current_type() == "Identifier":
-            if self.index + 1 < len(self.keys) and self.keys[self.index + 1] == "R":
-                return self.parse_assignment()
-            elif self.index + 1 < len(self.keys) and self.keys[self.index + 1] == "IS NOW A":
-                return self.parse_recast()
-            else:
-                return self.parse_expr()
-        elif self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF"}:
-            return self.parse_math_expr()
-        elif self.current_token() == "GIMMEH":
-            return self.parse_input()
-        else:
+        """Parse a single statement, dispatching on the token that starts it."""
+        parser = self.STATEMENT_PARSERS.get(self.keys[self.index]) or self.KIND_PARSERS.get(self.kinds[self.index])
+        if parser is None:
             raise SyntaxError(f"Unexpected statement: {self.current_token()}")
+        return parser(self)
 
-    def parse_typecast(self):
-        """<typecast> ::= MAEK <datatype> <generic_operand>"""
-        self.expect("MAEK")
-        operand = self.parse_generic_operand()
-        datatype = self.current_token()
-        if self.current_type() != "Datatype Keyword":
-            raise SyntaxError(f"Expected datatype, but got '{self.current_token()}'")
+    def parse_identifier_statement(self):
+        """<assignment> | <recast> | <expr>, whichever the token after the varident starting the statement begins"""
+        following = self.keys[self.index + 1] if self.index + 1 < len(self.keys) else None
+        parser = self.IDENTIFIER_STATEMENT_PARSERS.get(following)
+        return parser(self) if parser else self.parse_operand_statement()
+
+    def parse_operand_statement(self):
+        """<expr> statement starting with a lone varident or literal, such as the value a WTF? switches on"""
+        if self.index and self.rows[self.index] == self.rows[self.index - 1]:
+            # Most likely an operand of the statement before, written without its AN or +
+            raise SyntaxError(f"Unexpected statement: {self.current_token()}")
+        return self.parse_operand()
+
+    def parse_loop(self):
+        """<loop> ::= IM IN YR label [<loop_operation> YR varident] [<loop_condition> <generic_operand>]
+                      <statement_list> IM OUTTA YR label"""
+        self.expect("IM IN YR")
+        label = self.current_token()
+        self.expect_identifier()
+        loop = {"type": "loop", "label": label, "operation": None, "variable": None, "clause": None,
+                "condition": None}
+        if self.current_token() in {"UPPIN", "NERFIN"}:
+            loop["operation"] = self.current_token()
+            self.advance()
+            self.expect("YR")
+            loop["variable"] = self.current_token()
+            self.expect_identifier()
+        if self.current_token() in {"TIL", "WILE"}:
+            loop["clause"] = self.current_token()
+            self.advance()
+            loop["condition"] = self.parse_generic_operand()
+
+        self.blocks.append("IM IN YR")
+        loop["body"] = self.parse_statement_list(LOOP_TERMINATORS)
+        self.blocks.pop()
+        self.expect("IM OUTTA YR")
+        if self.current_token() != label:
+            raise SyntaxError(f"Expected 'IM OUTTA YR {label}', but got '{self.current_token()}'")
         self.advance()
-        return {"type": "typecast", "datatype": datatype, "operand": operand}
+        return loop
+
+    def parse_if(self):
+        """<if> ::= O RLY? YA RLY <statement_list> [MEBBE <generic_operand> <statement_list>]*
+                    [NO WAI <statement_list>] OIC"""
+        self.expect("O RLY?")
+        self.expect("YA RLY")
+        self.blocks.append("O RLY?")
+        body = self.parse_statement_list(IF_TERMINATORS)
+        elifs = []
+        while self.current_token() == "MEBBE":
+            self.advance()
+            condition = self.parse_generic_operand()
+            elifs.append({"condition": condition, "body": self.parse_statement_list(IF_TERMINATORS)})
+        else_body = None
+        if self.current_token() == "NO WAI":
+            self.advance()
+            else_body = self.parse_statement_list(BLOCK_TERMINATORS)
+        self.blocks.pop()
+        self.expect("OIC")
+        return {"type": "if", "body": body, "elifs": elifs, "else": else_body}
+
+    def parse_switch(self):
+        """<switch> ::= WTF? OMG <literal> <statement_list> [OMG <literal> <statement_list>]*
+                        [OMGWTF <statement_list>] OIC"""
+        self.expect("WTF?")
+        self.blocks.append("WTF?")
+        cases = []
+        while True:
+            self.expect("OMG")
+            if self.index >= len(self.kinds) or self.kinds[self.index] != LITERAL:
+                raise SyntaxError(f"Expected literal, but got '{self.current_token()}'")
+            value = {"type": "literal", "value": self.keys[self.index]}
+            self.advance()
+            cases.append({"value": value, "body": self.parse_statement_list(CASE_TERMINATORS)})
+            if self.current_token() != "OMG":
+                break
+        default = None
+        if self.current_token() == "OMGWTF":
+            self.advance()
+            default = self.parse_statement_list(BLOCK_TERMINATORS)
+        self.blocks.pop()
+        self.expect("OIC")
+        return {"type": "switch", "cases": cases, "default": default}
+
+    def parse_break(self):
+        """<break> ::= GTFO"""
+        self.expect("GTFO")
+        if "IM IN YR" in self.blocks or "WTF?" in self.blocks:
+            return {"type": "break"}  # Leaves the innermost loop or WTF?
+        if self.function is not None:
+            return {"type": "return", "value": None}  # Outside a loop, GTFO returns NOOB from the function
+        raise SyntaxError("GTFO outside of a loop or function")
+
+    def parse_function(self):
+        """<function> ::= HOW IZ I funcident [YR varident <more_parameters>] <statement_list> IF U SAY SO"""
+        if self.blocks or self.function is not None:
+            raise SyntaxError("Functions can only be defined at the top level")
+        self.expect("HOW IZ I")
+        name = self.current_token()
+        self.expect_identifier()
+        parameters = []
+        if self.current_token() == "YR":
+            self.advance()
+            parameters.append(self.current_token())
+            self.expect_identifier()
+            while self.at_next_argument():
+                self.index += 2
+                if self.current_token() in parameters:
+                    raise SyntaxError(f"Duplicate parameter '{self.current_token()}'")
+                parameters.append(self.current_token())
+                self.expect_identifier()
+
+        self.function = name
+        body = self.parse_statement_list(FUNCTION_TERMINATORS)
+        self.function = None
+        self.expect("IF U SAY SO")
+        return {"type": "function", "name": name, "parameters": parameters, "body": body}
+
+    def parse_return(self):
+        """<return> ::= FOUND YR <generic_operand>"""
+        if self.function is None:
+            raise SyntaxError("FOUND YR outside of a function")
+        self.expect("FOUND YR")
+        return {"type": "return", "value": self.parse_generic_operand()}
 
     def parse_recast(self):
         """<recast> ::= varident IS NOW A <datatype>"""
@@ -100,25 +327,122 @@ class SyntaxAnalyzer:
                 operand.append(self.parse_generic_operand())
             else:
                 break
-        print(operand[0].get('value'))
-        self.console.append(str(operand[0].get('value')))
-        # self.console.append(" ".join(str(ele) for ele in operand[0].get('value')))
         return {"type": "print", "operand": operand}
 
     def parse_generic_operand(self):
         """<generic_operand> ::= varident | <expr> | <literal>"""
-        if self.current_type() in {"Identifier", "Literal"}:
-            token = self.current_token()
-            self.advance()
-            return {"type": "literal" if self.current_type() == "Literal" else "identifier", "value": token}
-        elif self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF"}:
-            return self.parse_math_expr()
-        elif self.current_token() == "SMOOSH":
-            return self.parse_smoosh_expr()
-        elif self.current_token() == "MAEK":
-            return self.parse_typecast()
-        else:
-            raise SyntaxError(f"Expected operand, but got '{self.current_token()}'")
+        return self.parse_operand()
+
+    def parse_operand(self):
+        """Parse an operand, however deeply its expressions nest, without recursing.
+
+        <math_expr> ::= <math_operator> <math_operand> AN <math_operand>
+        <math_operand> ::= numbr | numbar | varident | <math_expr> | <call>
+        <bool_expr> ::= NOT <generic_operand> | <bool_operator> <generic_operand> AN <generic_operand>
+                      | <infinite_bool_operator> <generic_operand> AN <more_operands> MKAY
+        <comparison_expr> ::= <comparison_operator> <generic_operand> AN <generic_operand>
+        <smoosh_expr> ::= SMOOSH <generic_operand> AN <more_smoosh>
+        <typecast> ::= MAEK <generic_operand> <datatype>
+        <call> ::= I IZ funcident [YR <generic_operand> <more_arguments>] MKAY
+
+        Each expression waiting for more operands stays on an explicit stack, so nesting depth is limited
+        by memory alone. Inside a math expression, only math operands are accepted.
+        """
+        keys, kinds = self.keys, self.kinds
+        count = len(keys)
+        pending = []  # Expressions still waiting for operands, innermost last
+        math = False  # Whether the next operand belongs to a math expression
+        while True:
+            # Read the start of an operand: a whole one, or an operator that waits for operands of its own
+            token = keys[self.index] if self.index < count else None
+            kind = kinds[self.index] if self.index < count else None
+            if kind == LITERAL or kind == IDENTIFIER:
+                self.index += 1
+                node = {"type": "literal" if kind == LITERAL else "identifier", "value": token}
+            elif token in MATH_OPERATORS:
+                self.index += 1
+                pending.append({"type": "math_expr", "operator": token, "left": None, "right": None})
+                math = True
+                continue
+            elif token == "I IZ":
+                self.index += 1
+                name = self.current_token()
+                self.expect_identifier()
+                node = {"type": "call", "name": name, "arguments": []}
+                if self.current_token() != "YR":
+                    self.expect("MKAY")
+                else:
+                    self.index += 1
+                    pending.append(node)
+                    math = False
+                    continue
+            elif math:
+                raise SyntaxError(f"Expected math operand, but got '{token}'")
+            elif token in BOOL_OPERATORS:
+                self.index += 1
+                pending.append({"type": "bool_expr", "operator": token, "operands": []})
+                continue
+            elif token in COMPARISON_OPERATORS:
+                self.index += 1
+                pending.append({"type": "comparison_expr", "operator": token, "left": None, "right": None})
+                continue
+            elif token == "SMOOSH":
+                self.index += 1
+                pending.append({"type": "smoosh_expr", "parts": []})
+                continue
+            elif token == "MAEK":
+                self.index += 1
+                pending.append({"type": "typecast", "datatype": None, "operand": None})
+                continue
+            else:
+                raise SyntaxError(f"Expected operand, but got '{token}'")
+
+            # Hand the finished operand to the expressions waiting for it, until one needs another operand
+            while pending:
+                expr = pending[-1]
+                kind = expr["type"]
+                if kind == "math_expr" or kind == "comparison_expr":
+                    if expr["left"] is None:
+                        expr["left"] = node
+                        self.expect("AN")
+                        math = kind == "math_expr"
+                        break
+                    expr["right"] = node
+                elif kind == "bool_expr":
+                    operands = expr["operands"]
+                    operands.append(node)
+                    operator = expr["operator"]
+                    if operator in BINARY_BOOL_OPERATORS and len(operands) == 1:
+                        self.expect("AN")
+                        break
+                    if operator in INFINITE_BOOL_OPERATORS:
+                        if self.current_token() == "AN":
+                            self.index += 1
+                            break
+                        self.expect("MKAY")
+                elif kind == "smoosh_expr":
+                    expr["parts"].append(node)
+                    # AN YR starts the next argument of an enclosing call, not another part
+                    if self.current_token() == "AN" and not self.at_next_argument():
+                        self.index += 1
+                        break
+                elif kind == "typecast":
+                    expr["operand"] = node
+                    if self.index >= count or kinds[self.index] != DATATYPE:
+                        raise SyntaxError(f"Expected datatype, but got '{self.current_token()}'")
+                    expr["datatype"] = keys[self.index]
+                    self.index += 1
+                else:  # call
+                    expr["arguments"].append(node)
+                    if self.at_next_argument():
+                        self.index += 2
+                        math = False
+                        break
+                    self.expect("MKAY")
+                node = pending.pop()
+                math = bool(pending) and pending[-1]["type"] == "math_expr"
+            else:
+                return node
 
     def parse_var_dec_list(self):
         """<var_dec_list> ::= <var_dec> | <var_dec> <var_dec_list>"""
@@ -153,58 +477,6 @@ class SyntaxAnalyzer:
         operand = self.parse_generic_operand()
         return {"type": "assignment", "name": identifier, "value": operand}
 
-    def parse_expr(self):
-        """<expr> ::= <math_expr> | <bool_expr> | <smoosh_expr>"""
-        if self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF"}:
-            return self.parse_math_expr()
-        elif self.current_token() in {"BOTH OF", "EITHER OF", "WON OF", "BOTH SAEM", "DIFFRINT", "NOT"}:
-            return self.parse_bool_expr()
-        # elif self.current_token() == "SMOOSH":
-        #     return self.parse_smoosh_expr()
-        else:
-            raise SyntaxError(f"Unexpected expression: {self.current_token()}")
-
-    def parse_math_expr(self):
-        """<math_expr> ::= <math_operand> | <math_operator> <math_expr> AN <math_operand>"""
-        if self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF"}:
-            operator = self.current_token()
-            self.advance()
-            left_operand = self.parse_math_expr()
-            self.expect("AN")
-            right_operand = self.parse_math_operand()
-            return {"type": "math_expr", "operator": operator, "left": left_operand, "right": right_operand}
-        else:
-            return self.parse_math_operand()
-
-    def parse_math_operand(self):
-        """<math_operand> ::= numbr | numbar | varident | <math_expr>"""
-        if self.current_type() in {"Literal", "Identifier"}:
-            token = self.current_token()
-            self.advance()
-            return {"type": "literal" if self.current_type() == "Literal" else "identifier", "value": token}
-        elif self.current_token() in {"SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF"}:
-            return self.parse_math_expr()
-        else:
-            raise SyntaxError(f"Expected math operand, but got '{self.current_token()}'")
-
-    def parse_bool_expr(self):
-        """<bool_expr> ::= NOT <bool_operand> | <bool_operator> <bool_operand> AN <bool_operand>"""
-        # Placeholder for future extension
-        pass
-
-    def parse_smoosh_expr(self):
-        """<smoosh_expr> ::= SMOOSH <generic_operand> AN <more_smoosh>"""
-        self.expect("SMOOSH")
-        operand = []
-        operand.append(self.parse_generic_operand())
-        while True:
-            if self.current_token() == "AN":
-                self.advance()
-                operand.append(self.parse_generic_operand())
-            else:
-                break
-        return {"type": "smoosh_expr", "parts": operand}
-
     def expect_identifier(self):
         """Expect an identifier."""
         if self.current_type() == "Identifier":
@@ -216,9 +488,29 @@ class SyntaxAnalyzer:
         """Start the syntax analysis and return the AST."""
         try:
             self.parse_program()
-            print("Syntax analysis completed successfully!")
+            if self.debug:
+                print("Syntax analysis completed successfully!")
             return self.ast
         except SyntaxError as e:
-            self.console.append(f"Syntax error: {e}")
-            print(f"Syntax error: {e}")
+            row, column = self.tokens.position(self.index)
+            self.console.append(f"Syntax error on line {row}, column {column}: {e}")
+            if self.debug:
+                print(f"Syntax error on line {row}, column {column}: {e}")
             return None
+
+    # Statement dispatch, built once at class load: the parse method for each token a statement can start with,
+    # then for each kind of token that starts an expression statement by itself
+    STATEMENT_PARSERS = {
+        "VISIBLE": parse_print,
+        "WAZZUP": parse_var_dec_list,
+        "GIMMEH": parse_input,
+        "IM IN YR": parse_loop,
+        "GTFO": parse_break,
+        "HOW IZ I": parse_function,
+        "FOUND YR": parse_return,
+        "O RLY?": parse_if,
+        "WTF?": parse_switch,
+        **dict.fromkeys(EXPRESSION_FIRST, parse_operand),
+    }
+    KIND_PARSERS = {IDENTIFIER: parse_identifier_statement, LITERAL: parse_operand_statement}
+    IDENTIFIER_STATEMENT_PARSERS = {"R": parse_assignment, "IS NOW A": parse_recast}
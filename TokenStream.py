@@ -0,0 +1,98 @@
+import sys
+from array import array
+from bisect import bisect_left
+import LexicalAnalyzer
+
+# Token kinds: every classification, plus the raw token types the lexer keeps as-is
+KIND_NAMES = list(LexicalAnalyzer.TOKEN_CLASSIFICATIONS) + [
+    "COMMENT_START", "MULTILINE_COMMENT_START", "MULTILINE_COMMENT_END", "COMMENT", "NEWLINE", "Unclassified",
+]
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+# Token kinds the parser never sees
+IGNORED_KINDS = {"COMMENT_START", "MULTILINE_COMMENT_START", "MULTILINE_COMMENT_END", "COMMENT", "NEWLINE"}
+
+
+def shifted(rows, shift):
+    """Move an array of rows by shift lines, without a Python-level loop."""
+    return array('i', map(shift.__add__, rows)) if shift else rows
+
+
+class TokenStream:
+    def __init__(self):
+        self.kinds = array('B')  # KIND_CODES of each token
+        self.lexemes = []  # Interned, so repeated keywords and names share one string
+        self.rows = array('i')
+        self.columns = array('i')
+
+    @classmethod
+    def from_lexer(cls, tokens, lexemes, rows, columns):
+        """Build a stream from gen_tokens' four parallel lists."""
+        stream = cls()
+        stream.extend(zip(tokens, lexemes, rows, columns))
+        return stream
+
+    @classmethod
+    def from_dicts(cls, token_list, rows=None):
+        """Build a stream from the older [{lexeme: classification}, ...] token list."""
+        stream = cls()
+        rows = rows if rows is not None else [0] * len(token_list)
+        for token, row in zip(token_list, rows):
+            for lexeme, kind in token.items():
+                stream.append(kind, lexeme, row, 0)
+        return stream
+
+    def spliced(self, first_row, last_row, tokens, shift):
+        """Get a copy with the tokens of rows [first_row, last_row) replaced and every later row moved by shift.
+
+        tokens are the (token, lexeme, row, column) tuples of the re-lexed lines, as IncrementalLexer.tokens_between
+        returns them zipped. Only those are converted; the rest is copied a slice at a time, and this stream,
+        which the previous run's analyzer still reads, is left as it was.
+        """
+        start = bisect_left(self.rows, first_row)
+        stop = bisect_left(self.rows, last_row, start)
+        edited = TokenStream()
+        edited.extend(tokens)
+        stream = TokenStream()
+        stream.kinds = self.kinds[:start] + edited.kinds + self.kinds[stop:]
+        stream.lexemes = self.lexemes[:start] + edited.lexemes + self.lexemes[stop:]
+        stream.rows = self.rows[:start] + edited.rows + shifted(self.rows[stop:], shift)
+        stream.columns = self.columns[:start] + edited.columns + self.columns[stop:]
+        return stream
+
+    def append(self, kind, lexeme, row, column):
+        """Add one token, unless it is a comment or newline."""
+        if kind not in IGNORED_KINDS:
+            self.kinds.append(KIND_CODES[kind])
+            self.lexemes.append(sys.intern(lexeme))
+            self.rows.append(row)
+            self.columns.append(column)
+
+    def extend(self, tokens):
+        """Add (token, lexeme, row, column) tuples, e.g. from LexicalAnalyzer.iter_tokens."""
+        kinds_append = self.kinds.append
+        lexemes_append = self.lexemes.append
+        rows_append = self.rows.append
+        columns_append = self.columns.append
+        kind_codes = KIND_CODES
+        intern = sys.intern
+        for kind, lexeme, row, column in tokens:
+            if kind not in IGNORED_KINDS:
+                kinds_append(kind_codes[kind])
+                lexemes_append(intern(lexeme))
+                rows_append(row)
+                columns_append(column)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind_name(self, index):
+        """Get the classification of the token at index."""
+        return KIND_NAMES[self.kinds[index]]
+
+    def position(self, index):
+        """Get the (row, column) of the token at index, or of the last token past the end."""
+        if not self.kinds:
+            return 0, 0
+        index = min(index, len(self.kinds) - 1)
+        return self.rows[index], self.columns[index]
@@ -0,0 +1,463 @@
+import hashlib
+import marshal
+import os
+import re
+import sys
+import Interpreter
+import Optimizer
+import OutputSink
+import Pipeline
+import SyntaxAnalyzer
+
+# Bump whenever the generated code changes shape, so stale cache entries are ignored
+TRANSPILER_VERSION = "6"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lolcode")
+FILENAME = "<lolcode>"
+RECURSION_ERROR = "Function calls nested too deeply"
+
+
+def raise_error(error):
+    """Raise an error from inside a generated expression."""
+    raise error
+
+
+# Runtime helpers the generated code calls, passed in as the module globals
+RUNTIME = {
+    "_num": Interpreter.to_numeric,
+    "_yarn": Interpreter.to_yarn,
+    "_cast": Interpreter.cast,
+    "_quoshunt": Interpreter.quoshunt,
+    "_mod": Interpreter.mod,
+    "_same": Interpreter.same,
+    "_raise": raise_error,
+}
+
+# Python templates for each arithmetic operator
+MATH_TEMPLATES = {
+    "SUM OF": "({} + {})",
+    "DIFF OF": "({} - {})",
+    "PRODUKT OF": "({} * {})",
+    "QUOSHUNT OF": "_quoshunt({}, {})",
+    "MOD OF": "_mod({}, {})",
+    "BIGGR OF": "max({}, {})",
+    "SMALLR OF": "min({}, {})",
+}
+
+# Python templates for each boolean operator, over the operands joined by the operator's Python keyword
+BOOL_TEMPLATES = {
+    "BOTH OF": ("bool({})", " and "),
+    "EITHER OF": ("bool({})", " or "),
+    "ALL OF": ("bool({})", " and "),
+    "ANY OF": ("bool({})", " or "),
+}
+
+VARIABLE_PREFIX = "v_"  # Keeps LOLCODE identifiers clear of Python keywords and builtins
+FUNCTION_PREFIX = "f_"
+
+
+class Transpiler:
+    def __init__(self, ast):
+        self.ast = ast
+        self.lines = []
+        self.source_map = [None]  # Generated line number -> LOLCODE row; line numbers start at 1
+        self.declared = {"IT"}  # Variables surely declared by the time the statements being generated run
+        self.indent = 2  # Indentation level of the statements being generated
+        self.breakable = 0  # Loops and WTF?s enclosing the statements being generated, which GTFO can leave
+        self.temporaries = 0  # Hidden variables generated so far, for unique names
+        self.functions = {}  # Function name -> parameters, for every HOW IZ I in the program
+
+    def emit(self, line, row=None, indent=None):
+        """Append one generated line, remembering which LOLCODE row it came from."""
+        self.lines.append("    " * (self.indent if indent is None else indent) + line)
+        self.source_map.append(row)
+
+    def transpile_block(self, statements):
+        """Generate an indented block of statements, which Python needs to hold at least one line.
+
+        The block may not run, so what it declares is only sure to be declared inside it.
+        """
+        declared = set(self.declared)
+        self.indent += 1
+        for statement in statements:
+            self.transpile_statement(statement)
+        if not statements:
+            self.emit("pass")
+        self.indent -= 1
+        self.declared = declared
+
+    def transpile(self):
+        """Generate the Python source for the whole program: a function for each HOW IZ I, then the main program."""
+        statements = self.ast[0] if self.ast else []
+        try:
+            # Every function can be called from anywhere, even before its definition, and from itself
+            definitions = [statement for statement in statements if statement["type"] == "function"]
+            for definition in definitions:
+                if definition["name"] in self.functions:
+                    raise NameError(f"Function '{definition['name']}' already defined.")
+                self.functions[definition["name"]] = definition["parameters"]
+            for definition in definitions:
+                self.transpile_function(definition)
+            self.transpile_main([statement for statement in statements if statement["type"] != "function"])
+        except NameError as e:
+            # The Interpreter finds these as it compiles, and reports them as it runs, before any statement
+            self.lines, self.source_map = [], [None]
+            self.transpile_main([], e)
+        return "\n".join(self.lines) + "\n", self.source_map
+
+    def transpile_main(self, statements, error=None):
+        """Generate lolcode_main, which runs the statements and leaves the variables in _symbols."""
+        self.emit("def lolcode_main(_print, _input, _symbols):", indent=0)
+        self.emit("v_IT = None", indent=1)
+        self.emit("try:", indent=1)
+        self.indent, self.breakable, self.declared = 2, 0, {"IT"}
+        for statement in statements:
+            self.transpile_statement(statement)
+        if error is not None:
+            self.emit(f"raise NameError({str(error)!r})")
+        self.emit("pass")
+        self.emit("finally:", indent=1)
+        self.emit("_symbols.update((name[2:], value) for name, value in locals().items() "
+                  "if name.startswith('v_'))")
+
+    def transpile_function(self, node):
+        """HOW IZ I becomes a module-level function, so its body sees only its own parameters and locals.
+
+        _print and _input are module globals in here; without FOUND YR at the end, the function gives IT.
+        """
+        row = node.get("row")
+        parameters = ", ".join(self.variable(parameter) for parameter in node["parameters"])
+        self.emit(f"def {FUNCTION_PREFIX}{node['name']}({parameters}):", row, indent=0)
+        self.indent, self.breakable, self.declared = 1, 0, {"IT", *node["parameters"]}
+        self.check_cancelled(row)
+        self.emit("v_IT = None", row)
+        body = node["body"]
+        for statement in body:
+            self.transpile_statement(statement)
+        if not body or body[-1]["type"] != "return":
+            self.emit("return v_IT", row)
+
+    def check_cancelled(self, row):
+        """Stop here if the program was cancelled: at each loop pass and each call, since recursion need not loop."""
+        self.emit("if _program.cancelled:", row)
+        self.emit('raise InterruptedError("Execution cancelled")', row, self.indent + 1)
+
+    def variable(self, name):
+        """Get the Python name of a variable."""
+        return VARIABLE_PREFIX + name
+
+    def check_declared(self, name, row, message="Variable '{}' not declared."):
+        """Before a statement stores to a variable that may not be declared yet, raise if it is not.
+
+        Variables are Python locals, bound once I HAS A runs, so the check is reading the local; it is left out
+        where the variable is surely declared already.
+        """
+        if name in self.declared:
+            return
+        self.emit("try:", row)
+        self.emit(self.variable(name), row, self.indent + 1)
+        self.emit("except NameError:", row)
+        self.emit(f"raise NameError({message.format(name)!r}) from None", row, self.indent + 1)
+        self.declared.add(name)  # Whatever runs after the check can rely on it
+
+    def transpile_statement(self, node):
+        """Generate the lines for one statement; bare expressions store their value in IT."""
+        kind = node["type"]
+        row = node.get("row")
+        if kind == "print":
+            parts = " + ".join(self.yarn_expr(operand) for operand in node["operand"])
+            self.emit(f"_print({parts})", row)
+        elif kind == "input":
+            self.check_declared(node["name"], row, "Undeclared variable '{}' used.")
+            self.emit(f"{self.variable(node['name'])} = _input()", row)
+        elif kind == "var_dec_list":
+            names = set()
+            for var_dec in node["declarations"]:
+                if var_dec["name"] in names:
+                    raise NameError(f"Variable '{var_dec['name']}' already declared.")
+                names.add(var_dec["name"])
+                initialized = var_dec["initialized"]
+                value = self.expr(initialized["value"]) if initialized else "None"
+                self.emit(f"{self.variable(var_dec['name'])} = {value}", row)
+                self.declared.add(var_dec["name"])
+        elif kind == "assignment":
+            self.check_declared(node["name"], row)
+            value = self.expr(node["value"])
+            self.emit(f"{self.variable(node['name'])} = {value}", row)
+        elif kind == "recast":
+            self.check_declared(node["name"], row)
+            name = self.variable(node["name"])
+            self.emit(f"{name} = _cast({name}, {node['datatype']!r})", row)
+        elif kind == "loop":
+            self.transpile_loop(node)
+        elif kind == "if":
+            self.transpile_if(node)
+        elif kind == "switch":
+            self.transpile_switch(node)
+        elif kind == "break":
+            if not self.breakable:
+                raise SyntaxError("GTFO outside of a loop or function")
+            self.emit("break", row)
+        elif kind == "return":
+            value = self.expr(node["value"]) if node["value"] is not None else "None"  # GTFO gives NOOB
+            self.emit(f"return {value}", row)
+        else:
+            self.emit(f"v_IT = {self.expr(node)}", row)
+
+    def transpile_loop(self, node):
+        """IM IN YR becomes a while loop over the condition, stepping the loop variable at the end of each pass."""
+        row = node.get("row")
+        condition = node["condition"]
+        if condition is None:
+            test = "True"
+        elif node["clause"] == "WILE":
+            test = self.expr(condition)
+        else:
+            test = f"not {self.expr(condition)}"
+        self.emit(f"while {test}:", row)
+        declared = set(self.declared)
+        self.indent += 1
+        self.breakable += 1
+        self.check_cancelled(row)
+        for statement in node["body"]:
+            self.transpile_statement(statement)
+        self.breakable -= 1
+        self.declared = declared  # The loop may not run at all
+        if node["operation"] is not None:
+            name = self.variable(node["variable"])
+            self.emit(f"{name} = _num({name}) {'+' if node['operation'] == 'UPPIN' else '-'} 1", row)
+        self.indent -= 1
+
+    def transpile_if(self, node):
+        """O RLY? becomes an if on IT, with an elif for each MEBBE."""
+        row = node.get("row")
+        self.emit("if v_IT:", row)
+        self.transpile_block(node["body"])
+        for clause in node["elifs"]:
+            self.emit(f"elif {self.expr(clause['condition'])}:", row)
+            self.transpile_block(clause["body"])
+        if node["else"] is not None:
+            self.emit("else:", row)
+            self.transpile_block(node["else"])
+
+    def transpile_switch(self, node):
+        """WTF? looks up where to start from IT, then runs the cases from there on in a loop that GTFO breaks.
+
+        Python sees WIN as equal to 1, but BOTH SAEM never does, so TROOFs get a lookup table of their own.
+        """
+        row = node.get("row")
+        values, troofs = {}, {}
+        for index, case in enumerate(node["cases"]):
+            value = Interpreter.literal_value(case["value"]["value"])
+            (troofs if value.__class__ is bool else values).setdefault(value, index)
+        start = f"_start{self.temporaries}"
+        self.temporaries += 1
+        self.emit(f"{start} = ({troofs!r} if v_IT.__class__ is bool else {values!r}).get(v_IT, "
+                  f"{len(node['cases'])})", row)
+        self.emit("while True:", row)
+        self.indent += 1
+        self.breakable += 1
+        bodies = [case["body"] for case in node["cases"]]
+        if node["default"] is not None:
+            bodies.append(node["default"])
+        for index, body in enumerate(bodies):
+            self.emit(f"if {start} <= {index}:", row)
+            self.transpile_block(body)
+        self.emit("break", row)
+        self.breakable -= 1
+        self.indent -= 1
+
+    def expr(self, node):
+        """Generate a Python expression for an expression node."""
+        kind = node["type"]
+        if kind == "literal":
+            return repr(Interpreter.literal_value(node["value"]))
+        elif kind == "identifier":
+            return VARIABLE_PREFIX + node["value"]
+        elif kind == "math_expr":
+            return MATH_TEMPLATES[node["operator"]].format(self.numeric_expr(node["left"]),
+                                                           self.numeric_expr(node["right"]))
+        elif kind == "smoosh_expr":
+            return "(" + " + ".join(self.yarn_expr(part) for part in node["parts"]) + ")"
+        elif kind == "typecast":
+            return f"_cast({self.expr(node['operand'])}, {node['datatype']!r})"
+        elif kind == "comparison_expr":
+            comparison = f"_same({self.expr(node['left'])}, {self.expr(node['right'])})"
+            return comparison if node["operator"] == "BOTH SAEM" else f"(not {comparison})"
+        elif kind == "bool_expr":
+            operands = [self.expr(operand) for operand in node["operands"]]
+            if node["operator"] == "NOT":
+                return f"(not {operands[0]})"
+            if node["operator"] == "WON OF":
+                return f"((not {operands[0]}) != (not {operands[1]}))"
+            template, keyword = BOOL_TEMPLATES[node["operator"]]
+            return template.format(keyword.join(operands))
+        elif kind == "call":
+            return self.call_expr(node)
+        raise SyntaxError(f"Cannot transpile node of type '{kind}'")
+
+    def call_expr(self, node):
+        """Generate a call to a HOW IZ I's function, with the arguments evaluated in the caller.
+
+        Calling a function that is not defined, or with the wrong number of arguments, raises as the call is
+        reached, before its arguments are evaluated.
+        """
+        name = node["name"]
+        count = len(node["arguments"])
+        if name not in self.functions:
+            message = f"Undefined function '{name}' called."
+            return f"_raise(NameError({message!r}))"
+        expected = len(self.functions[name])
+        if count != expected:
+            message = (f"Function '{name}' takes {expected} argument{'s' if expected != 1 else ''}, "
+                       f"but {count} were given")
+            return f"_raise(TypeError({message!r}))"
+        return f"{FUNCTION_PREFIX}{name}({', '.join(self.expr(argument) for argument in node['arguments'])})"
+
+    def numeric_expr(self, node):
+        """Generate an expression cast to a number, skipping the cast when it is already one."""
+        if node["type"] == "math_expr":
+            return self.expr(node)
+        if node["type"] == "literal":
+            value = Interpreter.literal_value(node["value"])
+            if type(value) in (int, float):
+                return repr(value)
+        return f"_num({self.expr(node)})"
+
+    def yarn_expr(self, node):
+        """Generate an expression cast to a YARN, skipping the cast for string literals."""
+        if node["type"] == "literal":
+            return repr(Interpreter.to_yarn(Interpreter.literal_value(node["value"])))
+        if node["type"] == "smoosh_expr":
+            return self.expr(node)
+        return f"_yarn({self.expr(node)})"
+
+
+def undeclared_variable(error):
+    """Get the LOLCODE variable that generated code read before declaring it, if that is what error is."""
+    name = getattr(error, "name", None)
+    if name is None and isinstance(error, UnboundLocalError):
+        match = re.search(r"'(\w+)'", str(error))  # Python before 3.12 leaves the name out of UnboundLocalError
+        name = match and match.group(1)
+    if name and name.startswith(VARIABLE_PREFIX):
+        return name[len(VARIABLE_PREFIX):]
+    return None
+
+
+class TranspiledProgram:
+    def __init__(self, code, source_map, input_func=input, output=None):
+        self.code = code
+        self.source_map = source_map
+        self.input_func = input_func
+        self.symbol_table = {}
+        self.console = []  # This will hold the console output
+        self.output = output or OutputSink.MemorySink(self.console)  # Receives each VISIBLE line
+        self.cancelled = False  # Set from another thread to stop the program at its next loop pass or call
+
+    def run(self):
+        """Execute the compiled code, reporting runtime errors at their LOLCODE line.
+
+        Each function call is a Python call, so unlike in the Interpreter, recursion deeper than Python's
+        recursion limit stops the program with a runtime error.
+        """
+        def read_input():
+            self.output.flush()  # Show any prompt before waiting for input
+            return self.input_func()
+
+        # The functions of HOW IZ Is find _print and _input as globals
+        namespace = dict(RUNTIME, _print=self.output.write, _input=read_input, _program=self)
+        exec(self.code, namespace)
+        try:
+            namespace["lolcode_main"](self.output.write, read_input, self.symbol_table)
+            return True
+        except (NameError, TypeError, ValueError, ZeroDivisionError, EOFError, InterruptedError,
+                RecursionError) as e:
+            message = str(e) or "End of input"
+            name = undeclared_variable(e)
+            if name is not None:
+                message = f"Undeclared variable '{name}' used."
+            elif isinstance(e, RecursionError):
+                message = RECURSION_ERROR
+            row = self.error_row(e.__traceback__)
+            location = f" on line {row}" if row else ""
+            self.console.append(f"Runtime error{location}: {message}")
+            return False
+        finally:
+            self.output.flush()
+
+    def cancel(self):
+        """Ask a running program to stop; safe to call from another thread."""
+        self.cancelled = True
+
+    def stats(self):
+        """Get the runtime counters; transpiled functions are not memoized, so there are no call caches."""
+        return {"call_caches": {}}
+
+    def error_row(self, traceback):
+        """Find the LOLCODE row of the innermost generated line in a traceback."""
+        row = None
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FILENAME:
+                row = self.source_map[traceback.tb_lineno]
+            traceback = traceback.tb_next
+        return row
+
+
+def parse_source(source):
+    """Lex, parse and optimize source code, raising SyntaxError if it does not parse."""
+    ast, syntax_analyzer = Pipeline.parse(source)
+    if ast is None:
+        raise SyntaxError(syntax_analyzer.console[-1])
+    return Optimizer.Optimizer(ast).optimize()
+
+
+def compile_ast(ast):
+    """Transpile an optimized AST into a code object and its source map.
+
+    Raises SyntaxError for expressions nested deeper than the Python compiler takes.
+    """
+    try:
+        python_source, source_map = Transpiler(ast).transpile()
+        return compile(python_source, FILENAME, "exec"), source_map
+    except (RecursionError, MemoryError):
+        raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None
+    except SyntaxError as e:
+        if e.filename != FILENAME:
+            raise
+        raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None  # Too many nested parentheses
+
+
+def compile_source(source):
+    """Lex, parse, optimize and transpile source code into a code object and its source map."""
+    return compile_ast(parse_source(source))
+
+
+def cache_key(source):
+    """Hash the LOLCODE source together with everything that affects the generated code."""
+    digest = hashlib.sha256()
+    digest.update(f"{TRANSPILER_VERSION}:{sys.implementation.cache_tag}:".encode())
+    digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def load_program(source, cache_dir=DEFAULT_CACHE_DIR, input_func=input, output=None):
+    """Get a runnable program, skipping lexing and parsing when a cached code object exists.
+
+    Raises SyntaxError if the source does not parse.
+    """
+    path = os.path.join(cache_dir, cache_key(source) + ".marshal") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'rb') as file:
+                code, source_map = marshal.load(file)
+            return TranspiledProgram(code, source_map, input_func, output)
+        except (EOFError, ValueError, TypeError):
+            pass  # Corrupt entry; recompile and overwrite it
+
+    code, source_map = compile_source(source)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            marshal.dump((code, source_map), file)
+        os.replace(temp_path, path)
+    return TranspiledProgram(code, source_map, input_func, output)
@@ -0,0 +1,205 @@
+import re
+import SyntaxAnalyzer
+
+NUMBR_PATTERN = re.compile(r"-?\d+")
+
+# Datatype each operand datatype has once arithmetic casts it to a number
+NUMERIC_DATATYPES = {"NUMBR": "NUMBR", "TROOF": "NUMBR", "NUMBAR": "NUMBAR"}
+
+# Node types that evaluate to a value; as statements, they store it in IT
+EXPRESSION_TYPES = {"literal", "identifier", "math_expr", "smoosh_expr", "typecast", "comparison_expr", "bool_expr",
+                    "call"}
+
+# Datatypes that BOTH SAEM compares by value with each other; any other mix of datatypes is never the same
+NUMBER_DATATYPES = {"NUMBR", "NUMBAR"}
+
+
+def literal_type(lexeme):
+    """Get the datatype of a literal lexeme without converting it."""
+    if lexeme.startswith('"'):
+        return "YARN"
+    if lexeme in ("WIN", "FAIL"):
+        return "TROOF"
+    if NUMBR_PATTERN.fullmatch(lexeme):
+        return "NUMBR"
+    return "NUMBAR"
+
+
+def datatype(node, known, types=None):
+    """Get the datatype an expression always evaluates to, or None if it can vary.
+
+    known maps each variable to the datatype it holds at this point of the program. If types is given, the
+    datatype of the expression and of every subexpression is recorded in it too, keyed by id(node).
+    """
+    kind = node["type"]
+    if kind == "literal":
+        result = literal_type(node["value"])
+    elif kind == "identifier":
+        result = known.get(node["value"])
+    elif kind == "math_expr":
+        # TROOFs count as NUMBRs; YARNs may hold either kind of number
+        left = NUMERIC_DATATYPES.get(datatype(node["left"], known, types))
+        right = NUMERIC_DATATYPES.get(datatype(node["right"], known, types))
+        if left is None or right is None:
+            result = None
+        elif left == right:
+            result = left
+        elif node["operator"] in ("BIGGR OF", "SMALLR OF"):
+            result = None  # Whichever operand wins keeps its own datatype
+        else:
+            result = "NUMBAR"
+    elif kind == "smoosh_expr":
+        if types is not None:
+            for part in node["parts"]:
+                datatype(part, known, types)
+        result = "YARN"
+    elif kind == "typecast":
+        if types is not None:
+            datatype(node["operand"], known, types)
+        result = node["datatype"]
+    elif kind == "comparison_expr":
+        if types is not None:
+            datatype(node["left"], known, types)
+            datatype(node["right"], known, types)
+        result = "TROOF"
+    elif kind == "bool_expr":
+        if types is not None:
+            for operand in node["operands"]:
+                datatype(operand, known, types)
+        result = "TROOF"
+    elif kind == "call":
+        if types is not None:
+            for argument in node["arguments"]:
+                datatype(argument, known, types)
+        result = None  # Whatever the function finds
+    else:
+        result = None
+    if types is not None:
+        # A node reached again with another datatype, e.g. on another pass through a loop, may hold either
+        if types.get(id(node), result) != result:
+            result = None
+        types[id(node)] = result
+    return result
+
+
+def join(known, other):
+    """Merge the known datatypes of two paths into a program point: a variable keeps a datatype only if both agree."""
+    return {name: known.get(name) if known.get(name) == other.get(name) else None for name in known.keys() | other}
+
+
+class TypeInference:
+    def __init__(self, ast):
+        self.ast = ast
+        self.types = {}  # id(expression node) -> datatype it always evaluates to, or None if it can vary
+        self.variables = {}  # Variable -> datatype it is known to hold when the program ends
+        self.exits = []  # For each loop or WTF? being followed, the known datatypes at each of its GTFOs
+
+    def infer(self):
+        """Work out the datatype of every expression in the program, returning them keyed by id(node)."""
+        statements = self.ast[0] if self.ast else []
+        known = {"IT": "NOOB"}  # Variable -> datatype it is known to hold at this point of the program
+        try:
+            self.infer_block(statements, known)
+        except RecursionError:
+            raise SyntaxError(SyntaxAnalyzer.NESTING_ERROR) from None
+        self.variables = known
+        return self.types
+
+    def infer_block(self, statements, known):
+        """Follow a statement list in order, updating known as each statement stores to a variable."""
+        for statement in statements:
+            self.infer_statement(statement, known)
+
+    def infer_statement(self, node, known):
+        """Record the datatypes of a statement's expressions, then of whatever it stores."""
+        kind = node["type"]
+        if kind == "print":
+            for operand in node["operand"]:
+                datatype(operand, known, self.types)
+        elif kind == "input":
+            known[node["name"]] = "YARN"
+        elif kind == "var_dec_list":
+            for var_dec in node["declarations"]:
+                initialized = var_dec["initialized"]
+                if initialized:
+                    known[var_dec["name"]] = datatype(initialized["value"], known, self.types)
+                else:
+                    known[var_dec["name"]] = "NOOB"
+        elif kind == "assignment":
+            known[node["name"]] = datatype(node["value"], known, self.types)
+        elif kind == "recast":
+            known[node["name"]] = node["datatype"]
+        elif kind in EXPRESSION_TYPES:
+            known["IT"] = datatype(node, known, self.types)
+        elif kind == "loop":
+            self.infer_loop(node, known)
+        elif kind == "if":
+            self.infer_if(node, known)
+        elif kind == "switch":
+            self.infer_switch(node, known)
+        elif kind == "break":
+            self.exits[-1].append(dict(known))
+        elif kind == "return":
+            if node["value"] is not None:
+                datatype(node["value"], known, self.types)
+        elif kind == "function":
+            # The body runs in a scope of its own, whose parameters may hold anything
+            self.infer_block(node["body"], {"IT": "NOOB"})
+        else:
+            known.clear()  # A statement this pass does not understand may assign anything
+
+    def infer_loop(self, node, known):
+        """Follow a loop until the datatypes at its head stop changing, leaving known as they are after it."""
+        self.exits.append([])
+        head = dict(known)
+        while True:
+            if node["condition"] is not None:
+                datatype(node["condition"], head, self.types)
+            state = dict(head)
+            self.infer_block(node["body"], state)
+            if node["variable"] is not None:
+                state[node["variable"]] = NUMERIC_DATATYPES.get(state.get(node["variable"]))
+            joined = join(head, state)
+            if joined == head:
+                break
+            head = joined
+        # The loop ends when its condition stops it, at the head, or at a GTFO
+        for state in self.exits.pop():
+            head = join(head, state)
+        known.clear()
+        known.update(head)
+
+    def infer_if(self, node, known):
+        """Follow each branch of an O RLY? from the same state, leaving known as they are after whichever ran."""
+        branches = []
+        for condition, body in [(None, node["body"])] + [(clause["condition"], clause["body"])
+                                                         for clause in node["elifs"]]:
+            if condition is not None:
+                datatype(condition, known, self.types)
+            state = dict(known)
+            self.infer_block(body, state)
+            branches.append(state)
+        state = dict(known)  # Without NO WAI, no branch may run at all
+        if node["else"] is not None:
+            self.infer_block(node["else"], state)
+        for branch in branches:
+            state = join(state, branch)
+        known.clear()
+        known.update(state)
+
+    def infer_switch(self, node, known):
+        """Follow each case of a WTF?, which may be jumped to or fallen into from the case before."""
+        self.exits.append([])
+        state = None  # Known datatypes at the end of the case before
+        for body in [case["body"] for case in node["cases"]] + [node["default"] or []]:
+            state = dict(known) if state is None else join(known, state)
+            self.infer_block(body, state)
+        # The WTF? ends after its last case, or at a GTFO
+        for exit_state in self.exits.pop():
+            state = join(state, exit_state)
+        known.clear()
+        known.update(state)
+
+    def datatype_of(self, node):
+        """Get the inferred datatype of an expression node, or None if it can vary."""
+        return self.types.get(id(node))
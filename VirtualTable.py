@@ -0,0 +1,82 @@
+import tkinter as tk
+from tkinter import ttk
+
+ROW_HEIGHT = 20  # Pixels per Treeview row; main.py configures the Treeview style with it
+HEADING_HEIGHT = 24  # Pixels taken by the column headings
+
+
+class VirtualTable:
+    def __init__(self, parent, columns, row_height=ROW_HEIGHT):
+        """A Treeview that only materializes the rows in view, read from any sequence of value tuples."""
+        self.row_height = row_height
+        self.rows = ()  # Row source: anything with __len__ and __getitem__ returning a tuple of values
+        self.offset = 0  # Index of the first visible row
+        self.visible = 1  # Rows that fit in the widget
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=1)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", self.resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-1, "units"))  # X11 wheel up
+        self.tree.bind("<Button-5>", lambda event: self.scroll(1, "units"))  # X11 wheel down
+
+    def heading(self, column, **options):
+        self.tree.heading(column, **options)
+
+    def column(self, column, **options):
+        self.tree.column(column, **options)
+
+    def set_rows(self, rows):
+        """Show a new row source, scrolled to the top."""
+        self.rows = rows
+        self.offset = 0
+        self.render()
+
+    def resize(self, event):
+        """Fit as many rows as the widget now has room for."""
+        visible = max(1, (event.height - HEADING_HEIGHT) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, "units" | "pages")."""
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, count, what):
+        step = self.visible if what == "pages" else 1
+        self.scroll_to(self.offset + count * step)
+        return "break"  # Keep the Treeview from scrolling its own (few) items
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.rows) - self.visible))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def render(self):
+        """Reuse the materialized items for the rows now in view, adding or removing items as needed."""
+        self.offset = max(0, min(self.offset, len(self.rows) - self.visible))
+        count = min(self.visible, len(self.rows) - self.offset)
+        items = self.tree.get_children()
+        if len(items) > count:
+            self.tree.delete(*items[count:])
+            items = items[:count]
+        for index in range(count):
+            values = self.rows[self.offset + index]
+            if index < len(items):
+                self.tree.item(items[index], values=values)
+            else:
+                self.tree.insert("", tk.END, values=values)
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
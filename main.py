@@ -1,19 +1,30 @@
 import os
+import queue
+import threading
+import time
+from array import array
+from bisect import bisect_left
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
+from tkinter import simpledialog
 import SyntaxAnalyzer
 import LexicalAnalyzer
+import Optimizer
+import OutputSink
 import SemanticAnalyzer
+import Interpreter
+import TokenStream
+import TypeInference
+import VirtualTable
+from Pipeline import Reader
 
-class Reader:
-    def __init__(self, path):
-        self.path = path
-
-    def read(self):
-        with open(self.path, 'r') as file:
-            return file.read()
+POLL_INTERVAL = 20  # Milliseconds between drains of the worker's message queue
+DRAIN_BUDGET = 0.015  # Seconds of worker messages applied per drain, so input and redraws get a turn
+ALL_CLASSIFICATIONS = "All"  # Lexeme filter choice that shows every row
 
+# Tokens the lexeme table leaves out
+HIDDEN_TOKENS = {'COMMENT_START', 'COMMENT', 'NEWLINE'}
 
 class CMSC124Project:
     def __init__(self, root):
@@ -24,6 +35,12 @@ class CMSC124Project:
         self.root.resizable(True, True)
 
         self.file_path = None  
+        self.lexer = LexicalAnalyzer.IncrementalLexer()
+        self.token_rows = TokenRows([], [], array('i'))  # Every lexeme table row of the last run, before filtering
+        self.token_stream = TokenStream.TokenStream()  # Parser's view of the last text lexed
+        self.previous_analyzer = None  # Last run's syntax analyzer, whose unchanged statements get reused
+        self.messages = queue.Queue()  # UI updates posted by the worker thread, applied by drain_messages
+        self.run = None  # The run in progress, if any
 
         self.create_widgets()
 
@@ -44,7 +61,7 @@ class CMSC124Project:
         # Create Style for the Treeview
         style = ttk.Style()
         style.configure("Treeview.Heading", font=("Georgia", 10, "bold"))
-        style.configure("Treeview", font=("Verdana", 10))
+        style.configure("Treeview", font=("Verdana", 10), rowheight=VirtualTable.ROW_HEIGHT)
 
         # Main Frame
         main_frame = tk.Frame(self.root)
@@ -78,17 +95,18 @@ class CMSC124Project:
         lexeme_label = tk.Label(lexeme_frame, text="Lexemes", font=('Georgia', 12, 'bold'))
         lexeme_label.pack()
 
-        self.tokens_table = ttk.Treeview(lexeme_frame, columns=("Lexeme", "Classification"), show="headings")
+        self.classification_filter = ttk.Combobox(
+            lexeme_frame, state="readonly", values=[ALL_CLASSIFICATIONS] + list(LexicalAnalyzer.TOKEN_CLASSIFICATIONS))
+        self.classification_filter.set(ALL_CLASSIFICATIONS)
+        self.classification_filter.bind("<<ComboboxSelected>>", lambda event: self.filter_tokens_table())
+        self.classification_filter.pack(side=tk.TOP, fill=tk.X)
+
+        # Only the rows in view exist as Treeview items; scrolling refills them from self.token_rows
+        self.tokens_table = VirtualTable.VirtualTable(lexeme_frame, columns=("Lexeme", "Classification"))
         self.tokens_table.heading("Lexeme", text="Lexeme")
         self.tokens_table.heading("Classification", text="Classification")
         self.tokens_table.column("Lexeme", width=100, anchor="w")
         self.tokens_table.column("Classification", width=100, anchor="w")
-        self.tokens_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        tokens_scrollbar = tk.Scrollbar(lexeme_frame, orient=tk.VERTICAL, command=self.tokens_table.yview)
-        tokens_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.tokens_table.config(yscrollcommand=tokens_scrollbar.set)
 
         # Symbol Table
         symbol_frame = tk.Frame(main_frame)
@@ -97,17 +115,13 @@ class CMSC124Project:
         symbol_label = tk.Label(symbol_frame, text="Symbol Table", font=('Georgia', 12, 'bold'))
         symbol_label.pack()
 
-        self.symbol_table = ttk.Treeview(symbol_frame, columns=("Identifier", "Value"), show="headings")
+        self.symbol_table = VirtualTable.VirtualTable(symbol_frame, columns=("Identifier", "Value", "Type"))
         self.symbol_table.heading("Identifier", text="Identifier")
         self.symbol_table.heading("Value", text="Value")
+        self.symbol_table.heading("Type", text="Type")
         self.symbol_table.column("Identifier", width=100, anchor="w")
         self.symbol_table.column("Value", width=100, anchor="w")
-        self.symbol_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        symbol_scrollbar = tk.Scrollbar(symbol_frame, orient=tk.VERTICAL, command=self.symbol_table.yview)
-        symbol_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.symbol_table.config(yscrollcommand=symbol_scrollbar.set)
+        self.symbol_table.column("Type", width=70, anchor="w")
 
         # Console
         self.console_text = tk.Text(self.root, wrap=tk.WORD, font=('Courier New', 10), height=8)
@@ -116,9 +130,20 @@ class CMSC124Project:
         self.console_text.insert(tk.END, "Console Output:\n")
         self.console_text.config(state=tk.DISABLED)
 
-        # Execute button
-        self.execute_button = tk.Button(self.root, text="EXECUTE", font=('Georgia', 12, 'bold'), command=self.execute)
-        self.execute_button.pack(side=tk.BOTTOM, pady=10)
+        # VISIBLE output from the worker thread, inserted a block at a time on the Tk thread
+        self.console_sink = OutputSink.TkSink(self.console_text,
+                                              lambda func, *args: self.messages.put(("call", func, args)))
+
+        # Execute and Stop buttons
+        button_frame = tk.Frame(self.root)
+        button_frame.pack(side=tk.BOTTOM, pady=10)
+
+        self.execute_button = tk.Button(button_frame, text="EXECUTE", font=('Georgia', 12, 'bold'), command=self.execute)
+        self.execute_button.pack(side=tk.LEFT, padx=5)
+
+        self.stop_button = tk.Button(button_frame, text="STOP", font=('Georgia', 12, 'bold'), command=self.stop,
+                                     state=tk.DISABLED)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
 
     def select_file(self):
         current_working_dir = os.getcwd()  # Get the current working directory
@@ -134,71 +159,130 @@ class CMSC124Project:
         file_content = self.editor_text.get("1.0", tk.END).strip()
 
         if file_content:
-            # Perform lexical analysis
-            tokens, lexemes, rows, columns = LexicalAnalyzer.LexicalAnalyzer().gen_tokens(file_content)
-
-            # Clear previous entries in the token and symbol tables
-            for item in self.tokens_table.get_children():
-                self.tokens_table.delete(item)
-            for item in self.symbol_table.get_children():
-                self.symbol_table.delete(item)
-
-            # Fill the lexeme table
-            for token, lexeme in zip(tokens, lexemes):
-                if token not in {'COMMENT_START', 'COMMENT', 'NEWLINE'}:
-                    self.tokens_table.insert("", tk.END, values=(lexeme, token))
-
-            # Display console output
-            self.console_text.config(state=tk.NORMAL)
-            self.console_text.delete(1.0, tk.END)
-            self.console_text.insert(tk.END, "Done.\n")
-            self.console_text.config(state=tk.DISABLED)
+            # Clear previous entries in the symbol table and console
+            self.symbol_table.set_rows(())
+            self.display_output("")
 
-            indices_to_remove = [i for i, value in enumerate(tokens) if value in ['COMMENT_START', 'COMMENT', 'NEWLINE']]
+            # Lex, parse and run on a worker thread; it reports back through self.messages
+            self.run = Run()
+            self.execute_button.config(state=tk.DISABLED)
+            self.stop_button.config(state=tk.NORMAL)
+            threading.Thread(target=self.run_program, args=(file_content, self.run), daemon=True).start()
+            self.root.after(POLL_INTERVAL, self.drain_messages)
 
-            for index in sorted(indices_to_remove, reverse=True):
-                lexemes.pop(index)
-                tokens.pop(index)
-
-            final_tokens = [{lexemes[i]: tokens[i]} for i in range(len(lexemes))]
+        else:
+            self.display_output("Enter something in the text editor.\n")
+
+    def stop(self):
+        """Cancel the running program."""
+        if self.run:
+            self.run.cancel()
+
+    def run_program(self, file_content, run):
+        """Worker thread: lex, parse and execute, posting every UI update to self.messages."""
+        post = self.messages.put
+        try:
+            # Perform lexical analysis, re-lexing only the lines changed since the last run
+            first, old_end, new_end = self.lexer.update(file_content)
+            # The last parse only lines up with the edit just lexed; a run stopped before parsing leaves none to reuse
+            previous_analyzer, self.previous_analyzer = self.previous_analyzer, None
+            # Patch in the tokens of the re-lexed lines only; rows after them just move by the lines added
+            tokens, lexemes, rows, columns = self.lexer.tokens_between(first, new_end)
+            shift = new_end - old_end
+            token_rows = self.token_rows.spliced(first + 1, old_end + 1, tokens, lexemes, rows, shift)
+            self.token_stream = token_stream = self.token_stream.spliced(first + 1, old_end + 1,
+                                                                         zip(tokens, lexemes, rows, columns), shift)
+            post(("tokens", token_rows))
+            if run.cancelled:
+                return
 
             # Perform syntax analysis
-            syntax_analyzer = SyntaxAnalyzer.SyntaxAnalyzer(final_tokens)
+            syntax_analyzer = SyntaxAnalyzer.SyntaxAnalyzer(token_stream, previous=previous_analyzer,
+                                                            edit=(first, old_end, new_end))
             ast = syntax_analyzer.analyze()
-
-            if ast:
-                semantic_analyzer = SemanticAnalyzer.SemanticAnalyzer(ast, self.console_text)
-                semantic_analyzer.analyze()  # Start semantic analysis
-
-                # for console_output in semantic_analyzer.console:
-                #     self.console_text.config(state=tk.NORMAL)
-                #     self.console_text.insert(tk.END, console_output)
-                #     self.console_text.config(state=tk.DISABLED)
-
-                # Update the symbol table with variables and their values
-                self.update_symbol_table(semantic_analyzer.symbol_table)
-
-            else:
-                self.console_text.config(state=tk.NORMAL)
-                self.console_text.delete(1.0, tk.END)
-                self.console_text.insert(tk.END, "Syntax analysis failed.\n")
-                self.console_text.config(state=tk.DISABLED)
-
-            for console_output in syntax_analyzer.console:
-                self.console_text.config(state=tk.NORMAL)
-                self.console_text.insert(tk.END, console_output+"\n")
-                self.console_text.config(state=tk.DISABLED)
-
-        else:
-            self.console_text.config(state=tk.NORMAL)
-            self.console_text.delete(1.0, tk.END)
-            self.console_text.insert(tk.END, "Enter something in the text editor.\n")
-            self.console_text.config(state=tk.DISABLED)
-
-    def update_symbol_table(self, symbol_table):
-        """Update the symbol table UI with the variables and their values."""
-        for identifier, value in symbol_table.items():
-            self.symbol_table.insert("", tk.END, values=(identifier, value))
+            self.previous_analyzer = syntax_analyzer
+            if not ast:
+                post(("console", "Syntax analysis failed."))
+                for console_output in syntax_analyzer.console:
+                    post(("console", console_output))
+                return
+            if run.cancelled:
+                return
+
+            # Fold constant expressions and drop no-op recasts
+            ast = Optimizer.Optimizer(ast).optimize()
+
+            # Resolve every variable to a slot, so execution indexes a list instead of hashing names
+            scopes = SemanticAnalyzer.SemanticAnalyzer(ast).analyze()
+
+            # Prove the datatype of each expression, so arithmetic and comparisons can skip their runtime casts
+            type_inference = TypeInference.TypeInference(ast)
+            types = type_inference.infer()
+
+            # Execute the program, flushing VISIBLE output to the console in blocks as it runs
+            interpreter = Interpreter.Interpreter(ast, self.request_input, self.console_sink, scopes, types)
+            run.interpreter = interpreter
+            if run.cancelled:
+                return
+            interpreter.run()
+            for console_output in interpreter.console:
+                post(("console", console_output))
+
+            # Update the symbol table with variables, their values and the datatypes inferred for them
+            post(("symbols", [(identifier, Interpreter.to_yarn(value), type_inference.variables.get(identifier) or "")
+                              for identifier, value in interpreter.symbol_table.items()]))
+        except SyntaxError as e:
+            post(("console", "Syntax analysis failed."))  # The passes after parsing found an expression too deep
+            post(("console", str(e)))
+        finally:
+            post(("done", run.cancelled))
+
+    def drain_messages(self):
+        """Apply worker messages for up to DRAIN_BUDGET seconds, then come back, so the window stays responsive."""
+        # VISIBLE output waiting on a long computation would otherwise only be flushed by the next VISIBLE
+        self.console_sink.flush_due()
+        deadline = time.perf_counter() + DRAIN_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == "tokens":
+                self.token_rows = message[1]
+                self.filter_tokens_table()
+            elif kind == "console":
+                self.append_output(message[1] + "\n")
+            elif kind == "call":
+                message[1](*message[2])
+            elif kind == "symbols":
+                self.symbol_table.set_rows(message[1])
+            elif kind == "input":
+                message[1].put(self.read_input())
+            elif kind == "done":
+                self.append_output("Stopped.\n" if message[1] else "Done.\n")
+                self.execute_button.config(state=tk.NORMAL)
+                self.stop_button.config(state=tk.DISABLED)
+                self.run = None
+                return
+        self.root.after(POLL_INTERVAL, self.drain_messages)
+
+    def filter_tokens_table(self):
+        """Show the lexeme table rows of the chosen classification."""
+        classification = self.classification_filter.get()
+        self.tokens_table.set_rows(self.token_rows.filtered(None if classification == ALL_CLASSIFICATIONS
+                                                            else classification))
+
+    def request_input(self):
+        """Worker thread: ask the UI thread for a GIMMEH value and wait for it."""
+        reply = queue.Queue(maxsize=1)
+        self.messages.put(("input", reply))
+        return reply.get()
+
+    def read_input(self):
+        """Ask the user for a GIMMEH value."""
+        value = simpledialog.askstring("GIMMEH", "Input:", parent=self.root)
+        return value if value is not None else ""
 
     def display_editor_content(self, content):
         self.editor_text.delete(1.0, tk.END)
@@ -210,8 +294,66 @@ class CMSC124Project:
         self.console_text.insert(tk.END, output)
         self.console_text.config(state=tk.DISABLED)
 
-
-# Create and run the app
-root = tk.Tk()
-app = CMSC124Project(root)
-root.mainloop()
+    def append_output(self, output):
+        self.console_sink.insert(output)
+
+
+class TokenRows:
+    def __init__(self, tokens, lexemes, rows, indices=None):
+        """Lexeme table rows: the shown tokens in parallel lists, read through an index array when filtered."""
+        self.tokens = tokens
+        self.lexemes = lexemes
+        self.rows = rows  # Source line of each token, for patching in the lines an edit re-lexed
+        self.indices = indices  # Indices of the tokens a filter keeps, or None for all of them
+
+    @classmethod
+    def from_lexer(cls, tokens, lexemes, rows):
+        """Build the rows of the lexer's parallel lists, leaving out HIDDEN_TOKENS."""
+        shown = [index for index, token in enumerate(tokens) if token not in HIDDEN_TOKENS]
+        return cls([tokens[index] for index in shown], [lexemes[index] for index in shown],
+                   array('i', [rows[index] for index in shown]))
+
+    def spliced(self, first_row, last_row, tokens, lexemes, rows, shift):
+        """Get a copy with the rows of source lines [first_row, last_row) replaced and every later row moved by shift."""
+        start = bisect_left(self.rows, first_row)
+        stop = bisect_left(self.rows, last_row, start)
+        edited = TokenRows.from_lexer(tokens, lexemes, rows)
+        return TokenRows(self.tokens[:start] + edited.tokens + self.tokens[stop:],
+                         self.lexemes[:start] + edited.lexemes + self.lexemes[stop:],
+                         self.rows[:start] + edited.rows + TokenStream.shifted(self.rows[stop:], shift))
+
+    def __len__(self):
+        return len(self.tokens) if self.indices is None else len(self.indices)
+
+    def __getitem__(self, index):
+        if self.indices is not None:
+            index = self.indices[index]
+        return self.lexemes[index], self.tokens[index]
+
+    def filtered(self, classification):
+        """Get the rows of one TOKEN_CLASSIFICATIONS category, or every row for None."""
+        if classification is None:
+            return self
+        # Comment and whitespace tokens keep their raw type, so match those too
+        names = {classification, *LexicalAnalyzer.TOKEN_CLASSIFICATIONS[classification]}
+        return TokenRows(self.tokens, self.lexemes, self.rows,
+                         array('i', [index for index, token in enumerate(self.tokens) if token in names]))
+
+
+class Run:
+    def __init__(self):
+        self.cancelled = False
+        self.interpreter = None  # Set once the worker starts executing
+
+    def cancel(self):
+        """Stop the run at its next phase, or the interpreter at its next statement."""
+        self.cancelled = True
+        if self.interpreter:
+            self.interpreter.cancel()
+
+
+if __name__ == "__main__":
+    # Create and run the app
+    root = tk.Tk()
+    app = CMSC124Project(root)
+    root.mainloop()
@@ -0,0 +1,160 @@
+import glob
+import io
+import json
+import os
+import re
+import unittest
+import Bytecode
+import InputProvider
+import Interpreter
+import LexicalAnalyzer
+import Optimizer
+import Pipeline
+import Transpiler
+
+# Regression tests: the lexer against the token streams the baseline lexer produced for samplecodes/, and the
+# three execution backends against each other on the same programs.
+#   python -m unittest test_lolcode    or    python -m pytest test_lolcode.py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = sorted(glob.glob(os.path.join(HERE, "samplecodes", "*.lol")))
+# Recorded from the baseline lexer, except that OMGWTF is now one token instead of OMG and an identifier WTF
+BASELINE_TOKENS = os.path.join(HERE, "testdata", "baseline_tokens.json")
+INPUTS = ["3"] * 50  # GIMMEH lines for every program, as many as any sample asks for
+
+# What the samples don't cover: functions, recursion, WTF? and runtime errors from inside a call
+FUNCTIONS_PROGRAM = """HAI
+HOW IZ I fib YR n
+  BOTH SAEM n AN SMALLR OF n AN 1
+  O RLY?
+  YA RLY
+    FOUND YR n
+  OIC
+  FOUND YR SUM OF I IZ fib YR DIFF OF n AN 1 MKAY AN I IZ fib YR DIFF OF n AN 2 MKAY
+IF U SAY SO
+HOW IZ I describe YR n
+  n
+  WTF?
+  OMG 0
+    VISIBLE "none"
+    GTFO
+  OMG 1
+    VISIBLE "one"
+  OMGWTF
+    VISIBLE "many"
+  OIC
+  GTFO
+IF U SAY SO
+HOW IZ I broken
+  FOUND YR QUOSHUNT OF 1 AN 0
+IF U SAY SO
+WAZZUP
+I HAS A i ITZ 0
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN 3
+  VISIBLE I IZ fib YR i MKAY
+  VISIBLE I IZ describe YR i MKAY
+IM OUTTA YR loop
+VISIBLE I IZ fib YR 15 MKAY
+I IZ broken MKAY
+KTHXBYE
+"""
+
+# Runtime errors that only the transpiler can place on a line
+LINE_NUMBER = re.compile(r"^Runtime error on line \d+:")
+
+
+def load_baseline_tokens():
+    with open(BASELINE_TOKENS) as file:
+        return json.load(file)
+
+
+def run_backends(source):
+    """Run source on every backend, returning each one's (ok, console); None if it does not parse."""
+    ast, syntax_analyzer = Pipeline.parse(source)
+    if ast is None:
+        return None
+    ast = Optimizer.Optimizer(ast).optimize()
+    programs = {
+        "interpreter": Interpreter.Interpreter(ast, InputProvider.ListInput(INPUTS)),
+        "bytecode": Bytecode.load_program(ast, InputProvider.ListInput(INPUTS)),
+        "transpiler": Transpiler.load_program(source, None, InputProvider.ListInput(INPUTS)),
+    }
+    results = {}
+    for name, program in programs.items():
+        ok = program.run()
+        results[name] = ok, [LINE_NUMBER.sub("Runtime error:", line) for line in program.console]
+    return results
+
+
+class LexerTest(unittest.TestCase):
+    def test_samples_match_baseline(self):
+        baseline = load_baseline_tokens()
+        self.assertEqual(sorted(baseline), [os.path.basename(path) for path in SAMPLES])
+        for path in SAMPLES:
+            with self.subTest(path=os.path.basename(path)):
+                with open(path) as file:
+                    tokens, lexemes, rows, columns = LexicalAnalyzer.LexicalAnalyzer().gen_tokens(file.read())
+                expected = baseline[os.path.basename(path)]
+                self.assertEqual(tokens, expected["tokens"])
+                self.assertEqual(lexemes, expected["lexemes"])
+                self.assertEqual(rows, expected["rows"])
+                self.assertEqual(columns, expected["columns"])
+
+    def test_reused_lexer_starts_over(self):
+        lexer = LexicalAnalyzer.LexicalAnalyzer()
+        for path in SAMPLES:
+            with self.subTest(path=os.path.basename(path)):
+                with open(path) as file:
+                    source = file.read()
+                first = [list(part) for part in lexer.gen_tokens(source)]
+                self.assertEqual([list(part) for part in lexer.gen_tokens(source)], first)
+
+    def test_iter_tokens_matches_gen_tokens(self):
+        for path in SAMPLES:
+            with self.subTest(path=os.path.basename(path)):
+                with open(path) as file:
+                    source = file.read()
+                expected = list(zip(*LexicalAnalyzer.LexicalAnalyzer().gen_tokens(source)))
+                streamed = list(LexicalAnalyzer.LexicalAnalyzer().iter_tokens(io.StringIO(source), chunk_size=16))
+                self.assertEqual(streamed, expected)
+
+
+class BackendTest(unittest.TestCase):
+    def assert_backends_agree(self, source):
+        """Check that the bytecode VM and the transpiler print what the interpreter does; False if no parse."""
+        results = run_backends(source)
+        if results is None:
+            return False
+        reference = results.pop("interpreter")
+        for name, result in results.items():
+            self.assertEqual(result, reference, f"{name} differs from the interpreter")
+        return True
+
+    def test_samples(self):
+        parsed = 0
+        for path in SAMPLES:
+            with self.subTest(path=os.path.basename(path)):
+                with open(path) as file:
+                    # Some samples exercise syntax errors; no backend gets to run them
+                    parsed += self.assert_backends_agree(file.read())
+        self.assertGreater(parsed, 0)
+
+    def test_functions(self):
+        self.assertTrue(self.assert_backends_agree(FUNCTIONS_PROGRAM))
+
+    def test_undeclared_variables(self):
+        self.assertTrue(self.assert_backends_agree("HAI\nVISIBLE \"before\"\nx R 1\nVISIBLE \"after\"\nKTHXBYE\n"))
+        self.assertTrue(self.assert_backends_agree(
+            "HAI\nFAIL\nO RLY?\nYA RLY\nWAZZUP\nI HAS A i ITZ 0\nBUHBYE\nOIC\n"
+            "IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN 3\nIM OUTTA YR loop\nKTHXBYE\n"))
+
+    def test_end_of_input(self):
+        results = run_backends("HAI\nWAZZUP\nI HAS A x\nBUHBYE\n" + "GIMMEH x\n" * (len(INPUTS) + 1) + "KTHXBYE\n")
+        for name, (ok, console) in results.items():
+            self.assertFalse(ok, name)
+            self.assertEqual(console[-1], "Runtime error: End of input", name)
+
+
+if __name__ == "__main__":
+    unittest.main()